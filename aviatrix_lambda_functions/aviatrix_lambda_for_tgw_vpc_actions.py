@@ -53,16 +53,303 @@ Author:
 
 import time
 import os
+import random
 import json
+import hashlib
+import sqlite3
+import uuid
+import threading
+import concurrent.futures
+import asyncio
+import contextvars
+import functools
 import traceback
 import requests
+from urllib.parse import urlparse, urlencode
+
+try:
+    import aiohttp  # Optional, see AsyncAviatrixClient
+except ImportError:
+    aiohttp = None
 
 
 requests.packages.urllib3.disable_warnings()
 
 
 # Global Variables
-pass
+''' Variable Description: (HTTP connection pool)
+Description:
+    * Every HTTP request (Aviatrix API calls and the response to CloudFormation) goes through a "requests.Session"
+      which is pooled per host in the module scope, so the TCP+TLS connections are kept alive between API calls AND
+      across warm invocations of the same Lambda execution environment.
+    * The values can be tuned with the Lambda environment variables of the same name (prefixed with "AVIATRIX_").
+Detail:
+    * HTTP_POOL_CONNECTIONS        : Number of connection pools cached by the HTTP adapter of each session
+    * HTTP_POOL_MAXSIZE            : Max number of connections to keep alive per host
+    * HTTP_KEEP_ALIVE              : Set "false" to close the connection after every request (the legacy behavior)
+    * HTTP_KEEP_ALIVE_IDLE_TIMEOUT : A pooled session which has been idle for longer than this value (second(s)) is
+                                     dropped and re-created, since the server has most likely closed the connections
+'''
+HTTP_POOL_CONNECTIONS = int(os.environ.get("AVIATRIX_HTTP_POOL_CONNECTIONS", "1"))
+HTTP_POOL_MAXSIZE = int(os.environ.get("AVIATRIX_HTTP_POOL_MAXSIZE", "10"))
+HTTP_KEEP_ALIVE = os.environ.get("AVIATRIX_HTTP_KEEP_ALIVE", "true").lower() == "true"
+HTTP_KEEP_ALIVE_IDLE_TIMEOUT = float(os.environ.get("AVIATRIX_HTTP_KEEP_ALIVE_IDLE_TIMEOUT", "300"))  # second(s)
+
+_http_sessions = dict()  # key: "https://123.123.123.123"  value: {"session": requests.Session, "last_used_time": 0.0}
+_http_sessions_lock = threading.Lock()
+
+''' Variable Description: (CID session cache)
+Description:
+    * The CID (Aviatrix API session token) from "login" is cached in the module scope, keyed on the controller host
+      and the username, so warm invocations can skip the login API call.
+    * A cached CID older than CID_CACHE_TTL second(s) is not used. The value can be tuned with the Lambda environment
+      variable "AVIATRIX_CID_CACHE_TTL".
+    * When an API returns an invalid/expired CID result, _send_aviatrix_api() logs in again with the cached credential
+      and replays the API call once.
+'''
+CID_CACHE_TTL = float(os.environ.get("AVIATRIX_CID_CACHE_TTL", "600"))  # second(s)
+
+_cid_cache = dict()  # key: ("123.123.123.123", "admin")  value: {"CID": "", "password": "", "login_time": 0.0, "expired_CIDs": set()}
+_cid_cache_lock = threading.RLock()
+
+''' Variable Description: (Preflight result cache)
+Description:
+    * The results of is_controller_initialized() and get_controller_version() are cached in the module scope per
+      controller host, so warm invocations can skip both API calls. The controller version is read by
+      "CreateAccessAccount", whose API payload depends on it.
+    * A cached result older than PREFLIGHT_CACHE_TTL second(s) is not used. The value can be tuned with the Lambda
+      environment variable "AVIATRIX_PREFLIGHT_CACHE_TTL".
+    * The cache of a controller is invalidated when any API response suggests a controller version mismatch.
+    * Only a positive "is_initialized" result is cached, since an initialized controller never goes back.
+'''
+PREFLIGHT_CACHE_TTL = float(os.environ.get("AVIATRIX_PREFLIGHT_CACHE_TTL", "3600"))  # second(s)
+
+_preflight_cache = dict()  # key: "123.123.123.123"  value: {"is_initialized": (True, 0.0), "controller_version": ("5.3", 0.0)}
+_preflight_cache_lock = threading.Lock()
+
+''' Variable Description: (Preflight steps and Aviatrix action registry)
+Description:
+    * ALL_PREFLIGHT_STEPS lists every preflight step, in the order that run_preflight_steps() runs them.
+    * AVIATRIX_ACTIONS is filled by register_aviatrix_action(), see "Aviatrix Action Registry" below _lambda_handler()
+    * CONCURRENT_PREFLIGHT: Set the Lambda environment variable "AVIATRIX_CONCURRENT_PREFLIGHT" to "false" to run the
+      initialized check and the version query one after the other. Both are declared by "CreateAccessAccount" (and
+      so by a BATCH/DAG which contains it)
+    * OPTIMISTIC_LOGIN: Set the Lambda environment variable "AVIATRIX_OPTIMISTIC_LOGIN" to "false" to always wait for
+      the API server to be ready before login. Otherwise login is tried first, and the readiness polling loop only
+      runs IF the login has hit a connection error OR a non-200 response
+'''
+PREFLIGHT_WAIT_FOR_API_SERVER = "wait_for_api_server"
+PREFLIGHT_LOGIN = "login"
+PREFLIGHT_CHECK_INITIALIZED = "check_initialized"
+PREFLIGHT_GET_CONTROLLER_VERSION = "get_controller_version"
+ALL_PREFLIGHT_STEPS = [
+    PREFLIGHT_WAIT_FOR_API_SERVER,
+    PREFLIGHT_LOGIN,
+    PREFLIGHT_CHECK_INITIALIZED,
+    PREFLIGHT_GET_CONTROLLER_VERSION
+]
+
+AVIATRIX_ACTIONS = dict()  # key: "AviatrixActionParam".upper()  value: see register_aviatrix_action()
+
+''' Variable Description: (Batch action)
+Description:
+    * The "BATCH" action runs the ordered list of actions in "AviatrixActionListParam" one after the other, over ONE
+      login and ONE run of the preflight steps (the union of the steps which the listed actions require).
+    * Every item of the list is a dictionary with "AviatrixActionParam" and the parameters of that action, which
+      override the "ResourceProperties" of the event. The list can also be passed as a JSON string.
+    * The first failed action stops the batch, and the remaining actions are reported as skipped.
+'''
+BATCH_ACTION_NAME = "BATCH"
+
+''' Variable Description: (DAG action)
+Description:
+    * The "DAG" action runs the actions in "AviatrixActionGraphParam" as a dependency graph, over ONE login and ONE run
+      of the preflight steps, e.g. to onboard an account: create the access account and build the route domain, then
+      attach the VPCs.
+    * Every node is a dictionary like a "BATCH" step, plus:
+        + "NodeIdParam"    : The unique ID of the node (by default, its position in the list: "1", "2", ...)
+        + "DependsOnParam" : The IDs of the nodes which must succeed before this node starts (a list, OR a
+                             comma-separated string). A node without dependencies starts right away.
+    * At most DAG_CONCURRENCY nodes run at a time, overridden by the event parameter "DagConcurrencyParam".
+    * A failed node cancels every node which depends on it (directly or not). The independent branches keep running.
+    * Every node reports its critical-path time: the longest chain of node latencies which ends with the node.
+'''
+DAG_ACTION_NAME = "DAG"
+DAG_CONCURRENCY = int(os.environ.get("AVIATRIX_DAG_CONCURRENCY", "5"))
+
+''' Variable Description: (Bulk VPC actions)
+Description:
+    * The "BULK_ATTACH" and "BULK_DETACH" actions attach/detach every VPC of "VpcListParam" (a list, OR a JSON string
+      of a list). Every item is a dictionary with the parameters of "ATTACH"/"DETACH" for one VPC, which override the
+      "ResourceProperties" of the event (e.g. "TgwNameParam" can be set once for all VPCs).
+    * At most BULK_VPC_CONCURRENCY VPCs are attached/detached at a time, and at most BULK_VPC_CONCURRENCY_PER_TGW VPCs
+      of the same TGW (by default 1, since the controller modifies a TGW one attachment at a time). The event
+      parameter "BulkConcurrencyParam" overrides BULK_VPC_CONCURRENCY.
+    * Every VPC is tried, and the result of every VPC is reported.
+'''
+BULK_VPC_CONCURRENCY = int(os.environ.get("AVIATRIX_BULK_VPC_CONCURRENCY", "5"))
+BULK_VPC_CONCURRENCY_PER_TGW = int(os.environ.get("AVIATRIX_BULK_VPC_CONCURRENCY_PER_TGW", "1"))
+
+''' Variable Description: (SQS batch entry point)
+Description:
+    * sqs_lambda_handler() is the entry point for an SQS event source. The body of every SQS message is the
+      "ResourceProperties" of one action (the same as the "ResourceProperties" of lambda_handler(), without
+      "LambdaInvokerTypeParam"), as a JSON string.
+    * The messages of the same controller share ONE login and ONE run of the preflight steps, and at most
+      SQS_BATCH_CONCURRENCY messages are processed at a time. The value can be tuned with the Lambda environment
+      variable "AVIATRIX_SQS_BATCH_CONCURRENCY".
+    * ONLY the failed messages are returned in "batchItemFailures", so SQS redelivers ONLY them. The event source
+      mapping must have "ReportBatchItemFailures" enabled in "FunctionResponseTypes".
+'''
+SQS_BATCH_CONCURRENCY = int(os.environ.get("AVIATRIX_SQS_BATCH_CONCURRENCY", "5"))
+
+''' Variable Description: (ATTACH coalescing)
+Description:
+    * When ATTACH_COALESCING_WINDOW > 0, the "ATTACH" requests for the same controller and "TgwNameParam" which arrive
+      within ATTACH_COALESCING_WINDOW second(s) of each other are attached as ONE bulk attachment, over ONE login.
+    * The requests are queued in the SQLite database ATTACH_COALESCING_STORE. The first invocation of a window (the
+      leader) waits until the window closes, attaches every queued VPC, and writes the result of every VPC to the
+      store. The other invocations (the followers) wait for their own result, and do NOT log in.
+    * The store must be shared by the invocations to coalesce: "/tmp" is ONLY shared by the invocations of the same
+      Lambda execution environment, so point ATTACH_COALESCING_STORE to an EFS mount to coalesce across the concurrent
+      execution environments.
+    * The controller password is NOT written to the store. The leader logs in with its own password, so ONLY the
+      requests with the same password are coalesced: the coalescing key includes a slow, salted hash of the password
+      (see get_attach_coalescing_key()).
+    * The hash costs 100000 PBKDF2-SHA256 iterations: tens of ms of CPU at 1024 MB of Lambda memory, and a few hundred
+      ms at 128 MB. It is computed once per controller and password in an execution environment, and cached in
+      _attach_credentials_hashes, so ONLY a cold start pays it.
+    * The values can be tuned with the Lambda environment variables of the same name (prefixed with "AVIATRIX_").
+'''
+ATTACH_COALESCING_WINDOW = float(os.environ.get("AVIATRIX_ATTACH_COALESCING_WINDOW", "0"))  # second(s), 0 disables it
+ATTACH_COALESCING_STORE = os.environ.get("AVIATRIX_ATTACH_COALESCING_STORE", "/tmp/aviatrix_attach_coalescing.sqlite3")
+ATTACH_COALESCING_POLL_INTERVAL = float(os.environ.get("AVIATRIX_ATTACH_COALESCING_POLL_INTERVAL", "0.2"))  # second(s)
+_attach_credentials_hashes = dict()  # key: ("123.123.123.123", password)  value: hash, see get_attach_coalescing_key()
+
+CONCURRENT_PREFLIGHT = os.environ.get("AVIATRIX_CONCURRENT_PREFLIGHT", "true").lower() == "true"
+OPTIMISTIC_LOGIN = os.environ.get("AVIATRIX_OPTIMISTIC_LOGIN", "true").lower() == "true"
+
+''' Variable Description: (Invocation deadline and HTTP timeouts)
+Description:
+    * Every invocation derives a deadline from context.get_remaining_time_in_millis(), minus DEADLINE_RESERVED_TIME
+      which is kept for sending the response to CloudFormation.
+    * Every HTTP request gets the (connect, read) timeout of (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), capped by the
+      time left before the deadline.
+    * No retry (and no sleep before a retry) is scheduled IF there would be less than HTTP_MIN_REQUEST_TIME
+      second(s) left for the request after the sleep.
+    * The values can be tuned with the Lambda environment variables of the same name (prefixed with "AVIATRIX_").
+'''
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("AVIATRIX_HTTP_CONNECT_TIMEOUT", "10"))  # second(s)
+HTTP_READ_TIMEOUT = float(os.environ.get("AVIATRIX_HTTP_READ_TIMEOUT", "300"))  # second(s)
+HTTP_MIN_REQUEST_TIME = float(os.environ.get("AVIATRIX_HTTP_MIN_REQUEST_TIME", "2"))  # second(s)
+DEADLINE_RESERVED_TIME = float(os.environ.get("AVIATRIX_DEADLINE_RESERVED_TIME", "5"))  # second(s)
+
+_invocation_deadline = None  # The InvocationDeadline of the current invocation, see start_invocation_deadline()
+
+''' Variable Description: (Response delivery to CloudFormation)
+Description:
+    * send_response_to_cloudformation() tries up to CLOUDFORMATION_RESPONSE_RETRY_COUNT times to PUT the response to
+      "ResponseURL", each attempt with a read timeout of CLOUDFORMATION_RESPONSE_TIMEOUT second(s), and never beyond
+      the Lambda timeout.
+    * The values can be tuned with the Lambda environment variables of the same name (prefixed with "AVIATRIX_").
+'''
+CLOUDFORMATION_RESPONSE_RETRY_COUNT = int(os.environ.get("AVIATRIX_CLOUDFORMATION_RESPONSE_RETRY_COUNT", "3"))
+CLOUDFORMATION_RESPONSE_TIMEOUT = float(os.environ.get("AVIATRIX_CLOUDFORMATION_RESPONSE_TIMEOUT", "5"))  # second(s)
+
+''' Variable Description: (Failure taxonomy and retry policies)
+Description:
+    * classify_failure() classifies every failed Aviatrix API call as one of the FAILURE_* types, see
+      _send_aviatrix_api_with_retry() for how each type is handled.
+    * AVIATRIX_API_RETRY_POLICIES is filled by register_aviatrix_api_retry_policy(), see "Aviatrix API Retry Policies"
+      at the end of this file.
+'''
+FAILURE_TRANSIENT = "transient"  # Safe to retry
+FAILURE_PERMANENT = "permanent"  # Fails the same way on retry
+FAILURE_AMBIGUOUS = "ambiguous-non-idempotent"  # A non-idempotent API which may or may not have been applied
+
+AVIATRIX_API_RETRY_POLICIES = dict()  # key: the value of "action" in the API payload  value: see register_aviatrix_api_retry_policy()
+
+''' Variable Description: (Retry backoff and circuit breaker)
+Description:
+    * The wait time before the retry "i" (0, 1, 2, ...) is picked at random between 0 and
+      min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2^i) ("full jitter"), so the retries of the concurrent Lambda
+      invocations do NOT hit the controller in lockstep.
+    * Every controller host has a CircuitBreaker in the module scope, shared by the warm invocations. After
+      CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive failures, it opens and every API call fails fast. After
+      CIRCUIT_BREAKER_RESET_TIMEOUT second(s), it half-opens and lets ONE call through to probe the controller.
+    * The values can be tuned with the Lambda environment variables of the same name (prefixed with "AVIATRIX_").
+      Set CIRCUIT_BREAKER_FAILURE_THRESHOLD to 0 to disable the circuit breaker.
+'''
+RETRY_BACKOFF_BASE = float(os.environ.get("AVIATRIX_RETRY_BACKOFF_BASE", "1"))  # second(s)
+RETRY_BACKOFF_MAX = float(os.environ.get("AVIATRIX_RETRY_BACKOFF_MAX", "16"))  # second(s)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("AVIATRIX_CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.environ.get("AVIATRIX_CIRCUIT_BREAKER_RESET_TIMEOUT", "30"))  # second(s)
+
+_circuit_breakers = dict()  # key: "123.123.123.123"  value: CircuitBreaker
+_circuit_breakers_lock = threading.Lock()
+
+''' Variable Description: (Invocation-wide retry budget)
+Description:
+    * Every invocation has ONE RetryBudget, shared by every Aviatrix API call of the action, so the worst-case time of
+      an action does NOT grow with the number of API calls it makes (e.g. one per route domain).
+    * A retry is scheduled ONLY IF fewer than RETRY_BUDGET_COUNT retries have been made so far, AND the time spent on
+      retries (the waits before the retries plus the retried requests) stays within RETRY_BUDGET_TIME second(s).
+      Once the budget is spent, every failed API call fails fast without retry.
+    * The budget use is reported in the message of the response.
+    * The values can be tuned with the Lambda environment variables of the same name (prefixed with "AVIATRIX_").
+'''
+RETRY_BUDGET_COUNT = int(os.environ.get("AVIATRIX_RETRY_BUDGET_COUNT", "10"))
+RETRY_BUDGET_TIME = float(os.environ.get("AVIATRIX_RETRY_BUDGET_TIME", "60"))  # second(s)
+
+_retry_budget = None  # The RetryBudget of the current invocation, see start_retry_budget()
+
+''' Variable Description: (Route domain fan-out)
+Description:
+    * build_new_route_domain() connects the new route domain to at most ROUTE_DOMAIN_CONCURRENCY route domains at a
+      time, once the new route domain exists. Set the Lambda environment variable "AVIATRIX_ROUTE_DOMAIN_CONCURRENCY"
+      to "1" to connect them one after the other.
+    * Keep HTTP_POOL_MAXSIZE >= ROUTE_DOMAIN_CONCURRENCY, otherwise the extra connections are NOT kept alive.
+'''
+ROUTE_DOMAIN_CONCURRENCY = int(os.environ.get("AVIATRIX_ROUTE_DOMAIN_CONCURRENCY", "5"))
+
+''' Variable Description: (Route domain teardown modes)
+Description:
+    * teardown_route_domain() runs in one of the following modes, picked by the optional "TeardownModeParam" of the
+      event, OR by the Lambda environment variable "AVIATRIX_ROUTE_DOMAIN_TEARDOWN_MODE" (TEARDOWN_MODE_FULL, the
+      original behavior, by default):
+        + TEARDOWN_MODE_FAST            : Delete the route domain ONLY, since "delete_route_domain" already
+                                          disconnects every connected route domain
+        + TEARDOWN_MODE_FULL            : Disconnect the route domains (ROUTE_DOMAIN_CONCURRENCY at a time), and then
+                                          delete the route domain. The disconnect results are NOT verified
+        + TEARDOWN_MODE_DISCONNECT_ONLY : Disconnect the route domains (ROUTE_DOMAIN_CONCURRENCY at a time), and keep
+                                          the route domain. Every failed disconnect is reported
+'''
+TEARDOWN_MODE_FAST = "fast"
+TEARDOWN_MODE_FULL = "full"
+TEARDOWN_MODE_DISCONNECT_ONLY = "disconnect-only"
+ALL_TEARDOWN_MODES = [TEARDOWN_MODE_FAST, TEARDOWN_MODE_FULL, TEARDOWN_MODE_DISCONNECT_ONLY]
+
+ROUTE_DOMAIN_TEARDOWN_MODE = os.environ.get("AVIATRIX_ROUTE_DOMAIN_TEARDOWN_MODE", TEARDOWN_MODE_FULL).lower()
+
+''' Variable Description: (Asyncio client)
+Description:
+    * AsyncAviatrixClient sends at most ASYNC_MAX_CONCURRENCY API calls at a time over one pooled connection set.
+      The value can be tuned with the Lambda environment variable "AVIATRIX_ASYNC_MAX_CONCURRENCY".
+    * The client uses "aiohttp" when it is installed. Otherwise, the API calls go through a pooled "requests.Session"
+      on a thread pool of ASYNC_MAX_CONCURRENCY threads, so the coroutines still run concurrently.
+'''
+ASYNC_MAX_CONCURRENCY = int(os.environ.get("AVIATRIX_ASYNC_MAX_CONCURRENCY", "50"))
+
+''' Variable Description: (Clock)
+Description:
+    * Every wait and every reading of the wall clock of this module (retry backoffs, readiness polls, deadlines,
+      latencies, cache TTLs) goes through the clock returned by get_clock(), which is a SystemClock by default.
+    * For tests and benchmarks, set_clock(VirtualClock()) makes every wait return at once and moves the virtual time
+      forward instead. A 120 seconds controller boot is then simulated in milliseconds, while the deadlines, the
+      backoffs and the reported latencies are still in (virtual) seconds.
+    * The CloudFormation watchdog (CloudFormationTimeoutWatchdog) always runs on a real timer.
+'''
+_clock = None  # see get_clock() and set_clock()
 
 
 class AviatrixException(Exception):
@@ -71,6 +358,427 @@ class AviatrixException(Exception):
 # END class MyException
 
 
+class SystemClock(object):
+    """ The wall clock and the real waits. "sleep_time" adds up the time spent in the waits of every thread """
+    def __init__(self):
+        self.sleep_time = 0.0
+        self._lock = threading.Lock()
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds=0.0):
+        start_time = time.time()
+        time.sleep(seconds)
+        self._add_sleep_time(time.time() - start_time)
+
+    async def async_sleep(self, seconds=0.0):
+        start_time = time.time()
+        await asyncio.sleep(seconds)
+        self._add_sleep_time(time.time() - start_time)
+
+    def reset_sleep_time(self):
+        with self._lock:
+            self.sleep_time = 0.0
+
+    def _add_sleep_time(self, seconds=0.0):
+        with self._lock:
+            self.sleep_time += seconds
+# END class SystemClock
+
+
+class VirtualClock(SystemClock):
+    """
+    Virtual time: a wait returns at once and moves the clock forward instead, while the time spent outside the
+    waits (e.g. the HTTP requests) still passes in real time.
+
+    A wait ends "seconds" after the time last read by the same thread (OR asyncio task), and the clock only moves
+    forward IF that is later than the current virtual time. So the concurrent API calls which wait 1 second before
+    their retries move the clock forward by 1 second, not by 1 second per API call.
+    """
+    def __init__(self, start_time=None):
+        super(VirtualClock, self).__init__()
+        self._offset = 0.0 if start_time is None else start_time - time.time()
+        self._last_read_offset = contextvars.ContextVar("last_read_offset_" + str(id(self)))
+
+    def time(self):
+        with self._lock:
+            self._last_read_offset.set(self._offset)
+            return time.time() + self._offset
+
+    def sleep(self, seconds=0.0):
+        seconds = max(seconds, 0.0)
+        with self._lock:
+            last_read_offset = self._last_read_offset.get(self._offset)
+            self._offset = max(self._offset, last_read_offset + seconds)
+            self._last_read_offset.set(self._offset)
+            self.sleep_time += seconds
+
+    async def async_sleep(self, seconds=0.0):
+        self.sleep(seconds=seconds)
+        await asyncio.sleep(0)  # Still let the other coroutines run, as a real wait would
+
+    def advance(self, seconds=0.0):
+        """ Moves the clock forward by "seconds", e.g. to expire a cache in a test """
+        with self._lock:
+            self._offset += seconds
+# END class VirtualClock
+
+
+class InvocationDeadline(object):
+    """
+    The deadline of a Lambda invocation, derived from context.get_remaining_time_in_millis() minus "reserved_time".
+    Without a Lambda context (e.g. a local run), there is no deadline, but the HTTP timeouts still apply.
+    """
+    def __init__(self, context=None, reserved_time=DEADLINE_RESERVED_TIME):
+        self.deadline = None
+        self.reserved_time = reserved_time
+        if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+            self.deadline = get_clock().time() + context.get_remaining_time_in_millis() / 1000.0 - reserved_time
+
+    def get_remaining_time(self):
+        if self.deadline is None:
+            return float("inf")
+        return self.deadline - get_clock().time()
+
+    def get_remaining_lambda_time(self):
+        """ The time left before the Lambda timeout, including the reserved time """
+        return self.get_remaining_time() + self.reserved_time
+
+    def can_finish_before_deadline(self, required_time=0.0):
+        return self.get_remaining_time() > required_time
+
+    def get_http_timeout(self):
+        """
+        :return: (connect timeout, read timeout) in second(s), for the "timeout" parameter of "requests"
+        :raise AviatrixException: IF the deadline has already passed
+        """
+        remaining_time = self.get_remaining_time()
+        if remaining_time <= 0:
+            raise AviatrixException(
+                message="Aviatrix Lambda has reached its invocation deadline. No more HTTP request can be sent."
+            )
+        return min(HTTP_CONNECT_TIMEOUT, remaining_time), min(HTTP_READ_TIMEOUT, remaining_time)
+# END class InvocationDeadline
+
+
+class CloudFormationTimeoutWatchdog(object):
+    """
+    Sends a FAILED response to CloudFormation when the invocation deadline is reached (DEADLINE_RESERVED_TIME
+    second(s) before the Lambda timeout), no matter where the main thread is blocked. Otherwise nobody responds to
+    "ResponseURL", and the stack hangs for up to an hour before CloudFormation gives up.
+
+    Whoever calls claim_response() first (the main thread OR the watchdog) sends the ONLY response.
+    """
+    def __init__(self, event=dict(), context=None, keyword_for_log="avx-lambda-function---"):
+        self.event = event
+        self.context = context
+        self.keyword_for_log = keyword_for_log
+        self._has_responded = False
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def start(self, timeout=float("inf")):
+        if timeout == float("inf"):
+            return self  # No deadline, so the Lambda can not time out from our point of view
+        self._timer = threading.Timer(max(timeout, 0), self._on_timeout)
+        self._timer.daemon = True
+        self._timer.start()
+        return self
+
+    def claim_response(self):
+        """ Returns True to the first caller ONLY, who is then responsible for sending the response """
+        with self._lock:
+            if self._has_responded:
+                return False
+            self._has_responded = True
+        if self._timer is not None:
+            self._timer.cancel()
+        return True
+
+    def _on_timeout(self):
+        if not self.claim_response():
+            return
+
+        lambda_failure_reason = "Aviatrix Error: Aviatrix Lambda is about to time out before the Aviatrix Action " + \
+                                "has finished. The action may still be in progress on the Aviatrix Controller."
+        print(self.keyword_for_log + lambda_failure_reason)
+        try:
+            response_for_cloudformation = _build_response_for_cloudformation_stack(
+                event=self.event,
+                context=self.context,
+                status="FAILED",
+                reason=lambda_failure_reason,
+                keyword_for_log=self.keyword_for_log,
+                indent=""
+            )
+            send_response_to_cloudformation(
+                event=self.event,
+                response_for_cloudformation=response_for_cloudformation,
+                keyword_for_log=self.keyword_for_log,
+                indent=""
+            )
+        except Exception:  # pylint: disable=broad-except
+            print(self.keyword_for_log + "Aviatrix Lambda watchdog failed to respond to CloudFormation: " +
+                  traceback.format_exc())
+        # END try-except
+# END class CloudFormationTimeoutWatchdog
+
+
+class CircuitBreaker(object):
+    """
+    Tracks the consecutive failures of a controller:
+        + CLOSED    : Every call goes through
+        + OPEN      : Every call fails fast with AviatrixException, until "reset_timeout" second(s) have passed
+        + HALF_OPEN : ONE call goes through to probe the controller. Its success closes the breaker, its failure
+                      opens it again. The other calls still fail fast
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name="123.123.123.123", failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitBreaker.CLOSED
+        self.consecutive_failures = 0
+        self.opened_time = 0.0
+        self.probe_start_time = 0.0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """ :raise AviatrixException: IF the call is not allowed to go through """
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            now = get_clock().time()
+            if self.state == CircuitBreaker.CLOSED:
+                return
+            if self.state == CircuitBreaker.OPEN and now - self.opened_time >= self.reset_timeout:
+                self.state = CircuitBreaker.HALF_OPEN
+                self.probe_start_time = now
+                return  # This call is the probe
+            if self.state == CircuitBreaker.HALF_OPEN and now - self.probe_start_time >= self.reset_timeout:
+                self.probe_start_time = now
+                return  # The previous probe has never reported back, so this call is the new probe
+            retry_after = self.reset_timeout - (now - max(self.opened_time, self.probe_start_time))
+        # END with
+        raise AviatrixException(
+            message="Aviatrix Controller " + self.name + " has failed " + str(self.consecutive_failures) +
+                    " consecutive time(s). The circuit breaker is " + self.state + ", so the API call fails fast. " +
+                    "Please retry after " + "{0:.0f}".format(max(retry_after, 0)) + " second(s)."
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.state = CircuitBreaker.CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = CircuitBreaker.OPEN
+                self.opened_time = get_clock().time()
+# END class CircuitBreaker
+
+
+class RetryBudget(object):
+    """ The retries (count AND time) which all API calls of an invocation may spend together """
+    def __init__(self, max_retry_count=RETRY_BUDGET_COUNT, max_retry_time=RETRY_BUDGET_TIME):
+        self.max_retry_count = max_retry_count
+        self.max_retry_time = max_retry_time
+        self.retry_count = 0
+        self.retry_time = 0.0
+        self.denied_count = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self, wait_time=0.0):
+        """ :return: True IF one retry after "wait_time" second(s) is within the budget, which is then spent """
+        with self._lock:
+            if self.retry_count >= self.max_retry_count or self.retry_time + wait_time > self.max_retry_time:
+                self.denied_count += 1
+                return False
+            self.retry_count += 1
+            self.retry_time += wait_time
+            return True
+
+    def add_retry_time(self, elapsed_time=0.0):
+        """ Charges the time of a retried request to the budget """
+        with self._lock:
+            self.retry_time += elapsed_time
+
+    def get_usage_message(self):
+        with self._lock:
+            message = "Retry budget used: " + str(self.retry_count) + "/" + str(self.max_retry_count) + \
+                      " retries, " + "{0:.1f}".format(self.retry_time) + "/" + \
+                      "{0:.0f}".format(self.max_retry_time) + " seconds"
+            if self.denied_count > 0:
+                message += ", " + str(self.denied_count) + " retries denied"
+            return message
+# END class RetryBudget
+
+
+class AttachCoalescingStore(object):
+    """
+    The durable queue of the "ATTACH" requests to coalesce, see "ATTACH coalescing" at the top of this file.
+        + requests : One row per request. status: PENDING -> CLAIMED (by the leader) -> SUCCESS || FAILED,
+                     OR PENDING -> CANCELLED (by a follower which has given up waiting)
+        + windows  : One row per open window (coalescing key), naming its leader. A window which is still open
+                     "window_expiry" second(s) after it opened has lost its leader (e.g. a crashed OR timed out
+                     invocation), so it is closed, and a follower takes over the window
+    Every method opens its own connection, so the store can be used from any thread AND any process.
+    """
+    REQUEST_TTL = 3600  # second(s). Finished OR abandoned requests older than this are removed
+    WINDOW_GRACE_TIME = 10  # second(s). Added to the coalescing window before the window of a silent leader expires
+
+    def __init__(self, path=ATTACH_COALESCING_STORE, window_expiry=ATTACH_COALESCING_WINDOW + WINDOW_GRACE_TIME):
+        self.path = path
+        self.window_expiry = window_expiry
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS requests (request_id TEXT PRIMARY KEY, coalescing_key TEXT, "
+                "resource_properties TEXT, status TEXT, reason TEXT, leader_id TEXT, enqueue_time REAL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS windows (coalescing_key TEXT PRIMARY KEY, leader_id TEXT, open_time REAL)"
+            )
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("BEGIN IMMEDIATE")  # Serializes the writers across threads AND processes
+        return _SQLiteTransaction(connection)
+
+    def enqueue(self, request_id="", coalescing_key="", resource_properties=dict()):
+        """
+        Lambda retries a failed asynchronous invocation with the same request ID, so the request may be in the store
+        already, from the crashed OR timed out attempt:
+            + PENDING                  : The retry re-joins the window, and leads it again IF it was its leader
+            + CLAIMED by another leader: The retry waits for the result of that leader
+            + SUCCESS                  : The retry reuses the result
+            + FAILED || CANCELLED || CLAIMED by the request itself (its attachment was cut short): queued again
+        :return: True IF the request has opened a new window (OR leads its window again), so the caller is the leader
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM requests WHERE enqueue_time < ?", (get_clock().time() - AttachCoalescingStore.REQUEST_TTL,)
+            )
+            self._expire_windows(connection)
+            row = connection.execute(
+                "SELECT status, leader_id FROM requests WHERE request_id = ?", (request_id,)
+            ).fetchone()
+            if row is not None and (row[0] == "SUCCESS" or (row[0] == "CLAIMED" and row[1] != request_id)):
+                return False
+            if row is None or row[0] != "PENDING":
+                connection.execute(
+                    "INSERT OR REPLACE INTO requests VALUES (?, ?, ?, 'PENDING', '', '', ?)",
+                    (request_id, coalescing_key, json.dumps(resource_properties), get_clock().time())
+                )
+            # END if
+            if connection.execute(
+                "SELECT 1 FROM windows WHERE coalescing_key = ? AND leader_id = ?", (coalescing_key, request_id)
+            ).fetchone() is not None:
+                return True
+            return self._open_window(connection, request_id=request_id, coalescing_key=coalescing_key)
+
+    def take_over_window(self, request_id="", coalescing_key=""):
+        """
+        Called by a follower whose request is still PENDING, but whose window has been closed (its leader has given
+        up before claiming the requests).
+        :return: True IF the follower is now the leader of a new window
+        """
+        with self._connect() as connection:
+            status = connection.execute(
+                "SELECT status FROM requests WHERE request_id = ?", (request_id,)
+            ).fetchone()
+            if status is None or status[0] != "PENDING":
+                return False
+            self._expire_windows(connection)
+            return self._open_window(connection, request_id=request_id, coalescing_key=coalescing_key)
+
+    def _expire_windows(self, connection):
+        connection.execute("DELETE FROM windows WHERE open_time < ?", (get_clock().time() - self.window_expiry,))
+
+    @staticmethod
+    def _open_window(connection, request_id="", coalescing_key=""):
+        if connection.execute(
+            "SELECT leader_id FROM windows WHERE coalescing_key = ?", (coalescing_key,)
+        ).fetchone() is not None:
+            return False
+        connection.execute("INSERT INTO windows VALUES (?, ?, ?)", (coalescing_key, request_id, get_clock().time()))
+        return True
+
+    def claim(self, leader_id="", coalescing_key=""):
+        """
+        Closes the window of the leader, and claims every PENDING request of the window.
+        :return: [(request_id, resource_properties)], in the order of arrival
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM windows WHERE coalescing_key = ? AND leader_id = ?", (coalescing_key, leader_id)
+            )
+            rows = connection.execute(
+                "SELECT request_id, resource_properties FROM requests WHERE coalescing_key = ? AND status = 'PENDING' "
+                "ORDER BY enqueue_time", (coalescing_key,)
+            ).fetchall()
+            connection.execute(
+                "UPDATE requests SET status = 'CLAIMED', leader_id = ? WHERE coalescing_key = ? AND status = 'PENDING'",
+                (leader_id, coalescing_key)
+            )
+            return [(request_id, json.loads(resource_properties)) for request_id, resource_properties in rows]
+
+    def complete(self, request_id="", status="SUCCESS", reason=""):
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE requests SET status = ?, reason = ? WHERE request_id = ?", (status, reason, request_id)
+            )
+
+    def get_result(self, request_id=""):
+        """ :return: (status, reason, is the window of the request still open) """
+        with self._connect() as connection:
+            self._expire_windows(connection)
+            row = connection.execute(
+                "SELECT r.status, r.reason, w.leader_id FROM requests r "
+                "LEFT JOIN windows w ON w.coalescing_key = r.coalescing_key WHERE r.request_id = ?", (request_id,)
+            ).fetchone()
+            if row is None:
+                return "FAILED", "The request has been removed from the coalescing store", False
+            return row[0], row[1], row[2] is not None
+
+    def cancel(self, request_id=""):
+        """ :return: True IF the request was still PENDING, so it will NOT be attached """
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE requests SET status = 'CANCELLED' WHERE request_id = ? AND status = 'PENDING'", (request_id,)
+            ).rowcount == 1
+
+    def remove(self, request_id=""):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM requests WHERE request_id = ?", (request_id,))
+# END class AttachCoalescingStore
+
+
+class _SQLiteTransaction(object):
+    """ Commits the transaction on success, rolls it back on exception, and always closes the connection """
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        try:
+            self.connection.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.connection.close()
+        return False
+# END class _SQLiteTransaction
+
+
 def lambda_handler(event, context):
     print(event)  # For debugging purpose if ever needed
 
@@ -81,7 +789,14 @@ def lambda_handler(event, context):
             str(event["ResourceProperties"]["KeywordForCloudWatchLogParam"]),
             str(event["ResourceProperties"]["DelimiterForCloudWatchLogParam"])
         )
+    invocation_deadline = start_invocation_deadline(context=context)
+    retry_budget = start_retry_budget()
     lambda_invoker_type = get_lambda_invoker_type(event)
+
+    ### Make sure CloudFormation gets a response even IF the Lambda is about to time out
+    watchdog = CloudFormationTimeoutWatchdog(event=event, context=context, keyword_for_log=keyword_for_log)
+    if lambda_invoker_type == "cloudformation" or lambda_invoker_type == "cf":
+        watchdog.start(timeout=invocation_deadline.get_remaining_time())
     tgw_action = event["ResourceProperties"]["AviatrixActionParam"]
     controller_hostname = str(event["ResourceProperties"]["AviatrixControllerHostnameParam"])
 
@@ -91,7 +806,7 @@ def lambda_handler(event, context):
         traceback_msg = traceback.format_exc()
         # print(keyword_for_log + "Oops! Aviatrix Lambda caught an exception! The traceback message is: ")
         # print(traceback_msg)
-        lambda_failure_reason = "Aviatrix Error: " + str(e)
+        lambda_failure_reason = "Aviatrix Error: " + str(e) + " (" + retry_budget.get_usage_message() + ")"
         print(keyword_for_log + lambda_failure_reason)
         if lambda_invoker_type == "terraform" or lambda_invoker_type == "tf":
             response_for_terraform = _build_response_for_terraform(
@@ -112,10 +827,13 @@ def lambda_handler(event, context):
                 indent=""
             )
 
-            response = requests.put(
-                url=event["ResponseURL"],
-                data=json.dumps(response_for_cloudformation)
-            )
+            if watchdog.claim_response():  # False IF the watchdog has already responded to CloudFormation
+                send_response_to_cloudformation(
+                    event=event,
+                    response_for_cloudformation=response_for_cloudformation,
+                    keyword_for_log=keyword_for_log,
+                    indent=""
+                )
 
             return response_for_cloudformation
         elif lambda_invoker_type == "generic":
@@ -141,7 +859,8 @@ def lambda_handler(event, context):
         # END if-else
     except Exception as e:  # pylint: disable=broad-except
         traceback_msg = traceback.format_exc()
-        lambda_failure_reason = "Oops! Aviatrix Lambda caught an exception! The traceback message is: \n" + str(traceback_msg)
+        lambda_failure_reason = "Oops! Aviatrix Lambda caught an exception! The traceback message is: \n" + \
+                                str(traceback_msg) + " (" + retry_budget.get_usage_message() + ")"
         print(keyword_for_log + lambda_failure_reason)
         if lambda_invoker_type == "terraform" or lambda_invoker_type == "tf":
             response_for_terraform = _build_response_for_terraform(
@@ -158,10 +877,13 @@ def lambda_handler(event, context):
                 reason=lambda_failure_reason,
                 keyword_for_log=keyword_for_log
             )
-            response = requests.put(
-                url=event["ResponseURL"],
-                data=json.dumps(response_for_cloudformation)
-            )
+            if watchdog.claim_response():  # False IF the watchdog has already responded to CloudFormation
+                send_response_to_cloudformation(
+                    event=event,
+                    response_for_cloudformation=response_for_cloudformation,
+                    keyword_for_log=keyword_for_log,
+                    indent=""
+                )
             return response_for_cloudformation
         elif lambda_invoker_type == "generic":
             response_for_generic_lambda_invoker = _build_response_for_generic_lambda_invoker(
@@ -189,7 +911,9 @@ def lambda_handler(event, context):
 
 
     success_msg = 'Successfully completed Aviatrix Lambda script for Aviatrix Action: <<<' + tgw_action + \
-                  '>>> at Aviatrix Controller: ' + controller_hostname
+                  '>>> at Aviatrix Controller: ' + controller_hostname + ' (' + retry_budget.get_usage_message() + ')'
+    if isinstance(data, dict) and "summary" in data:
+        success_msg += '. ' + data["summary"]
 
     if lambda_invoker_type == "terraform" or lambda_invoker_type == "tf":
         response_for_terraform = _build_response_for_terraform(
@@ -213,10 +937,13 @@ def lambda_handler(event, context):
             keyword_for_log=keyword_for_log,
             indent=""
         )
-        response = requests.put(
-            url=event["ResponseURL"],
-            data=json.dumps(response_for_cloudformation)  # json.dumps() converts dict() to string
-        )
+        if watchdog.claim_response():  # False IF the watchdog has already responded to CloudFormation
+            send_response_to_cloudformation(
+                event=event,
+                response_for_cloudformation=response_for_cloudformation,
+                keyword_for_log=keyword_for_log,
+                indent=""
+            )
         return response_for_cloudformation
     elif lambda_invoker_type == "generic":
         response_for_generic_lambda_invoker = _build_response_for_generic_lambda_invoker(
@@ -246,6 +973,72 @@ def lambda_handler(event, context):
 # END def lambda_handler()
 
 
+def get_clock():
+    """ :return: The clock of every wait and every wall clock reading of this module, see "Clock" at the top """
+    global _clock
+    if _clock is None:
+        _clock = SystemClock()
+    return _clock
+# END def get_clock()
+
+
+def set_clock(clock=None):
+    """
+    :param clock: A SystemClock OR a VirtualClock (OR any object with their methods), None restores the wall clock
+    :return: The previous clock
+    """
+    global _clock
+    previous_clock = get_clock()
+    _clock = clock if clock is not None else SystemClock()
+    return previous_clock
+# END def set_clock()
+
+
+def start_invocation_deadline(context=None):
+    global _invocation_deadline
+    _invocation_deadline = InvocationDeadline(context=context)
+    return _invocation_deadline
+# END def start_invocation_deadline()
+
+
+def get_invocation_deadline():
+    """ Returns the InvocationDeadline of the current invocation (one without a deadline IF none has started) """
+    if _invocation_deadline is None:
+        return InvocationDeadline(context=None)
+    return _invocation_deadline
+# END def get_invocation_deadline()
+
+
+def get_circuit_breaker(api_endpoint_url="https://123.123.123.123/v1/api"):
+    host = urlparse(api_endpoint_url).netloc
+    with _circuit_breakers_lock:
+        if host not in _circuit_breakers:
+            _circuit_breakers[host] = CircuitBreaker(name=host)
+        return _circuit_breakers[host]
+# END def get_circuit_breaker()
+
+
+def get_retry_wait_time(i=0):
+    """ :return: The wait time (second(s)) before the retry "i" (0, 1, 2, ...), with full jitter """
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * pow(2, i)))
+# END def get_retry_wait_time()
+
+
+def start_retry_budget():
+    global _retry_budget
+    _retry_budget = RetryBudget()
+    return _retry_budget
+# END def start_retry_budget()
+
+
+def get_retry_budget():
+    """ :return: The RetryBudget of the current invocation, OR a new one IF no invocation has started one """
+    if _retry_budget is None:
+        return start_retry_budget()
+    return _retry_budget
+# END def get_retry_budget()
+
+
 def get_lambda_invoker_type(event=dict()):
     lambda_invoker_type = "generic"  # set default value
     key = "LambdaInvokerTypeParam"
@@ -314,248 +1107,1496 @@ def _lambda_handler(event, context):
     print(keyword_for_log + 'ENDED: Display all parameters from lambda "event" object\n\n')
 
 
-    ### Wait until apache2 of controller is up and running
-    print(keyword_for_log + 'START: Wait until API server of controller is up and running')
-    wait_until_controller_api_server_is_ready(
-        ucc_public_ip=ucc_hostname,
-        api_version=aviatrix_api_version,
-        api_route=aviatrix_api_route,
-        total_wait_time=120,  # second(s)  The average time for a brand new controller is about 60 seconds
-        interval_wait_time=10,  # second(s)
+    ### Look up the action, and verify the "ResourceProperties" it requires
+    aviatrix_action_definition = get_aviatrix_action_definition(aviatrix_action=aviatrix_action)
+    verify_required_resource_properties(
+        event=event,
+        aviatrix_action_definition=aviatrix_action_definition,
         keyword_for_log=keyword_for_log,
         indent="    "
     )
-    print(keyword_for_log + 'ENDED: Wait until API server of controller is up and running\n\n')
 
 
-    ### Login Aviatrix Controller as admin
-    print(keyword_for_log + 'START: Invoke Aviatrix API to login Aviatrix Controller')
-    response = login(
-        api_endpoint_url=api_endpoint_url,
-        username="admin",
-        password=admin_password,
+    ### Coalesce the ATTACH requests for the same TGW, see "ATTACH coalescing" at the top of this file
+    if aviatrix_action_definition["name"] == "ATTACH" and ATTACH_COALESCING_WINDOW > 0:
+        return run_coalesced_attach(
+            ucc_hostname=ucc_hostname,
+            api_version=aviatrix_api_version,
+            api_route=aviatrix_api_route,
+            admin_password=admin_password,
+            resource_properties=event["ResourceProperties"],
+            request_id=getattr(context, "aws_request_id", None) or str(uuid.uuid4()),
+            keyword_for_log=keyword_for_log
+        )
+
+
+    ### Run ONLY the preflight steps which are required by the action (OR by all actions of a batch)
+    preflight_results = run_preflight_steps(
+        ucc_hostname=ucc_hostname,
+        api_version=aviatrix_api_version,
+        api_route=aviatrix_api_route,
+        admin_password=admin_password,
+        preflight_steps=get_required_preflight_steps(
+            aviatrix_action_definition=aviatrix_action_definition,
+            resource_properties=event["ResourceProperties"],
+            keyword_for_log=keyword_for_log
+        ),
         keyword_for_log=keyword_for_log
     )
-    verify_aviatrix_api_response_login(response=response, keyword_for_log=keyword_for_log, indent="    ")
-    CID = response.json()["CID"]
-    print(keyword_for_log + 'ENDED: Invoke Aviatrix API to login Aviatrix Controller\n\n')
 
 
-    ### Check if the controller has already been initialized
-    print(keyword_for_log + 'START: Check if the controller has already been initialized')
-    is_ctlr_initialized = is_controller_initialized(
+    ### Execute the function(s) depends on the "action" user/CFT provides
+    action_name = aviatrix_action_definition["name"]
+    print(keyword_for_log + 'START: Aviatrix Action: "' + action_name + '"')
+    data = aviatrix_action_definition["function"](
         api_endpoint_url=api_endpoint_url,
-        CID=CID,
-        keyword_for_log=keyword_for_log
+        CID=preflight_results["CID"],
+        controller_version=preflight_results["controller_version"],
+        resource_properties=event["ResourceProperties"],
+        keyword_for_log=keyword_for_log,
+        indent="    "
     )
-    if is_ctlr_initialized:
-        print(keyword_for_log + "    Good! Aviatrix controller has already been initialized.")
-    else:
-        print(keyword_for_log + "    Error! Aviatrix controller has not been initialized yet.")
-        avx_err_msg = "Error! Aviatrix controller has not been initialized yet."
-        raise AviatrixException(message=avx_err_msg)
-    print(keyword_for_log + 'ENDED: Check if the controller has already been initialized\n\n')
+    print(keyword_for_log + 'ENDED: Aviatrix Action: "' + action_name + '"\n\n')
 
 
-    ### Get controller version
-    print(keyword_for_log + 'START: Get controller version')
-    controller_version = get_controller_version(
-        api_endpoint_url=api_endpoint_url,
-        CID=CID,
-        keyword_for_log=keyword_for_log
+    # At this point, all lambda code statements are executed successfully with no errors.
+    print(keyword_for_log + "Successfully completed lambda function with no errors!\n\n")
+
+
+    return data
+# END def _lambda_handler()
+
+
+def run_coalesced_attach(
+    ucc_hostname="123.123.123.123",
+    api_version="v1",
+    api_route="api/",
+    admin_password="",
+    resource_properties=dict(),
+    request_id="",
+    coalescing_window=None,
+    store=None,
+    keyword_for_log="avx-lambda-function---"
+        ):
+    """
+    Queues the "ATTACH" request, and returns once the coalesced bulk attachment which includes it has finished.
+    :raise AviatrixException: IF the attachment of this request's VPC has failed (OR its result is unknown)
+    """
+    coalescing_window = ATTACH_COALESCING_WINDOW if coalescing_window is None else coalescing_window
+    store = store or AttachCoalescingStore(
+        path=ATTACH_COALESCING_STORE,
+        window_expiry=coalescing_window + AttachCoalescingStore.WINDOW_GRACE_TIME
+    )
+    coalescing_key = get_attach_coalescing_key(
+        ucc_hostname=ucc_hostname,
+        api_version=api_version,
+        api_route=api_route,
+        admin_password=admin_password,
+        tgw_name=resource_properties["TgwNameParam"]
+    )
+    stored_properties = dict(
+        (key, value) for key, value in resource_properties.items() if key != "AviatrixControllerAdminPasswordParam"
     )
-    print(keyword_for_log + '    Controller Version: ' + str(controller_version))
-    print(keyword_for_log + 'ENDED: Get controller version\n\n')
 
+    is_leader = store.enqueue(
+        request_id=request_id,
+        coalescing_key=coalescing_key,
+        resource_properties=stored_properties
+    )
+    while True:
+        if is_leader:
+            _lead_coalesced_attach(
+                ucc_hostname=ucc_hostname,
+                api_version=api_version,
+                api_route=api_route,
+                admin_password=admin_password,
+                request_id=request_id,
+                coalescing_key=coalescing_key,
+                coalescing_window=coalescing_window,
+                store=store,
+                keyword_for_log=keyword_for_log
+            )
+        # END if
 
-    data = None
-    ### Execute the function(s) depends on the "action" user/CFT provides
-    if 'CREATE' == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "CREATE"')
-        access_account_name  = event['ResourceProperties']['AccessAccountNameParam']
-        tgw_region_name      = event['ResourceProperties']['TgwRegionNameParam']
-        aws_tgw_name         = event['ResourceProperties']['TgwNameParam']
-        aws_side_AS_numeber  = event['ResourceProperties']['AwsSideASNumberParam']
-        response = create_aws_tgw(
-            api_endpoint_url=api_endpoint_url,
-            CID=CID,
-            access_account_name=access_account_name,
-            region_name=tgw_region_name,
-            aws_tgw_name=aws_tgw_name,
-            aws_side_AS_numeber=aws_side_AS_numeber,
+        ### Wait for the result of this request (a leader has it already)
+        status, reason, is_window_open = store.get_result(request_id=request_id)
+        while status in ("PENDING", "CLAIMED"):
+            if status == "PENDING" and not is_window_open:
+                break  # The leader has given up (OR its window has expired) before claiming this request
+            if not get_invocation_deadline().can_finish_before_deadline(ATTACH_COALESCING_POLL_INTERVAL):
+                if store.cancel(request_id=request_id):
+                    raise AviatrixException(
+                        message="Timed out waiting for the coalesced attachment of VPC " +
+                                str(resource_properties["VpcIdParam"]) + ". The VPC has NOT been attached."
+                    )
+                raise AviatrixException(
+                    message="Timed out waiting for the coalesced attachment of VPC " +
+                            str(resource_properties["VpcIdParam"]) + ", which is still in progress. " +
+                            "Please check the attachment on the Aviatrix Controller."
+                )
+            # END if
+            get_clock().sleep(ATTACH_COALESCING_POLL_INTERVAL)
+            status, reason, is_window_open = store.get_result(request_id=request_id)
+        # END while
+
+        if status == "PENDING":
+            is_leader = store.take_over_window(request_id=request_id, coalescing_key=coalescing_key)
+            continue
+        break
+    # END while
+
+    store.remove(request_id=request_id)
+    print(keyword_for_log + "Coalesced attachment of VPC " + str(resource_properties["VpcIdParam"]) + ": " + status)
+    if status != "SUCCESS":
+        raise AviatrixException(message=reason)
+    return dict()
+# END def run_coalesced_attach()
+
+
+def get_attach_coalescing_key(
+    ucc_hostname="123.123.123.123",
+    api_version="v1",
+    api_route="api/",
+    admin_password="",
+    tgw_name="my-aws-tgw-009"
+        ):
+    """
+    The requests with the same key are coalesced. The key includes a hash of the controller credentials, so a request
+    is NEVER attached under the login of another request's password. The key is written to a shared store, so the
+    hash is salted with the controller host and slow to brute-force. The slow hash is cached for the warm invocations.
+    """
+    credentials_hash = _attach_credentials_hashes.get((ucc_hostname, admin_password))
+    if credentials_hash is None:
+        credentials_hash = hashlib.pbkdf2_hmac(
+            "sha256",
+            admin_password.encode("utf-8"),
+            ("aviatrix-attach-coalescing:" + ucc_hostname + ":admin").encode("utf-8"),
+            100000
+        ).hex()
+        _attach_credentials_hashes[(ucc_hostname, admin_password)] = credentials_hash
+    # END if
+    return json.dumps([ucc_hostname, api_version, api_route, tgw_name, credentials_hash])
+# END def get_attach_coalescing_key()
+
+
+def _lead_coalesced_attach(
+    ucc_hostname="123.123.123.123",
+    api_version="v1",
+    api_route="api/",
+    admin_password="",
+    request_id="",
+    coalescing_key="",
+    coalescing_window=0.0,
+    store=None,
+    keyword_for_log="avx-lambda-function---"
+        ):
+    """ Waits until the window closes, and attaches every VPC queued in the window as ONE bulk attachment """
+    remaining_time = get_invocation_deadline().get_remaining_time()
+    get_clock().sleep(max(min(coalescing_window, remaining_time - HTTP_MIN_REQUEST_TIME), 0))
+    claimed_requests = store.claim(leader_id=request_id, coalescing_key=coalescing_key)
+    if len(claimed_requests) == 0:
+        return  # A late leader of an expired window has claimed this window's requests too, and attaches them
+    print(keyword_for_log + "START: Coalesced attachment of " + str(len(claimed_requests)) + " VPC(s)")
+
+    try:
+        preflight_results = run_preflight_steps(
+            ucc_hostname=ucc_hostname,
+            api_version=api_version,
+            api_route=api_route,
+            admin_password=admin_password,
+            preflight_steps=get_aviatrix_action_definition(aviatrix_action="ATTACH")["preflight_steps"],
+            keyword_for_log=keyword_for_log
+        )
+        vpc_results = run_bulk_vpc_action(
+            api_endpoint_url="https://" + ucc_hostname + "/" + api_version + "/" + api_route,
+            CID=preflight_results["CID"],
+            controller_version=preflight_results["controller_version"],
+            vpc_records=[resource_properties for _, resource_properties in claimed_requests],
+            aviatrix_action_definition=get_aviatrix_action_definition(aviatrix_action="ATTACH"),
             keyword_for_log=keyword_for_log,
             indent="    "
         )
-        pydict = response.json()
-        print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
-        _handle_aviatrix_api_response_from_create_aws_tgw(response=response)
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "CREATE"\n\n')
-    elif 'DELETE' == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "DELETE"')
-        aws_tgw_name         = event['ResourceProperties']['TgwNameParam']
-        response = delete_aws_tgw(
+    except Exception as e:  # pylint: disable=broad-except
+        vpc_results = [{"status": "FAILED", "reason": str(e)} for _ in claimed_requests]
+    # END try-except
+
+    for (claimed_request_id, _), vpc_result in zip(claimed_requests, vpc_results):
+        store.complete(request_id=claimed_request_id, status=vpc_result["status"], reason=vpc_result["reason"])
+    print(keyword_for_log + "ENDED: Coalesced attachment of " + str(len(claimed_requests)) + " VPC(s)\n\n")
+# END def _lead_coalesced_attach()
+
+
+def sqs_lambda_handler(event, context):
+    """
+    Entry point for an SQS event source, see "SQS batch entry point" at the top of this file.
+    :return: {"batchItemFailures": [{"itemIdentifier": messageId of every failed message}]}
+    """
+    start_invocation_deadline(context=context)
+    start_retry_budget()
+
+    ### Parse and verify every message. A message which can NOT be parsed fails on its own
+    failed_message_ids = list()
+    ### key: (hostname, API version, API route, password)
+    ### value: [(messageId, resource_properties, action definition, preflight steps)]
+    messages_by_controller = dict()
+    for record in event.get("Records", list()):
+        message_id = record.get("messageId")
+        try:
+            resource_properties = json.loads(record["body"])
+            if not isinstance(resource_properties, dict):
+                raise AviatrixException(message="Error: The message body must be a JSON object")
+            aviatrix_action_definition = get_aviatrix_action_definition(
+                aviatrix_action=resource_properties["AviatrixActionParam"]
+            )
+            verify_required_resource_properties(
+                event={"ResourceProperties": resource_properties},
+                aviatrix_action_definition=aviatrix_action_definition,
+                keyword_for_log="",
+                indent="    "
+            )
+            preflight_steps = get_required_preflight_steps(
+                aviatrix_action_definition=aviatrix_action_definition,
+                resource_properties=resource_properties,
+                keyword_for_log=""
+            )
+            controller_key = (
+                str(resource_properties["AviatrixControllerHostnameParam"]).strip(),
+                resource_properties["AviatrixApiVersionParam"],
+                resource_properties["AviatrixApiRouteParam"],
+                resource_properties["AviatrixControllerAdminPasswordParam"]
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            print("Aviatrix Error: Invalid SQS message " + str(message_id) + ": " + repr(e))
+            failed_message_ids.append(message_id)
+            continue
+        # END try-except
+        messages_by_controller.setdefault(controller_key, list()).append(
+            (message_id, resource_properties, aviatrix_action_definition, preflight_steps)
+        )
+    # END for
+
+    ### Process the messages of every controller over one login
+    for controller_key, messages in messages_by_controller.items():
+        failed_message_ids.extend(
+            _process_sqs_messages_of_controller(controller_key=controller_key, messages=messages)
+        )
+    # END for
+
+    print("Processed " + str(len(event.get("Records", list()))) + " SQS message(s), " +
+          str(len(failed_message_ids)) + " failed. " + get_retry_budget().get_usage_message())
+    return {
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_message_ids]
+    }
+# END def sqs_lambda_handler()
+
+
+def _process_sqs_messages_of_controller(controller_key=("123.123.123.123", "v1", "api/", ""), messages=list()):
+    """ :return: The messageId of every failed message """
+    ucc_hostname, aviatrix_api_version, aviatrix_api_route, admin_password = controller_key
+    api_endpoint_url = "https://" + ucc_hostname + "/" + aviatrix_api_version + "/" + aviatrix_api_route
+
+    ### The messages have been parsed already, so ONLY a failed login (OR preflight step) fails every message
+    try:
+        preflight_results = run_preflight_steps(
+            ucc_hostname=ucc_hostname,
+            api_version=aviatrix_api_version,
+            api_route=aviatrix_api_route,
+            admin_password=admin_password,
+            preflight_steps=[
+                step for step in ALL_PREFLIGHT_STEPS
+                if any(step in preflight_steps for _, _, _, preflight_steps in messages)
+            ],
+            keyword_for_log=""
+        )
+    except Exception as e:  # pylint: disable=broad-except
+        print("Aviatrix Error: Preflight failed for Aviatrix Controller " + ucc_hostname + ": " + str(e))
+        return [message_id for message_id, _, _, _ in messages]
+    # END try-except
+
+    def run(message_id, resource_properties, aviatrix_action_definition):
+        print('START: SQS message ' + str(message_id) + ': Aviatrix Action: "' + aviatrix_action_definition["name"] + '"')
+        aviatrix_action_definition["function"](
             api_endpoint_url=api_endpoint_url,
-            CID=CID,
-            aws_tgw_name=aws_tgw_name,
-            keyword_for_log=keyword_for_log,
+            CID=preflight_results["CID"],
+            controller_version=preflight_results["controller_version"],
+            resource_properties=resource_properties,
+            keyword_for_log="",
             indent="    "
         )
-        pydict = response.json()
-        print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
-        _handle_aviatrix_api_response_from_delete_aws_tgw(response=response)
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "DELETE"\n\n')
-    elif 'ATTACH' == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "ATTACH"')
-        vpc_access_account_name    = event['ResourceProperties']['VpcAccessAccountNameParam']
-        vpc_region_name            = event['ResourceProperties']['VpcRegionNameParam']
-        vpc_id                     = event['ResourceProperties']['VpcIdParam']
-
-        aws_tgw_name               = event['ResourceProperties']['TgwNameParam']
-        route_domain_name          = event['ResourceProperties']['RouteDomainNameParam']
-        subnet_list                = event['ResourceProperties']['SubnetListParam']
-
-        response = attach_vpc_to_aws_tgw(
+        print('ENDED: SQS message ' + str(message_id) + ': Aviatrix Action: "' + aviatrix_action_definition["name"] + '"\n\n')
+    # END def run()
+
+    results = run_concurrently(
+        function=run,
+        list_of_kwargs=[
+            {"message_id": message_id, "resource_properties": resource_properties,
+             "aviatrix_action_definition": aviatrix_action_definition}
+            for message_id, resource_properties, aviatrix_action_definition, _ in messages
+        ],
+        max_concurrency=SQS_BATCH_CONCURRENCY
+    )
+    failed_message_ids = list()
+    for (message_id, _, _, _), (_, e) in zip(messages, results):
+        if e is not None:
+            print("Aviatrix Error: SQS message " + str(message_id) + " failed: " + str(e))
+            failed_message_ids.append(message_id)
+    # END for
+    return failed_message_ids
+# END def _process_sqs_messages_of_controller()
+
+
+def run_preflight_steps(
+    ucc_hostname="123.123.123.123",
+    api_version="v1",
+    api_route="api/",
+    admin_password="**********",
+    preflight_steps=ALL_PREFLIGHT_STEPS,
+    keyword_for_log="avx-lambda-function---"
+        ):
+    """
+    Runs the preflight steps in "preflight_steps", in the order of ALL_PREFLIGHT_STEPS. The initialized check and the
+    version query are independent of each other, so they run in parallel (IF CONCURRENT_PREFLIGHT is True).
+    :return: {"CID": "...", "controller_version": "..."}  (None for a value whose step has not been run)
+    """
+    api_endpoint_url = "https://" + ucc_hostname + "/" + api_version + "/" + api_route
+    preflight_results = {
+        "CID": None,
+        "controller_version": None
+    }
+    preflight_start_time = get_clock().time()
+    step_latencies = list()  # list of (step, latency in second(s))
+
+
+    ### Fast path: a successful login (OR a cached CID) already proves that the API server is up and running
+    if OPTIMISTIC_LOGIN and PREFLIGHT_WAIT_FOR_API_SERVER in preflight_steps and PREFLIGHT_LOGIN in preflight_steps:
+        step_start_time = get_clock().time()
+        print(keyword_for_log + 'START: Try to login Aviatrix Controller before waiting for the API server')
+        CID = get_cached_cid(
             api_endpoint_url=api_endpoint_url,
-            CID=CID,
-            vpc_access_account_name=vpc_access_account_name,
-            vpc_region_name=vpc_region_name,
-            vpc_id=vpc_id,
-            aws_tgw_name=aws_tgw_name,
-            route_domain_name=route_domain_name,
-            subnet_list=subnet_list,
+            username="admin",
+            password=admin_password,
             keyword_for_log=keyword_for_log,
             indent="    "
         )
-        pydict = response.json()
-        print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
-        _handle_aviatrix_api_response_from_attach_vpc_to_aws_tgw(response=response)
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "ATTACH"\n\n')
-    elif 'DETACH' == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "DETACH"')
-        vpc_id                     = event['ResourceProperties']['VpcIdParam']
-        aws_tgw_name               = event['ResourceProperties']['TgwNameParam']
-
-        response = detach_vpc_from_aws_tgw(
-            api_endpoint_url=api_endpoint_url,
-            CID=CID,
-            vpc_id=vpc_id,
-            aws_tgw_name=aws_tgw_name,
+        if CID is None:
+            CID = try_optimistic_login(
+                api_endpoint_url=api_endpoint_url,
+                username="admin",
+                password=admin_password,
+                keyword_for_log=keyword_for_log,
+                indent="    "
+            )
+        # END if
+        print(keyword_for_log + 'ENDED: Try to login Aviatrix Controller before waiting for the API server\n\n')
+        step_latencies.append(("optimistic_login", get_clock().time() - step_start_time))
+
+        if CID is not None:
+            preflight_results["CID"] = CID
+            preflight_steps = [step for step in preflight_steps
+                               if step not in (PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN)]
+        # END if
+    # END if
+
+
+    ### Wait until apache2 of controller is up and running
+    if PREFLIGHT_WAIT_FOR_API_SERVER in preflight_steps:
+        step_start_time = get_clock().time()
+        print(keyword_for_log + 'START: Wait until API server of controller is up and running')
+        wait_until_controller_api_server_is_ready(
+            ucc_public_ip=ucc_hostname,
+            api_version=api_version,
+            api_route=api_route,
+            total_wait_time=120,  # second(s)  The average time for a brand new controller is about 60 seconds
+            interval_wait_time=10,  # second(s)
             keyword_for_log=keyword_for_log,
             indent="    "
         )
-        pydict = response.json()
-        print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
-        _handle_aviatrix_api_response_from_detach_vpc_from_aws_tgw(response=response)  # to be implemented
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "DETACH"\n\n')
-    elif 'CreateAccessAccount'.upper() == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "CreateAccessAccount"')
-        new_access_account_name   = event['ResourceProperties']['AccessAccountNameParam']
-        # access_account_password = "Aviatrix123!"  # This parameter is no longer required after version ???
-        # account_email           = "test@aviatrix.com"  # This parameter is no longer required after version ???
-        cloud_type                = "1"
-        aws_account_number        = event['ResourceProperties']['AWS_Account_ID']
-        is_iam_role_based         = "true"
-        aviatrix_app_role_arn     = event['ResourceProperties']['AviatrixAppRoleArnParam']
-        aviatrix_ec2_role_arn     = event['ResourceProperties']['AviatrixEc2RoleArnParam']
-
-        response = create_access_account(
+        print(keyword_for_log + 'ENDED: Wait until API server of controller is up and running\n\n')
+        step_latencies.append((PREFLIGHT_WAIT_FOR_API_SERVER, get_clock().time() - step_start_time))
+    # END if
+
+
+    ### Login Aviatrix Controller as admin (OR reuse the cached CID from a previous warm invocation)
+    if PREFLIGHT_LOGIN in preflight_steps:
+        step_start_time = get_clock().time()
+        print(keyword_for_log + 'START: Invoke Aviatrix API to login Aviatrix Controller')
+        preflight_results["CID"] = get_cid(
             api_endpoint_url=api_endpoint_url,
-            CID=CID,
-            controller_version="4.0",
-            account_name=new_access_account_name,
-            # account_password="**********",
-            # account_email="test@aviatrix.com",
-            cloud_type=cloud_type,
-            aws_account_number=aws_account_number,
-            is_iam_role_based=is_iam_role_based,
-            app_role_arn=aviatrix_app_role_arn,
-            ec2_role_arn=aviatrix_ec2_role_arn,
+            username="admin",
+            password=admin_password,
             keyword_for_log=keyword_for_log,
             indent="    "
         )
-        pydict = response.json()
-        print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
-        _handle_aviatrix_api_response_from_create_access_account(response=response)
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "CreateAccessAccount"\n\n')
-    elif 'DeleteAviatrixAccessAccount'.upper() == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "DeleteAviatrixAccessAccount"')
-        access_account_name   = event['ResourceProperties']['AccessAccountNameParam']
-
-        response = delete_access_account(
-            api_endpoint_url=api_endpoint_url,
-            CID=CID,
-            access_account_name=access_account_name,
-            keyword_for_log=keyword_for_log,
-            indent="    "
+        print(keyword_for_log + 'ENDED: Invoke Aviatrix API to login Aviatrix Controller\n\n')
+        step_latencies.append((PREFLIGHT_LOGIN, get_clock().time() - step_start_time))
+    # END if
+
+
+    ### Check if the controller has already been initialized AND Get controller version
+    post_login_steps = list()
+    if PREFLIGHT_CHECK_INITIALIZED in preflight_steps:
+        post_login_steps.append((PREFLIGHT_CHECK_INITIALIZED, _preflight_check_controller_initialized))
+    if PREFLIGHT_GET_CONTROLLER_VERSION in preflight_steps:
+        post_login_steps.append((PREFLIGHT_GET_CONTROLLER_VERSION, _preflight_get_controller_version))
+
+    if CONCURRENT_PREFLIGHT and len(post_login_steps) > 1:
+        post_login_results = _run_preflight_steps_concurrently(
+            api_endpoint_url=api_endpoint_url,
+            CID=preflight_results["CID"],
+            post_login_steps=post_login_steps,
+            step_latencies=step_latencies,
+            keyword_for_log=keyword_for_log
         )
-        pydict = response.json()
-        print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
-        _handle_aviatrix_api_response_from_delete_access_account(response=response)
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "DeleteAviatrixAccessAccount"\n\n')
-    elif 'BuildNewRouteDomain'.upper() == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "BuildNewRouteDomain"')
-        tgw_region_name                  = event['ResourceProperties']['TgwRegionNameParam']
-        aws_tgw_name                     = event['ResourceProperties']['TgwNameParam']
-        new_route_domain_name            = event['ResourceProperties']['NewRouteDomainNameParam']
-        is_firewall_domain               = event['ResourceProperties']['IsFirewallDomainParam']
-        list_of_route_domains_to_connect = event['ResourceProperties']['ListOfRouteDomainsToConnectParam']
-        list_of_route_domains_to_connect = parse_route_domains_from_1_string_into_list_of_strings(
-            raw_route_domains_string=list_of_route_domains_to_connect
-        )
-
-        responses = build_new_route_domain(
+    else:
+        post_login_results = dict()
+        for step, step_function in post_login_steps:
+            step_start_time = get_clock().time()
+            post_login_results[step] = step_function(
+                api_endpoint_url=api_endpoint_url,
+                CID=preflight_results["CID"],
+                keyword_for_log=keyword_for_log
+            )
+            step_latencies.append((step, get_clock().time() - step_start_time))
+        # END for
+    # END if-else
+
+    if PREFLIGHT_GET_CONTROLLER_VERSION in post_login_results:
+        preflight_results["controller_version"] = post_login_results[PREFLIGHT_GET_CONTROLLER_VERSION]
+
+
+    ### Report the preflight latency separately from the action latency
+    preflight_latency = get_clock().time() - preflight_start_time
+    preflight_latency_msg = "Preflight latency: " + "{0:.0f}".format(preflight_latency * 1000) + " ms  (" + \
+                            ", ".join(step + ": " + "{0:.0f}".format(latency * 1000) + " ms"
+                                      for step, latency in step_latencies) + \
+                            ")"
+    print(keyword_for_log + preflight_latency_msg + "\n\n")
+
+    return preflight_results
+# END def run_preflight_steps()
+
+
+def _run_preflight_steps_concurrently(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    post_login_steps=list(),
+    step_latencies=list(),
+    keyword_for_log="avx-lambda-function---"
+        ):
+    """
+    Runs every (step, step_function) of "post_login_steps" on its own thread, and fails fast: the exception of the
+    first failed step is raised without waiting for the other steps to finish.
+    :return: {step: return value of step_function}
+    """
+    print(keyword_for_log + 'START: Run preflight steps concurrently: ' + str([step for step, _ in post_login_steps]))
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(post_login_steps))
+    step_start_time = get_clock().time()
+    futures = dict()
+    try:
+        for step, step_function in post_login_steps:
+            future = executor.submit(
+                step_function,
+                api_endpoint_url=api_endpoint_url,
+                CID=CID,
+                keyword_for_log=keyword_for_log
+            )
+            futures[future] = step
+        # END for
+
+        post_login_results = dict()
+        for future in concurrent.futures.as_completed(futures):
+            post_login_results[futures[future]] = future.result()  # Raises the exception of a failed step right away
+            step_latencies.append((futures[future], get_clock().time() - step_start_time))
+        # END for
+    finally:
+        executor.shutdown(wait=False)  # Do NOT wait for the remaining step(s) IF a step has failed
+    # END try-finally
+
+    print(keyword_for_log + 'ENDED: Run preflight steps concurrently\n\n')
+    return post_login_results
+# END def _run_preflight_steps_concurrently()
+
+
+def _preflight_check_controller_initialized(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    keyword_for_log="avx-lambda-function---"
+        ):
+    """ Check if the controller has already been initialized (OR reuse the cached result) """
+    print(keyword_for_log + 'START: Check if the controller has already been initialized')
+    is_ctlr_initialized = get_cached_preflight_result(api_endpoint_url=api_endpoint_url, key="is_initialized")
+    if is_ctlr_initialized is not None:
+        print(keyword_for_log + "    Use the cached result of a previous check.")
+    else:
+        is_ctlr_initialized = is_controller_initialized(
             api_endpoint_url=api_endpoint_url,
             CID=CID,
-            tgw_region_name=tgw_region_name,
-            aws_tgw_name=aws_tgw_name,
-            new_route_domain_name=new_route_domain_name,
-            is_firewall_domain=is_firewall_domain,
-            list_of_route_domains_to_connect=list_of_route_domains_to_connect,
-            keyword_for_log=keyword_for_log,
-            indent="    "
-        )
-        # API-responses handling has already been done within the build_new_route_domain()
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "BuildNewRouteDomain"\n\n')
-    elif 'TeardownRouteDomain'.upper() == aviatrix_action.upper():
-        print(keyword_for_log + 'START: Aviatrix Action: "TeardownRouteDomain"')
-        aws_tgw_name                     = event['ResourceProperties']['TgwNameParam']
-        source_route_domain_name   = event['ResourceProperties']['SourceRouteDomainNameParam']
-        list_of_route_domains_to_disconnect = event['ResourceProperties']['ListOfRouteDomainsToDisconnect']
-        list_of_route_domains_to_disconnect = parse_route_domains_from_1_string_into_list_of_strings(
-            raw_route_domains_string=list_of_route_domains_to_disconnect
+            keyword_for_log=keyword_for_log
         )
+        if is_ctlr_initialized:
+            cache_preflight_result(api_endpoint_url=api_endpoint_url, key="is_initialized", value=True)
+    # END if-else
+    if is_ctlr_initialized:
+        print(keyword_for_log + "    Good! Aviatrix controller has already been initialized.")
+    else:
+        print(keyword_for_log + "    Error! Aviatrix controller has not been initialized yet.")
+        avx_err_msg = "Error! Aviatrix controller has not been initialized yet."
+        raise AviatrixException(message=avx_err_msg)
+    print(keyword_for_log + 'ENDED: Check if the controller has already been initialized\n\n')
+    return is_ctlr_initialized
+# END def _preflight_check_controller_initialized()
 
-        responses = teardown_route_domain(
+
+def _preflight_get_controller_version(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    keyword_for_log="avx-lambda-function---"
+        ):
+    """ Get controller version (OR reuse the cached result) """
+    print(keyword_for_log + 'START: Get controller version')
+    controller_version = get_cached_preflight_result(api_endpoint_url=api_endpoint_url, key="controller_version")
+    if controller_version is not None:
+        print(keyword_for_log + "    Use the cached result of a previous query.")
+    else:
+        controller_version = get_controller_version(
             api_endpoint_url=api_endpoint_url,
             CID=CID,
-            aws_tgw_name=aws_tgw_name,
-            source_route_domain_name=source_route_domain_name,
-            list_of_route_domains_to_disconnect=list_of_route_domains_to_disconnect,
-            keyword_for_log=keyword_for_log,
-            indent="    "
+            keyword_for_log=keyword_for_log
         )
-        # API-responses handling has already been done within the teardown_route_domain()
-        data = dict()  # MMM to be implemented after feedback
-        print(keyword_for_log + 'ENDED: Aviatrix Action: "TeardownRouteDomain"\n\n')
-    else:
-        print('Error: Invalid Aviatrix Action: ' + aviatrix_action.upper())
-        raise AviatrixException(message='Error: Invalid Aviatrix Action: ' + aviatrix_action.upper())
+        cache_preflight_result(api_endpoint_url=api_endpoint_url, key="controller_version", value=controller_version)
     # END if-else
+    print(keyword_for_log + '    Controller Version: ' + str(controller_version))
+    print(keyword_for_log + 'ENDED: Get controller version\n\n')
+    return controller_version
+# END def _preflight_get_controller_version()
 
 
-    # At this point, all lambda code statements are executed successfully with no errors.
-    print(keyword_for_log + "Successfully completed lambda function with no errors!\n\n")
+def register_aviatrix_action(
+    name="CREATE",
+    function=None,
+    preflight_steps=ALL_PREFLIGHT_STEPS,
+    required_params=list()
+        ):
+    """
+    Adds an action to AVIATRIX_ACTIONS.
+    :param name: The value of "AviatrixActionParam" (case-insensitive)
+    :param function: Invoked as function(api_endpoint_url, CID, controller_version, resource_properties,
+                     keyword_for_log, indent), and returns the "data" of the Lambda response
+    :param preflight_steps: The subset of ALL_PREFLIGHT_STEPS which the action requires
+    :param required_params: The keys of "ResourceProperties" which the action requires
+    """
+    AVIATRIX_ACTIONS[name.upper()] = {
+        "name": name,
+        "function": function,
+        "preflight_steps": list(preflight_steps),
+        "required_params": list(required_params)
+    }
+# END def register_aviatrix_action()
 
 
-    return data
-# END def _lambda_handler()
+def get_aviatrix_action_definition(aviatrix_action="CREATE"):
+    aviatrix_action_definition = AVIATRIX_ACTIONS.get(str(aviatrix_action).upper())
+    if aviatrix_action_definition is None:
+        print('Error: Invalid Aviatrix Action: ' + str(aviatrix_action).upper())
+        raise AviatrixException(message='Error: Invalid Aviatrix Action: ' + str(aviatrix_action).upper())
+    return aviatrix_action_definition
+# END def get_aviatrix_action_definition()
+
+
+def verify_required_resource_properties(
+    event=dict(),
+    aviatrix_action_definition=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    missing_params = list()
+    for param in aviatrix_action_definition["required_params"]:
+        if param not in event["ResourceProperties"]:
+            missing_params.append(param)
+    # END for
+
+    if len(missing_params) > 0:
+        avx_err_msg = 'Error: Aviatrix Action "' + aviatrix_action_definition["name"] + \
+                      '" requires the following parameter(s) in "ResourceProperties": ' + str(missing_params)
+        print(indent + keyword_for_log + avx_err_msg)
+        raise AviatrixException(message=avx_err_msg)
+    # END if
+# END def verify_required_resource_properties()
+
+
+def _run_action_create_aws_tgw(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    response = create_aws_tgw(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        access_account_name=resource_properties['AccessAccountNameParam'],
+        region_name=resource_properties['TgwRegionNameParam'],
+        aws_tgw_name=resource_properties['TgwNameParam'],
+        aws_side_AS_numeber=resource_properties['AwsSideASNumberParam'],
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    pydict = response.json()
+    print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
+    _handle_aviatrix_api_response_from_create_aws_tgw(response=response)
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_create_aws_tgw()
+
+
+def _run_action_delete_aws_tgw(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    response = delete_aws_tgw(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        aws_tgw_name=resource_properties['TgwNameParam'],
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    pydict = response.json()
+    print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
+    _handle_aviatrix_api_response_from_delete_aws_tgw(response=response)
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_delete_aws_tgw()
+
+
+def _run_action_attach_vpc_to_aws_tgw(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    response = attach_vpc_to_aws_tgw(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        vpc_access_account_name=resource_properties['VpcAccessAccountNameParam'],
+        vpc_region_name=resource_properties['VpcRegionNameParam'],
+        vpc_id=resource_properties['VpcIdParam'],
+        aws_tgw_name=resource_properties['TgwNameParam'],
+        route_domain_name=resource_properties['RouteDomainNameParam'],
+        subnet_list=resource_properties['SubnetListParam'],
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    pydict = response.json()
+    print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
+    _handle_aviatrix_api_response_from_attach_vpc_to_aws_tgw(response=response)
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_attach_vpc_to_aws_tgw()
+
+
+def _run_action_detach_vpc_from_aws_tgw(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    response = detach_vpc_from_aws_tgw(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        vpc_id=resource_properties['VpcIdParam'],
+        aws_tgw_name=resource_properties['TgwNameParam'],
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    pydict = response.json()
+    print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
+    _handle_aviatrix_api_response_from_detach_vpc_from_aws_tgw(response=response)
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_detach_vpc_from_aws_tgw()
+
+
+def _run_action_create_access_account(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    # access_account_password = "Aviatrix123!"  # This parameter is no longer required after version ???
+    # account_email           = "test@aviatrix.com"  # This parameter is no longer required after version ???
+    response = create_access_account(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        controller_version=controller_version,
+        account_name=resource_properties['AccessAccountNameParam'],
+        # account_password="**********",
+        # account_email="test@aviatrix.com",
+        cloud_type="1",
+        aws_account_number=resource_properties['AWS_Account_ID'],
+        is_iam_role_based="true",
+        app_role_arn=resource_properties['AviatrixAppRoleArnParam'],
+        ec2_role_arn=resource_properties['AviatrixEc2RoleArnParam'],
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    pydict = response.json()
+    print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
+    _handle_aviatrix_api_response_from_create_access_account(response=response)
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_create_access_account()
+
+
+def _run_action_delete_access_account(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    response = delete_access_account(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        access_account_name=resource_properties['AccessAccountNameParam'],
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    pydict = response.json()
+    print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
+    _handle_aviatrix_api_response_from_delete_access_account(response=response)
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_delete_access_account()
+
+
+def _run_action_build_new_route_domain(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    list_of_route_domains_to_connect = parse_route_domains_from_1_string_into_list_of_strings(
+        raw_route_domains_string=resource_properties['ListOfRouteDomainsToConnectParam']
+    )
+    responses = build_new_route_domain(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        tgw_region_name=resource_properties['TgwRegionNameParam'],
+        aws_tgw_name=resource_properties['TgwNameParam'],
+        new_route_domain_name=resource_properties['NewRouteDomainNameParam'],
+        is_firewall_domain=resource_properties['IsFirewallDomainParam'],
+        list_of_route_domains_to_connect=list_of_route_domains_to_connect,
+        max_concurrency=ROUTE_DOMAIN_CONCURRENCY,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    # API-responses handling has already been done within the build_new_route_domain()
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_build_new_route_domain()
+
+
+def _run_action_teardown_route_domain(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    list_of_route_domains_to_disconnect = parse_route_domains_from_1_string_into_list_of_strings(
+        raw_route_domains_string=resource_properties['ListOfRouteDomainsToDisconnect']
+    )
+    responses = teardown_route_domain(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        aws_tgw_name=resource_properties['TgwNameParam'],
+        source_route_domain_name=resource_properties['SourceRouteDomainNameParam'],
+        list_of_route_domains_to_disconnect=list_of_route_domains_to_disconnect,
+        teardown_mode=str(resource_properties.get('TeardownModeParam', ROUTE_DOMAIN_TEARDOWN_MODE)).lower(),
+        max_concurrency=ROUTE_DOMAIN_CONCURRENCY,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    # API-responses handling has already been done within the teardown_route_domain()
+    return dict()  # MMM to be implemented after feedback
+# END def _run_action_teardown_route_domain()
+
+
+def parse_batch_steps(
+    resource_properties=dict(),
+    list_param_name="AviatrixActionListParam",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    :param list_param_name: "AviatrixActionListParam" (BATCH) || "AviatrixActionGraphParam" (DAG)
+    :return: [(aviatrix_action_definition, resource_properties of the step)], in the order of "list_param_name"
+    :raise AviatrixException: IF the list is invalid, OR any step misses a required parameter
+    """
+    action_list = resource_properties[list_param_name]
+    if isinstance(action_list, str):
+        try:
+            action_list = json.loads(action_list)
+        except ValueError as e:
+            raise AviatrixException(message='Error: "' + list_param_name + '" is not a valid JSON string: ' + str(e))
+    # END if
+    if not isinstance(action_list, list) or len(action_list) == 0 or \
+       not all(isinstance(step, dict) for step in action_list):
+        raise AviatrixException(
+            message='Error: "' + list_param_name + '" must be a non-empty list of dictionaries, each with ' +
+                    '"AviatrixActionParam" and the parameters of that action'
+        )
+    # END if
+
+    common_properties = dict(resource_properties)
+    del common_properties[list_param_name]
+
+    batch_steps = list()
+    for step in action_list:
+        step_properties = dict(common_properties)
+        step_properties.update(step)
+        aviatrix_action_definition = get_aviatrix_action_definition(
+            aviatrix_action=step_properties.get("AviatrixActionParam")
+        )
+        if aviatrix_action_definition["name"] in (BATCH_ACTION_NAME, DAG_ACTION_NAME):
+            raise AviatrixException(
+                message='Error: A "' + aviatrix_action_definition["name"] + '" action can not be nested'
+            )
+        verify_required_resource_properties(
+            event={"ResourceProperties": step_properties},
+            aviatrix_action_definition=aviatrix_action_definition,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+        batch_steps.append((aviatrix_action_definition, step_properties))
+    # END for
+    return batch_steps
+# END def parse_batch_steps()
+
+
+def get_required_preflight_steps(
+    aviatrix_action_definition=dict(),
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---"
+        ):
+    """ :return: The preflight steps which the action requires (the union of its steps for a batch/DAG action) """
+    if aviatrix_action_definition["name"] == BATCH_ACTION_NAME:
+        return get_batch_preflight_steps(
+            batch_steps=parse_batch_steps(
+                resource_properties=resource_properties,
+                keyword_for_log=keyword_for_log,
+                indent="    "
+            )
+        )
+    elif aviatrix_action_definition["name"] == DAG_ACTION_NAME:
+        return get_batch_preflight_steps(
+            batch_steps=[
+                (dag_node["definition"], dag_node["properties"])
+                for dag_node in parse_dag_nodes(
+                    resource_properties=resource_properties,
+                    keyword_for_log=keyword_for_log,
+                    indent="    "
+                )
+            ]
+        )
+    return aviatrix_action_definition["preflight_steps"]
+# END def get_required_preflight_steps()
+
+
+def get_batch_preflight_steps(batch_steps=list()):
+    """ :return: The union of the preflight steps which the actions of "batch_steps" require """
+    return [
+        step for step in ALL_PREFLIGHT_STEPS
+        if any(step in aviatrix_action_definition["preflight_steps"] for aviatrix_action_definition, _ in batch_steps)
+    ]
+# END def get_batch_preflight_steps()
+
+
+def format_batch_step_results(step_results=list()):
+    return "; ".join(
+        "Step " + str(i + 1) + "/" + str(len(step_results)) + " " + step_result["action"] + ": " +
+        step_result["status"] +
+        (" (" + str(step_result["latency_ms"]) + " ms)" if step_result["latency_ms"] is not None else "") +
+        (" " + step_result["reason"] if step_result["reason"] else "")
+        for i, step_result in enumerate(step_results)
+    )
+# END def format_batch_step_results()
+
+
+def _run_action_batch(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    batch_steps = parse_batch_steps(
+        resource_properties=resource_properties,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+
+    step_results = [
+        {"action": aviatrix_action_definition["name"], "status": "SKIPPED", "latency_ms": None, "reason": ""}
+        for aviatrix_action_definition, _ in batch_steps
+    ]
+    is_failed = False
+    for i, (aviatrix_action_definition, step_properties) in enumerate(batch_steps):
+        print(indent + keyword_for_log + 'START: Batch step ' + str(i + 1) + '/' + str(len(batch_steps)) +
+              ': "' + aviatrix_action_definition["name"] + '"')
+        step_start_time = get_clock().time()
+        try:
+            aviatrix_action_definition["function"](
+                api_endpoint_url=api_endpoint_url,
+                CID=CID,
+                controller_version=controller_version,
+                resource_properties=step_properties,
+                keyword_for_log=keyword_for_log,
+                indent=indent + "    "
+            )
+            step_results[i]["status"] = "SUCCESS"
+        except Exception as e:  # pylint: disable=broad-except
+            step_results[i]["status"] = "FAILED"
+            step_results[i]["reason"] = str(e)
+            is_failed = True
+        # END try-except
+        step_results[i]["latency_ms"] = int((get_clock().time() - step_start_time) * 1000)
+        print(indent + keyword_for_log + 'ENDED: Batch step ' + str(i + 1) + '/' + str(len(batch_steps)) +
+              ': "' + aviatrix_action_definition["name"] + '": ' + step_results[i]["status"] + '\n\n')
+        if is_failed:
+            break
+    # END for
+
+    if is_failed:
+        raise AviatrixException(
+            message="Batch failed. " + format_batch_step_results(step_results=step_results)
+        )
+    return {"batch_steps": step_results, "summary": format_batch_step_results(step_results=step_results)}
+# END def _run_action_batch()
+
+
+def parse_bulk_vpc_records(
+    resource_properties=dict(),
+    aviatrix_action_definition=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    :param aviatrix_action_definition: The definition of the action to run for every VPC ("ATTACH" OR "DETACH")
+    :return: [resource_properties of every VPC], in the order of "VpcListParam"
+    :raise AviatrixException: IF the list is invalid, OR any VPC misses a required parameter
+    """
+    vpc_list = resource_properties["VpcListParam"]
+    if isinstance(vpc_list, str):
+        try:
+            vpc_list = json.loads(vpc_list)
+        except ValueError as e:
+            raise AviatrixException(message='Error: "VpcListParam" is not a valid JSON string: ' + str(e))
+    # END if
+    if not isinstance(vpc_list, list) or not all(isinstance(record, dict) for record in vpc_list):
+        raise AviatrixException(
+            message='Error: "VpcListParam" must be a list of dictionaries, each with the parameters of "' +
+                    aviatrix_action_definition["name"] + '" for one VPC'
+        )
+    # END if
+
+    common_properties = dict(resource_properties)
+    del common_properties["VpcListParam"]
+
+    vpc_records = list()
+    for record in vpc_list:
+        vpc_properties = dict(common_properties)
+        vpc_properties.update(record)
+        verify_required_resource_properties(
+            event={"ResourceProperties": vpc_properties},
+            aviatrix_action_definition=aviatrix_action_definition,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+        vpc_records.append(vpc_properties)
+    # END for
+    return vpc_records
+# END def parse_bulk_vpc_records()
+
+
+def run_bulk_vpc_action(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    vpc_records=list(),
+    aviatrix_action_definition=dict(),
+    max_concurrency=BULK_VPC_CONCURRENCY,
+    max_concurrency_per_tgw=BULK_VPC_CONCURRENCY_PER_TGW,
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    Runs the action of "aviatrix_action_definition" for every VPC of "vpc_records", at most "max_concurrency" at a
+    time, and at most "max_concurrency_per_tgw" of the same TGW at a time.
+    :return: [{"vpc_id", "tgw_name", "status", "reason", "latency_ms"}], in the order of "vpc_records"
+    """
+    tgw_semaphores = dict(
+        (vpc_properties["TgwNameParam"], threading.BoundedSemaphore(max(max_concurrency_per_tgw, 1)))
+        for vpc_properties in vpc_records
+    )
+
+    def run(index):
+        vpc_properties = vpc_records[index]
+        vpc_result = {
+            "vpc_id": vpc_properties["VpcIdParam"],
+            "tgw_name": vpc_properties["TgwNameParam"],
+            "status": "SUCCESS",
+            "reason": "",
+            "latency_ms": 0
+        }
+        with tgw_semaphores[vpc_properties["TgwNameParam"]]:
+            start_time = get_clock().time()
+            try:
+                aviatrix_action_definition["function"](
+                    api_endpoint_url=api_endpoint_url,
+                    CID=CID,
+                    controller_version=controller_version,
+                    resource_properties=vpc_properties,
+                    keyword_for_log=keyword_for_log,
+                    indent=indent + "    "
+                )
+            except Exception as e:  # pylint: disable=broad-except
+                vpc_result["status"] = "FAILED"
+                vpc_result["reason"] = str(e)
+            # END try-except
+            vpc_result["latency_ms"] = int((get_clock().time() - start_time) * 1000)
+        # END with
+        return vpc_result
+    # END def run()
+
+    '''
+    The VPCs are submitted round-robin across the TGWs, so the workers are NOT all blocked on the semaphore of the
+    same TGW while the VPCs of the other TGWs are waiting in the queue.
+    '''
+    indexes_by_tgw = dict()
+    for index, vpc_properties in enumerate(vpc_records):
+        indexes_by_tgw.setdefault(vpc_properties["TgwNameParam"], list()).append(index)
+    submit_order = [
+        indexes[i]
+        for i in range(max([len(indexes) for indexes in indexes_by_tgw.values()] + [0]))
+        for indexes in indexes_by_tgw.values() if i < len(indexes)
+    ]
+
+    print(indent + keyword_for_log + 'START: "' + aviatrix_action_definition["name"] + '" for ' +
+          str(len(vpc_records)) + ' VPC(s) of ' + str(len(indexes_by_tgw)) + ' TGW(s)')
+    results = run_concurrently(
+        function=run,
+        list_of_kwargs=[{"index": index} for index in submit_order],
+        max_concurrency=max_concurrency
+    )
+    vpc_results = [None] * len(vpc_records)
+    for index, (vpc_result, _) in zip(submit_order, results):
+        vpc_results[index] = vpc_result
+    print(indent + keyword_for_log + 'ENDED: "' + aviatrix_action_definition["name"] + '": ' +
+          format_bulk_vpc_results(vpc_results=vpc_results) + '\n\n')
+    return vpc_results
+# END def run_bulk_vpc_action()
+
+
+def format_bulk_vpc_results(vpc_results=list()):
+    failed_vpc_results = [vpc_result for vpc_result in vpc_results if vpc_result["status"] != "SUCCESS"]
+    message = str(len(vpc_results) - len(failed_vpc_results)) + "/" + str(len(vpc_results)) + " VPC(s) succeeded"
+    if len(failed_vpc_results) > 0:
+        message += ". Failed VPC(s): " + "; ".join(
+            vpc_result["vpc_id"] + " (TGW: " + vpc_result["tgw_name"] + "): " + vpc_result["reason"]
+            for vpc_result in failed_vpc_results
+        )
+    return message
+# END def format_bulk_vpc_results()
+
+
+def _run_action_bulk_vpc(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    aviatrix_action="ATTACH",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    aviatrix_action_definition = get_aviatrix_action_definition(aviatrix_action=aviatrix_action)
+    vpc_records = parse_bulk_vpc_records(
+        resource_properties=resource_properties,
+        aviatrix_action_definition=aviatrix_action_definition,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    vpc_results = run_bulk_vpc_action(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        controller_version=controller_version,
+        vpc_records=vpc_records,
+        aviatrix_action_definition=aviatrix_action_definition,
+        max_concurrency=int(resource_properties.get("BulkConcurrencyParam", BULK_VPC_CONCURRENCY)),
+        max_concurrency_per_tgw=BULK_VPC_CONCURRENCY_PER_TGW,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+
+    summary = format_bulk_vpc_results(vpc_results=vpc_results)
+    if any(vpc_result["status"] != "SUCCESS" for vpc_result in vpc_results):
+        raise AviatrixException(
+            message='"' + aviatrix_action_definition["name"] + '" failed for some VPC(s). ' + summary
+        )
+    return {"vpc_results": vpc_results, "summary": summary}
+# END def _run_action_bulk_vpc()
+
+
+def _run_action_bulk_attach_vpc_to_aws_tgw(**kwargs):
+    return _run_action_bulk_vpc(aviatrix_action="ATTACH", **kwargs)
+# END def _run_action_bulk_attach_vpc_to_aws_tgw()
+
+
+def _run_action_bulk_detach_vpc_from_aws_tgw(**kwargs):
+    return _run_action_bulk_vpc(aviatrix_action="DETACH", **kwargs)
+# END def _run_action_bulk_detach_vpc_from_aws_tgw()
+
+
+def parse_dag_nodes(resource_properties=dict(), keyword_for_log="avx-lambda-function---", indent="    "):
+    """
+    :return: [{"id", "depends_on", "definition", "properties"}], in the order of "AviatrixActionGraphParam"
+    :raise AviatrixException: IF any node is invalid (see parse_batch_steps()), any node ID is duplicated, any
+                              dependency is unknown, OR the dependencies have a cycle
+    """
+    dag_steps = parse_batch_steps(
+        resource_properties=resource_properties,
+        list_param_name="AviatrixActionGraphParam",
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+
+    dag_nodes = list()
+    for i, (aviatrix_action_definition, node_properties) in enumerate(dag_steps):
+        depends_on = node_properties.get("DependsOnParam", list())
+        if isinstance(depends_on, str):
+            depends_on = [node_id.strip() for node_id in depends_on.split(",") if node_id.strip() != ""]
+        dag_nodes.append({
+            "id": str(node_properties.get("NodeIdParam", i + 1)),
+            "depends_on": [str(node_id) for node_id in depends_on],
+            "definition": aviatrix_action_definition,
+            "properties": node_properties
+        })
+    # END for
+
+    node_ids = [dag_node["id"] for dag_node in dag_nodes]
+    duplicated_node_ids = sorted(set(node_id for node_id in node_ids if node_ids.count(node_id) > 1))
+    if len(duplicated_node_ids) > 0:
+        raise AviatrixException(message='Error: Duplicated "NodeIdParam" in the DAG: ' + str(duplicated_node_ids))
+    for dag_node in dag_nodes:
+        unknown_node_ids = [node_id for node_id in dag_node["depends_on"] if node_id not in node_ids]
+        if len(unknown_node_ids) > 0:
+            raise AviatrixException(
+                message='Error: DAG node "' + dag_node["id"] + '" depends on unknown node(s): ' + str(unknown_node_ids)
+            )
+    # END for
+
+    ### Every node must be reachable in topological order, otherwise the remaining nodes form a cycle
+    remaining_dependencies = {dag_node["id"]: set(dag_node["depends_on"]) for dag_node in dag_nodes}
+    while len(remaining_dependencies) > 0:
+        ready_node_ids = [node_id for node_id, depends_on in remaining_dependencies.items() if len(depends_on) == 0]
+        if len(ready_node_ids) == 0:
+            raise AviatrixException(
+                message='Error: The DAG has a dependency cycle, so the following node(s) can never start: ' +
+                        str(sorted(remaining_dependencies.keys()))
+            )
+        for node_id in ready_node_ids:
+            del remaining_dependencies[node_id]
+        for depends_on in remaining_dependencies.values():
+            depends_on.difference_update(ready_node_ids)
+    # END while
+
+    return dag_nodes
+# END def parse_dag_nodes()
+
+
+def run_dag_nodes(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    dag_nodes=list(),
+    max_concurrency=DAG_CONCURRENCY,
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    Starts every node once all of its dependencies have succeeded, at most "max_concurrency" nodes at a time.
+    :param dag_nodes: The return value of parse_dag_nodes()
+    :return: [{"node_id", "action", "depends_on", "status", "reason", "start_ms", "latency_ms", "critical_path_ms"}],
+             in the order of "dag_nodes". "status" is "SUCCESS" || "FAILED" || "CANCELLED" (a dependency has failed)
+    """
+    node_results = dict()
+    dependent_node_ids = {dag_node["id"]: list() for dag_node in dag_nodes}
+    remaining_dependency_count = dict()
+    for dag_node in dag_nodes:
+        node_results[dag_node["id"]] = {
+            "node_id": dag_node["id"],
+            "action": dag_node["definition"]["name"],
+            "depends_on": dag_node["depends_on"],
+            "status": "PENDING",
+            "reason": "",
+            "start_ms": None,
+            "latency_ms": None,
+            "critical_path_ms": None
+        }
+        remaining_dependency_count[dag_node["id"]] = len(dag_node["depends_on"])
+        for node_id in dag_node["depends_on"]:
+            dependent_node_ids[node_id].append(dag_node["id"])
+    # END for
+    dag_nodes_by_id = {dag_node["id"]: dag_node for dag_node in dag_nodes}
+    dag_start_time = get_clock().time()
+
+    def run_node(dag_node):
+        print(indent + keyword_for_log + 'START: DAG node "' + dag_node["id"] + '": "' +
+              dag_node["definition"]["name"] + '"')
+        node_start_time = get_clock().time()
+        exception = None
+        try:
+            dag_node["definition"]["function"](
+                api_endpoint_url=api_endpoint_url,
+                CID=CID,
+                controller_version=controller_version,
+                resource_properties=dag_node["properties"],
+                keyword_for_log=keyword_for_log,
+                indent=indent + "    "
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            exception = e
+        # END try-except
+        print(indent + keyword_for_log + 'ENDED: DAG node "' + dag_node["id"] + '": "' +
+              dag_node["definition"]["name"] + '": ' + ("SUCCESS" if exception is None else "FAILED") + '\n\n')
+        return node_start_time, get_clock().time(), exception
+    # END def run_node()
+
+    def cancel_dependent_nodes(failed_node_id):
+        node_ids_to_cancel = list(dependent_node_ids[failed_node_id])
+        while len(node_ids_to_cancel) > 0:
+            node_id = node_ids_to_cancel.pop()
+            if node_results[node_id]["status"] != "PENDING":
+                continue
+            node_results[node_id]["status"] = "CANCELLED"
+            node_results[node_id]["reason"] = 'Node "' + failed_node_id + '" has failed'
+            node_ids_to_cancel.extend(dependent_node_ids[node_id])
+        # END while
+    # END def cancel_dependent_nodes()
+
+    max_workers = max(1, min(max_concurrency, len(dag_nodes)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running_nodes = dict()  # key: future  value: DAG node
+        for dag_node in dag_nodes:
+            if remaining_dependency_count[dag_node["id"]] == 0:
+                node_results[dag_node["id"]]["status"] = "RUNNING"
+                running_nodes[executor.submit(run_node, dag_node)] = dag_node
+        # END for
+
+        while len(running_nodes) > 0:
+            done, _ = concurrent.futures.wait(running_nodes, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                dag_node = running_nodes.pop(future)
+                node_start_time, node_end_time, exception = future.result()
+                node_result = node_results[dag_node["id"]]
+                node_result["start_ms"] = int((node_start_time - dag_start_time) * 1000)
+                node_result["latency_ms"] = int((node_end_time - node_start_time) * 1000)
+                node_result["critical_path_ms"] = node_result["latency_ms"] + max(
+                    [node_results[node_id]["critical_path_ms"] for node_id in dag_node["depends_on"]] + [0]
+                )
+
+                if exception is not None:
+                    node_result["status"] = "FAILED"
+                    node_result["reason"] = str(exception)
+                    cancel_dependent_nodes(failed_node_id=dag_node["id"])
+                    continue
+                # END if
+
+                node_result["status"] = "SUCCESS"
+                for node_id in dependent_node_ids[dag_node["id"]]:
+                    remaining_dependency_count[node_id] -= 1
+                    if remaining_dependency_count[node_id] == 0 and node_results[node_id]["status"] == "PENDING":
+                        node_results[node_id]["status"] = "RUNNING"
+                        running_nodes[executor.submit(run_node, dag_nodes_by_id[node_id])] = dag_nodes_by_id[node_id]
+                # END for
+            # END for
+        # END while
+    # END with
+
+    return [node_results[dag_node["id"]] for dag_node in dag_nodes]
+# END def run_dag_nodes()
+
+
+def get_dag_critical_path(node_results=list()):
+    """
+    :param node_results: The return value of run_dag_nodes()
+    :return: The node IDs of the longest chain of node latencies, from the first node to the last one
+    """
+    node_results_by_id = {node_result["node_id"]: node_result for node_result in node_results}
+    finished_node_results = [node_result for node_result in node_results if node_result["critical_path_ms"] is not None]
+    if len(finished_node_results) == 0:
+        return list()
+
+    critical_path = list()
+    node_result = max(finished_node_results, key=lambda node_result: node_result["critical_path_ms"])
+    while node_result is not None:
+        critical_path.insert(0, node_result["node_id"])
+        node_result = max(
+            [node_results_by_id[node_id] for node_id in node_result["depends_on"]],
+            key=lambda node_result: node_result["critical_path_ms"],
+            default=None
+        )
+    # END while
+    return critical_path
+# END def get_dag_critical_path()
+
+
+def format_dag_node_results(node_results=list()):
+    node_results_by_id = {node_result["node_id"]: node_result for node_result in node_results}
+    critical_path = get_dag_critical_path(node_results=node_results)
+    summary = "; ".join(
+        'Node "' + node_result["node_id"] + '" ' + node_result["action"] + ": " + node_result["status"] +
+        (" (" + str(node_result["latency_ms"]) + " ms, critical path " + str(node_result["critical_path_ms"]) +
+         " ms)" if node_result["latency_ms"] is not None else "") +
+        (" " + node_result["reason"] if node_result["reason"] else "")
+        for node_result in node_results
+    )
+    if len(critical_path) > 0:
+        summary += "; Critical path: " + " -> ".join(critical_path) + " (" + \
+                   str(node_results_by_id[critical_path[-1]]["critical_path_ms"]) + " ms)"
+    return summary
+# END def format_dag_node_results()
+
+
+def _run_action_dag(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version=None,
+    resource_properties=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    dag_nodes = parse_dag_nodes(
+        resource_properties=resource_properties,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    node_results = run_dag_nodes(
+        api_endpoint_url=api_endpoint_url,
+        CID=CID,
+        controller_version=controller_version,
+        dag_nodes=dag_nodes,
+        max_concurrency=int(resource_properties.get("DagConcurrencyParam", DAG_CONCURRENCY)),
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+
+    summary = format_dag_node_results(node_results=node_results)
+    if any(node_result["status"] != "SUCCESS" for node_result in node_results):
+        raise AviatrixException(
+            message="DAG failed. " + summary
+        )
+    return {
+        "dag_nodes": node_results,
+        "critical_path": get_dag_critical_path(node_results=node_results),
+        "summary": summary
+    }
+# END def _run_action_dag()
+
+
+''' Aviatrix Action Registry
+Description:
+    * Every supported "AviatrixActionParam" declares the preflight steps and the "ResourceProperties" it requires,
+      so _lambda_handler() runs ONLY the controller calls the action needs.
+    * PREFLIGHT_GET_CONTROLLER_VERSION is declared by "CreateAccessAccount" ONLY, whose API payload depends on the
+      controller version.
+    * The initialized check is declared by the actions which may run against a freshly launched controller. The other
+      actions operate on a TGW/account which can only exist on an initialized controller.
+'''
+register_aviatrix_action(
+    name="CREATE",
+    function=_run_action_create_aws_tgw,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN, PREFLIGHT_CHECK_INITIALIZED],
+    required_params=["AccessAccountNameParam", "TgwRegionNameParam", "TgwNameParam", "AwsSideASNumberParam"]
+)
+register_aviatrix_action(
+    name="DELETE",
+    function=_run_action_delete_aws_tgw,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["TgwNameParam"]
+)
+register_aviatrix_action(
+    name="ATTACH",
+    function=_run_action_attach_vpc_to_aws_tgw,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["VpcAccessAccountNameParam", "VpcRegionNameParam", "VpcIdParam", "TgwNameParam",
+                     "RouteDomainNameParam", "SubnetListParam"]
+)
+register_aviatrix_action(
+    name="DETACH",
+    function=_run_action_detach_vpc_from_aws_tgw,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["VpcIdParam", "TgwNameParam"]
+)
+register_aviatrix_action(
+    name="CreateAccessAccount",
+    function=_run_action_create_access_account,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN, PREFLIGHT_CHECK_INITIALIZED,
+                     PREFLIGHT_GET_CONTROLLER_VERSION],
+    required_params=["AccessAccountNameParam", "AWS_Account_ID", "AviatrixAppRoleArnParam", "AviatrixEc2RoleArnParam"]
+)
+register_aviatrix_action(
+    name="DeleteAviatrixAccessAccount",
+    function=_run_action_delete_access_account,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["AccessAccountNameParam"]
+)
+register_aviatrix_action(
+    name="BuildNewRouteDomain",
+    function=_run_action_build_new_route_domain,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["TgwRegionNameParam", "TgwNameParam", "NewRouteDomainNameParam", "IsFirewallDomainParam",
+                     "ListOfRouteDomainsToConnectParam"]
+)
+register_aviatrix_action(
+    name="TeardownRouteDomain",
+    function=_run_action_teardown_route_domain,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["TgwNameParam", "SourceRouteDomainNameParam", "ListOfRouteDomainsToDisconnect"]
+)
+register_aviatrix_action(
+    name="BULK_ATTACH",
+    function=_run_action_bulk_attach_vpc_to_aws_tgw,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["VpcListParam"]
+)
+register_aviatrix_action(
+    name="BULK_DETACH",
+    function=_run_action_bulk_detach_vpc_from_aws_tgw,
+    preflight_steps=[PREFLIGHT_WAIT_FOR_API_SERVER, PREFLIGHT_LOGIN],
+    required_params=["VpcListParam"]
+)
+register_aviatrix_action(
+    name=BATCH_ACTION_NAME,
+    function=_run_action_batch,
+    preflight_steps=list(),  # The union of the preflight steps of the listed actions, see get_batch_preflight_steps()
+    required_params=["AviatrixActionListParam"]
+)
+register_aviatrix_action(
+    name=DAG_ACTION_NAME,
+    function=_run_action_dag,
+    preflight_steps=list(),  # The union of the preflight steps of the nodes, see get_required_preflight_steps()
+    required_params=["AviatrixActionGraphParam"]
+)
 
 
 def print_lambda_event(
@@ -666,10 +2707,10 @@ def _build_response_for_cloudformation_stack(
     response_for_cf['PhysicalResourceId'] = context.log_stream_name
 
 
-    if 'SUCCESS' is status.upper():
+    if 'SUCCESS' == status.upper():
         # response_for_cf['NoEcho'] = False  # Optional
         response_for_cf['Data'] = data
-    elif 'FAILED' is status.upper():
+    elif 'FAILED' == status.upper():
         response_for_cf['Reason'] = reason
 
 
@@ -679,6 +2720,78 @@ def _build_response_for_cloudformation_stack(
 # END def _build_response_for_cloudformation_stack
 
 
+def send_response_to_cloudformation(
+    event=dict(),
+    response_for_cloudformation=dict(),
+    retry_count=CLOUDFORMATION_RESPONSE_RETRY_COUNT,
+    keyword_for_log="avx-lambda-function---",
+    indent=""
+        ):
+    """
+    PUTs the response to the pre-signed S3 URL "ResponseURL" through the pooled HTTP session, with bounded retries.
+    A response which is never delivered leaves the stack "IN_PROGRESS" for up to an hour.
+
+    Reference:
+        https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/crpg-ref-responses.html
+
+    :return: True IF CloudFormation has received the response
+    """
+    print(indent + keyword_for_log + "START: Send response to CloudFormation")
+    start_time = get_clock().time()
+    body = json.dumps(response_for_cloudformation)  # json.dumps() converts dict() to string
+    invocation_deadline = get_invocation_deadline()
+    last_err_msg = ""
+
+    for i in range(retry_count):
+        remaining_lambda_time = invocation_deadline.get_remaining_lambda_time()
+        if remaining_lambda_time <= 0:
+            last_err_msg = "Lambda has no time left to send the response"
+            break
+
+        try:
+            response = _send_http_request(
+                request_method="PUT",
+                url=event["ResponseURL"],
+                data=body,
+                timeout=(
+                    min(HTTP_CONNECT_TIMEOUT, remaining_lambda_time),
+                    min(CLOUDFORMATION_RESPONSE_TIMEOUT, remaining_lambda_time)
+                )
+            )
+            if 200 == response.status_code:
+                print(
+                    indent + keyword_for_log + "    Delivered response to CloudFormation in " +
+                    "{0:.0f}".format((get_clock().time() - start_time) * 1000) + " ms, attempt(s): " + str(i + 1)
+                )
+                print(indent + keyword_for_log + "ENDED: Send response to CloudFormation\n\n")
+                return True
+            # END if
+
+            last_err_msg = "HTTP response code: " + str(response.status_code) + ", " + str(response.text)
+            if 400 <= response.status_code < 500:
+                break  # e.g. 403 for an expired pre-signed URL, which will NOT succeed on retry
+        except requests.exceptions.RequestException as e:
+            last_err_msg = str(e)
+        # END try-except
+
+        print(indent + keyword_for_log + "    WARNING: Failed to send response to CloudFormation: " + last_err_msg)
+        if i + 1 >= retry_count:
+            break
+        wait_time_before_retry = 0.5 * pow(2, i)
+        if invocation_deadline.get_remaining_lambda_time() <= wait_time_before_retry + HTTP_MIN_REQUEST_TIME:
+            break  # Do NOT retry without the backoff, e.g. against a throttled S3 endpoint
+        get_clock().sleep(wait_time_before_retry)
+    # END for
+
+    print(
+        indent + keyword_for_log + "    ERROR: Failed to deliver response to CloudFormation after " +
+        "{0:.0f}".format((get_clock().time() - start_time) * 1000) + " ms. The last error is: " + last_err_msg
+    )
+    print(indent + keyword_for_log + "ENDED: Send response to CloudFormation\n\n")
+    return False
+# END def send_response_to_cloudformation()
+
+
 def wait_until_controller_api_server_is_ready(
     ucc_public_ip="123.123.123.123",
     api_version="v1",
@@ -692,26 +2805,29 @@ def wait_until_controller_api_server_is_ready(
     payload = {
         "action": "is_server_ready"  # The value here does not matter
     }
-    remaining_wait_time = total_wait_time
-
-    ''' Variable Description: (time_spent_for_requests_lib_timeout)
-    Description: 
-        * This value represents how many seconds for "requests" lib to timeout by default. 
-    Detail: 
-        * The value 20 seconds is actually a rough number which is not  
-        * If there is a connection error and causing timeout when 
-          invoking--> requests.get(xxx), it takes about 20 seconds for requests.get(xxx) to throw timeout exception.
-        * When calculating the remaining wait time, this value is considered.
     '''
-    time_spent_for_requests_lib_timeout = 20
+    The remaining wait time is measured with the clock, since every request has a timeout, which is capped by both
+    the remaining wait time and the invocation deadline (see InvocationDeadline.get_http_timeout()).
+
+    The failed polls do NOT count against the circuit breaker (a booting controller is expected to fail them), but a
+    controller whose breaker is open fails fast here too, instead of being polled for "total_wait_time".
+    '''
+    circuit_breaker = get_circuit_breaker(api_endpoint_url=api_endpoint_url)
+    circuit_breaker.before_request()
+    wait_start_time = get_clock().time()
+    wait_deadline = wait_start_time + total_wait_time
     response_status_code = -1
     last_err_msg = ""
-    while remaining_wait_time > 0:
+    while True:
         try:
-            response = requests.get(
+            connect_timeout, read_timeout = get_invocation_deadline().get_http_timeout()
+            remaining_wait_time = max(wait_deadline - get_clock().time(), HTTP_MIN_REQUEST_TIME)
+            response = _send_http_request(
+                request_method="GET",
                 url=api_endpoint_url,
                 params=payload,
-                verify=False
+                verify=False,
+                timeout=(min(connect_timeout, remaining_wait_time), min(read_timeout, remaining_wait_time))
             )
             if response is not None:
                 # pydict = response.json()
@@ -727,44 +2843,193 @@ def wait_until_controller_api_server_is_ready(
                         str(response_status_code) + ". "
                         "API Server is ready!"
                     )
+                    circuit_breaker.record_success()
                     return True
             # END outer if
 
+        except AviatrixException:
+            raise  # The invocation deadline has passed
         except Exception as e:
             print(indent + keyword_for_log + "Aviatrix Controller " + api_endpoint_url + " is still not available")
             last_err_msg = str(e)
             pass  # Purposely ignore the exception by displaying the error message only since it's retry
         # END try-except
 
-        if 404 == response_status_code:
-            err_msg = "Error: Aviatrix Controller returns error code: 404 for " + api_endpoint_url + \
-                      " Please check if the API version or API endpoint route is correct."
-            raise AviatrixException(
-                message=err_msg,
+        if 404 == response_status_code:
+            err_msg = "Error: Aviatrix Controller returns error code: 404 for " + api_endpoint_url + \
+                      " Please check if the API version or API endpoint route is correct."
+            raise AviatrixException(
+                message=err_msg,
+            )
+        # END if
+
+        # At this point, server status code is NOT 200, or some other error has occurred. Retrying...
+
+        remaining_wait_time = wait_deadline - get_clock().time()
+        print(indent + keyword_for_log + "Remaining wait time: " + "{0:.0f}".format(remaining_wait_time) + " second(s)")
+        if remaining_wait_time < interval_wait_time + HTTP_MIN_REQUEST_TIME:
+            break
+        if not get_invocation_deadline().can_finish_before_deadline(interval_wait_time + HTTP_MIN_REQUEST_TIME):
+            print(indent + keyword_for_log + "Not enough time left before the invocation deadline to retry")
+            break
+        # print(indent + keyword_for_log + "Wait for " + str(interval_wait_time) + " second(s) before next retry...")
+        get_clock().sleep(interval_wait_time)
+    # END while
+
+    # TIME IS UP!! At this point, server is still not available or not reachable
+    circuit_breaker.record_failure()
+    err_msg = "Aviatrix Controller " + api_endpoint_url + " is still not available after " + \
+              "{0:.0f}".format(get_clock().time() - wait_start_time) + " seconds retry. " + \
+              "Server status code is: " + str(response_status_code) + ". " + \
+              "The last retry message (if any) is: " + last_err_msg
+    raise AviatrixException(
+        message=err_msg,
+    )
+# END wait_until_controller_api_server_is_ready()
+
+
+def get_http_session(
+    url="https://123.123.123.123/v1/api",
+    keyword_for_log="avx-lambda-function---",
+    indent=""
+        ):
+    """
+    Returns the pooled "requests.Session" for the host of "url". The same session object is returned for every
+    call to the same host until it has been idle for longer than HTTP_KEEP_ALIVE_IDLE_TIMEOUT.
+    """
+    if not HTTP_KEEP_ALIVE:
+        return _create_http_session(keep_alive=False)
+
+    parsed_url = urlparse(url)
+    pool_key = parsed_url.scheme + "://" + parsed_url.netloc
+    current_time = get_clock().time()
+
+    with _http_sessions_lock:
+        pooled_session = _http_sessions.get(pool_key)
+        if pooled_session is not None and \
+           current_time - pooled_session["last_used_time"] > HTTP_KEEP_ALIVE_IDLE_TIMEOUT:
+            print(indent + keyword_for_log + "Pooled HTTP session for " + pool_key + " has been idle for too long. "
+                  "Re-creating the session...")
+            pooled_session = None
+        # END if
+
+        if pooled_session is None:
+            pooled_session = {
+                "session": _create_http_session(keep_alive=True),
+                "last_used_time": current_time
+            }
+            _http_sessions[pool_key] = pooled_session
+        # END if
+
+        pooled_session["last_used_time"] = current_time
+        return pooled_session["session"]
+    # END with
+# END def get_http_session()
+
+
+def _create_http_session(keep_alive=True, pool_maxsize=None):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE if pool_maxsize is None else pool_maxsize,
+        max_retries=0  # Retry is handled by _send_aviatrix_api()
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+# END def _create_http_session()
+
+
+def _send_http_request(
+    request_method="GET",
+    url="https://123.123.123.123/v1/api",
+    params=None,
+    data=None,
+    verify=True,
+    timeout=None
+        ):
+    """
+    :param timeout: (connect timeout, read timeout) in second(s). By default, the timeouts are carved from the time
+                    left before the invocation deadline
+    """
+    if timeout is None:
+        timeout = get_invocation_deadline().get_http_timeout()
+
+    session = get_http_session(url=url)
+    try:
+        response = session.request(
+            method=request_method.upper(),
+            url=url,
+            params=params,
+            data=data,
+            verify=verify,
+            timeout=timeout
+        )
+    finally:
+        if not HTTP_KEEP_ALIVE:
+            session.close()
+    # END try-finally
+    return response
+# END def _send_http_request()
+
+
+def _send_aviatrix_api(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    request_method="POST",
+    payload=dict(),
+    retry_count=5,
+    keyword_for_log="avx-lambda-function---",
+    indent=""
+        ):
+    """
+    Sends the Aviatrix API with retry. IF the API returns an invalid/expired CID result, and the CID came from
+    get_cid(), this function logs in again and replays the API call once with the new CID.
+    """
+    payload = _replace_expired_cid_in_payload(api_endpoint_url=api_endpoint_url, payload=payload)
+
+    response = _send_aviatrix_api_with_retry(
+        api_endpoint_url=api_endpoint_url,
+        request_method=request_method,
+        payload=payload,
+        retry_count=retry_count,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+
+    if _is_version_mismatch_response(response=response):
+        print(indent + keyword_for_log + "WARNING: API response suggests a controller version mismatch.")
+        invalidate_preflight_cache(api_endpoint_url=api_endpoint_url, keyword_for_log=keyword_for_log, indent=indent)
+    # END if
+
+    if "CID" in payload and _is_invalid_cid_response(response=response):
+        print(indent + keyword_for_log + "WARNING: CID is invalid or expired. Login again and replay the API call...")
+        new_CID = _relogin_for_expired_cid(
+            api_endpoint_url=api_endpoint_url,
+            expired_CID=payload["CID"],
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+        if new_CID is not None:
+            payload = dict(payload)
+            payload["CID"] = new_CID
+            response = _send_aviatrix_api_with_retry(
+                api_endpoint_url=api_endpoint_url,
+                request_method=request_method,
+                payload=payload,
+                retry_count=retry_count,
+                keyword_for_log=keyword_for_log,
+                indent=indent
             )
         # END if
+    # END if
 
-        # At this point, server status code is NOT 200, or some other error has occurred. Retrying...
-
-        remaining_wait_time = remaining_wait_time - interval_wait_time - time_spent_for_requests_lib_timeout
-        print(indent + keyword_for_log + "Remaining wait time: " + str(remaining_wait_time) + " second(s)")
-        if remaining_wait_time > 0:
-            # print(indent + keyword_for_log + "Wait for " + str(interval_wait_time) + " second(s) before next retry...")
-            time.sleep(interval_wait_time)
-    # END while
-
-    # TIME IS UP!! At this point, server is still not available or not reachable
-    err_msg = "Aviatrix Controller " + api_endpoint_url + " is still not available after " + \
-              str(total_wait_time) + " seconds retry. " + \
-              "Server status code is: " + str(response_status_code) + ". " + \
-              "The last retry message (if any) is: " + last_err_msg
-    raise AviatrixException(
-        message=err_msg,
-    )
-# END wait_until_controller_api_server_is_ready()
+    return response
+# END def _send_aviatrix_api()
 
 
-def _send_aviatrix_api(
+def _send_aviatrix_api_with_retry(
     api_endpoint_url="https://123.123.123.123/v1/api",
     request_method="POST",
     payload=dict(),
@@ -772,29 +3037,47 @@ def _send_aviatrix_api(
     keyword_for_log="avx-lambda-function---",
     indent=""
         ):
+    """
+    Every failed attempt is classified by classify_failure() with the retry policy of the API action:
+        + FAILURE_TRANSIENT: retry (with backoff)
+        + FAILURE_PERMANENT: fail immediately, since a retry would fail the same way
+        + FAILURE_AMBIGUOUS: a non-idempotent API may have been applied by the controller, so the state is verified
+                             first. Retry ONLY IF the state shows that the API has NOT been applied.
+    """
     response = None
     responses = list()
     request_type = request_method.upper()
-    response_status_code = -1
+    retry_policy = get_aviatrix_api_retry_policy(action=payload.get("action", ""), request_method=request_type)
+
+    if request_type != "GET" and request_type != "POST":
+        lambda_failure_reason = "ERROR: Bad HTTPS request type: " + request_method
+        print(keyword_for_log + lambda_failure_reason)
+        raise AviatrixException(
+            message=lambda_failure_reason,
+        )
+    # END if
 
+    circuit_breaker = get_circuit_breaker(api_endpoint_url=api_endpoint_url)
+    retry_budget = get_retry_budget()
     for i in range(retry_count):
+        response = None
+        exception = None
+        circuit_breaker.before_request()
+        request_start_time = get_clock().time()
         try:
             if request_type == "GET":
-                response = requests.get(url=api_endpoint_url, params=payload, verify=False)
-                response_status_code = response.status_code
-            elif request_type == "POST":
-                response = requests.post(url=api_endpoint_url, data=payload, verify=False)
-                response_status_code = response.status_code
+                response = _send_http_request(request_method="GET", url=api_endpoint_url, params=payload, verify=False)
             else:
-                lambda_failure_reason = "ERROR: Bad HTTPS request type: " + request_method
-                print(keyword_for_log + lambda_failure_reason)
-                return lambda_failure_reason
+                response = _send_http_request(request_method="POST", url=api_endpoint_url, data=payload, verify=False)
             # END if-else
 
             responses.append(response)  # For error message/debugging purposes
+        except AviatrixException:
+            raise  # The invocation deadline has passed
         except requests.exceptions.ConnectionError as e:
             print(indent + keyword_for_log + "WARNING: Oops, it looks like the server is not responding...")
             responses.append(str(e))  # For error message/debugging purposes
+            exception = e
             # hopefully it keeps retrying...
 
         except Exception as e:
@@ -804,64 +3087,204 @@ def _send_aviatrix_api(
             lambda_failure_reason = "Oops! Aviatrix Lambda caught an exception! The traceback message is: \n" + str(traceback_msg)
             print(keyword_for_log + lambda_failure_reason)
             responses.append(str(traceback_msg))  # For error message/debugging purposes
+            exception = e
         # END try-except
 
-        finally:
-            if 200 == response_status_code:  # Successfully send HTTP request to controller Apache2 server
-                    return response
-            elif 404 == response_status_code:
-                lambda_failure_reason = "ERROR: Oops, 404 Not Found. Please check your URL or route path..."
-                print(indent + keyword_for_log + lambda_failure_reason)
-            # END IF-ELSE: Checking HTTP response code
+        if i > 0:
+            retry_budget.add_retry_time(elapsed_time=get_clock().time() - request_start_time)
 
-            '''
-            IF the code flow ends up here, it means the current HTTP request have some issue 
-            (exception occurs or HTTP response code is NOT 200)
-            '''
-
-            '''
-            retry     --> 5
-            wait_time -->    1, 2, 4, 8 (no 16 because when i == , there will be NO iteration)
-            i         --> 0, 1, 2, 3, 4
-            '''
-            if i+1 < retry_count:
-                print(indent + keyword_for_log + "START: Wait until retry")
-                print(indent + keyword_for_log + "    i == " + str(i))
-                wait_time_before_retry = pow(2, i)
-                print(
-                    indent + keyword_for_log + "    Wait for: " + str(wait_time_before_retry) +
-                    " second(s) until next retry"
-                )
-                time.sleep(wait_time_before_retry)
-                print(indent + keyword_for_log + "ENDED: Wait until retry  \n\n")
-                # continue next iteration
-            else:
-                lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. Max retry exceeded. ' + \
-                                        'The following includes all retry responses: ' + \
-                                        str(responses)
+        if response is not None and 200 == response.status_code:  # Successfully send HTTP request to controller Apache2 server
+            circuit_breaker.record_success()
+            return response
+        elif response is not None and 404 == response.status_code:
+            lambda_failure_reason = "ERROR: Oops, 404 Not Found. Please check your URL or route path..."
+            print(indent + keyword_for_log + lambda_failure_reason)
+        # END IF-ELSE: Checking HTTP response code
+
+        '''
+        IF the code flow ends up here, it means the current HTTP request have some issue
+        (exception occurs or HTTP response code is NOT 200)
+        '''
+
+        failure_type = classify_failure(
+            response=response,
+            exception=exception,
+            is_idempotent=retry_policy["idempotent"]
+        )
+        print(indent + keyword_for_log + "Failure type: " + failure_type)
+        if FAILURE_PERMANENT != failure_type:
+            circuit_breaker.record_failure()
+        elif response is not None:
+            circuit_breaker.record_success()  # The controller is up, but has rejected the request
+
+        if FAILURE_PERMANENT == failure_type:
+            lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. The failure is permanent, so it is ' + \
+                                    'not retried. The following includes all responses: ' + \
+                                    str(responses)
+            raise AviatrixException(
+                message=lambda_failure_reason,
+            )
+        elif FAILURE_AMBIGUOUS == failure_type:
+            is_applied = _verify_aviatrix_api_state(
+                api_endpoint_url=api_endpoint_url,
+                payload=payload,
+                retry_policy=retry_policy,
+                keyword_for_log=keyword_for_log,
+                indent=indent + "    "
+            )
+            if is_applied is True:
+                return _build_verified_aviatrix_api_response(payload=payload, retry_policy=retry_policy)
+            elif is_applied is None:
+                lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API "' + str(payload.get("action")) + \
+                                        '". The request may or may not have been applied by the controller, and ' + \
+                                        'the state can not be verified, so it is not retried to avoid applying ' + \
+                                        'it twice. Please check the controller. ' + \
+                                        'The following includes all responses: ' + str(responses)
                 raise AviatrixException(
                     message=lambda_failure_reason,
                 )
-        # END try-except-finally
+            # END if-else: At this point, the state shows the request has NOT been applied, so it is safe to retry
+        # END if-else: Checking failure type
+
+        '''
+        retry     --> 5
+        wait_time -->    [0, 1], [0, 2], [0, 4], [0, 8] (no 16 because when i == 4, there will be NO iteration)
+        i         -->  0,      1,      2,      3,      4
+        '''
+        wait_time_before_retry = get_retry_wait_time(i=i)
+        if i+1 < retry_count and \
+           not get_invocation_deadline().can_finish_before_deadline(wait_time_before_retry + HTTP_MIN_REQUEST_TIME):
+            lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. Not enough time left before the ' + \
+                                    'invocation deadline to retry. ' + \
+                                    'The following includes all retry responses: ' + \
+                                    str(responses)
+            raise AviatrixException(
+                message=lambda_failure_reason,
+            )
+        elif i+1 < retry_count and not retry_budget.try_spend(wait_time=wait_time_before_retry):
+            lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. The retry budget of the invocation is ' + \
+                                    'spent (' + retry_budget.get_usage_message() + '). ' + \
+                                    'The following includes all retry responses: ' + \
+                                    str(responses)
+            raise AviatrixException(
+                message=lambda_failure_reason,
+            )
+        elif i+1 < retry_count:
+            print(indent + keyword_for_log + "START: Wait until retry")
+            print(indent + keyword_for_log + "    i == " + str(i))
+            print(
+                indent + keyword_for_log + "    Wait for: " +
+                "{0:.2f}".format(wait_time_before_retry) + " second(s) until next retry"
+            )
+            get_clock().sleep(wait_time_before_retry)
+            print(indent + keyword_for_log + "ENDED: Wait until retry  \n\n")
+            # continue next iteration
+        else:
+            lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. Max retry exceeded. ' + \
+                                    'The following includes all retry responses: ' + \
+                                    str(responses)
+            raise AviatrixException(
+                message=lambda_failure_reason,
+            )
+        # END if-else
     # END for
 
     return response  # IF the code flow ends up here, the response might have some issues
-# END def _send_aviatrix_api()
+# END def _send_aviatrix_api_with_retry()
+
+
+def classify_failure(response=None, exception=None, is_idempotent=True):
+    """
+    :param response: The response object from "requests" (None IF the request has raised "exception")
+    :return: FAILURE_TRANSIENT || FAILURE_PERMANENT || FAILURE_AMBIGUOUS
+    """
+    if exception is not None:
+        ### The request has never reached the controller, so it is safe to retry any API
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            return FAILURE_TRANSIENT
+        if isinstance(exception, requests.exceptions.ConnectionError) and \
+           "NewConnectionError" in repr(exception.args):
+            return FAILURE_TRANSIENT
+
+        ### The connection broke (OR the read timed out) after the request may have reached the controller
+        if isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return FAILURE_TRANSIENT if is_idempotent else FAILURE_AMBIGUOUS
+
+        ### Any other exception (invalid URL, bug, ...) would be raised again by a retry
+        return FAILURE_PERMANENT
+    # END if
+
+    status_code = response.status_code
+    if status_code == 408 or status_code == 429 or status_code == 503:
+        return FAILURE_TRANSIENT  # The controller has NOT processed the request
+    if 400 <= status_code < 500:
+        return FAILURE_PERMANENT  # 400, 401, 403, 404, 405, ... (e.g. a wrong API version or route)
+    if status_code >= 500:
+        return FAILURE_TRANSIENT if is_idempotent else FAILURE_AMBIGUOUS  # 500, 502, 504 may have been processed
+    return FAILURE_TRANSIENT
+# END def classify_failure()
+
+
+def _is_invalid_cid_response(response=None):
+    """
+    The controller responds 200 with {"return": false, "reason": "CID is invalid or expired."} for a bad CID
+    """
+    try:
+        py_dict = response.json()
+    except Exception:  # pylint: disable=broad-except
+        return False  # NOT a JSON response (or NOT a response object at all)
+
+    if not isinstance(py_dict, dict) or py_dict.get("return") is not False:
+        return False
+
+    reason = str(py_dict.get("reason", "")).lower()
+    return "cid" in reason and ("invalid" in reason or "expired" in reason)
+# END def _is_invalid_cid_response()
+
+
+def _is_version_mismatch_response(response=None):
+    """
+    The controller responds 200 with {"return": false, "reason": "valid action required"} for an API which is not
+    supported by its version. Other reasons (even ones which mention a version) are ordinary API errors.
+    """
+    try:
+        py_dict = response.json()
+    except Exception:  # pylint: disable=broad-except
+        return False  # NOT a JSON response (or NOT a response object at all)
+
+    if not isinstance(py_dict, dict) or py_dict.get("return") is not False:
+        return False
+
+    reason = str(py_dict.get("reason", "")).lower()
+    return "valid action required" in reason
+# END def _is_version_mismatch_response()
+
+
+def _build_payload_for_login(
+    username="admin",
+    password="**********"
+        ):
+    return {
+        "action": "login",
+        "username": username,
+        "password": password
+    }
+# END def _build_payload_for_login()
 
 
 def login(
     api_endpoint_url="https://123.123.123.123/v1/api",
     username="admin",
     password="**********",
+    retry_count=5,
     keyword_for_log="avx-lambda-function---",
     indent="    "
         ):
     request_method = "POST"
-    data = {
-        "action": "login",
-        "username": username,
-        "password": password
-    }
+    data = _build_payload_for_login(
+        username=username,
+        password=password
+    )
     payload_with_hidden_password = dict(data)
     payload_with_hidden_password["password"] = "************"
 
@@ -872,72 +3295,327 @@ def login(
         str(json.dumps(obj=payload_with_hidden_password, indent=4))
     )
 
-    response = _send_aviatrix_api(
-        api_endpoint_url=api_endpoint_url,
-        request_method=request_method,
-        payload=data,
-        keyword_for_log=keyword_for_log,
-        indent=indent + "    "
-    )
-    return response
-# END def set_admin_email()
+    response = _send_aviatrix_api(
+        api_endpoint_url=api_endpoint_url,
+        request_method=request_method,
+        payload=data,
+        retry_count=retry_count,
+        keyword_for_log=keyword_for_log,
+        indent=indent + "    "
+    )
+    return response
+# END def set_admin_email()
+
+
+def verify_aviatrix_api_response_login(response=None, keyword_for_log="avx-lambda-function---", indent="    "):
+    py_dict = response.json()
+    print(indent + keyword_for_log + "Aviatrix API response --> " + str(py_dict))
+
+    ### Verify if HTTP response code is 200
+    response_code = response.status_code  # expect to be 200
+    if response_code is not 200:
+        err_msg = "Fail to login Aviatrix controller. " \
+                  "Expected HTTP response code is 200. However the actual " \
+                  "response code is: " + str(response_code)
+        raise AviatrixException(
+            message=err_msg,
+        )
+    # END if
+
+    ### Verify if API response returns True
+    api_return_boolean = py_dict["return"]
+    if api_return_boolean is not True:
+        err_msg = "Fail to login Aviatrix controller. API response is: " + str(py_dict)
+        raise AviatrixException(
+            message=err_msg,
+        )
+    # END if
+
+    # At this point, py_dict["return"] is True
+
+    ### Verify if able to find expected string from API response
+    api_return_msg = py_dict["results"]
+    expected_string = "authorized successfully"
+    if (expected_string in api_return_msg) is False:
+        err_msg = "Fail to login Aviatrix controller. API actual return message is: " + \
+                  str(py_dict) + \
+                  " The string we expect to find is: " + \
+                  expected_string
+
+        raise AviatrixException(
+            message=err_msg,
+        )
+    # END if
+# END def verify_aviatrix_api_response_login()
+
+
+def get_cid(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    username="admin",
+    password="**********",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    Returns the cached CID for (controller host, username) IF it is younger than CID_CACHE_TTL, otherwise invokes
+    login() and caches the new CID.
+    """
+    with _cid_cache_lock:
+        CID = get_cached_cid(
+            api_endpoint_url=api_endpoint_url,
+            username=username,
+            password=password,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+        if CID is not None:
+            return CID
+
+        return _login_and_cache_cid(
+            api_endpoint_url=api_endpoint_url,
+            username=username,
+            password=password,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+    # END with
+# END def get_cid()
+
+
+def get_cached_cid(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    username="admin",
+    password="**********",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    Returns the cached CID for (controller host, username), OR None IF there is no CID younger than CID_CACHE_TTL
+    """
+    cache_key = (urlparse(api_endpoint_url).netloc, username)
+
+    with _cid_cache_lock:
+        cached_session = _cid_cache.get(cache_key)
+        if cached_session is not None and \
+           cached_session["password"] == password and \
+           get_clock().time() - cached_session["login_time"] < CID_CACHE_TTL:
+            print(indent + keyword_for_log + "Reuse the cached CID of a previous login to " + cache_key[0])
+            return cached_session["CID"]
+        # END if
+    # END with
+
+    return None
+# END def get_cached_cid()
+
+
+def try_optimistic_login(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    username="admin",
+    password="**********",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    Tries to login ONCE (no retry), without waiting for the API server to be ready first.
+    :return: The new CID, OR None IF the API server is not ready (connection error OR non-200 response)
+    :raise AviatrixException: IF the API server is ready, but the login has failed (e.g. wrong password)
+    """
+    try:
+        response = login(
+            api_endpoint_url=api_endpoint_url,
+            username=username,
+            password=password,
+            retry_count=1,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+    except AviatrixException as e:
+        print(indent + keyword_for_log + "Optimistic login did not reach a ready API server: " + str(e))
+        return None
+    # END try-except
+
+    return _cache_cid_from_login_response(
+        api_endpoint_url=api_endpoint_url,
+        username=username,
+        password=password,
+        response=response,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+# END def try_optimistic_login()
+
+
+def _login_and_cache_cid(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    username="admin",
+    password="**********",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    with _cid_cache_lock:
+        response = login(
+            api_endpoint_url=api_endpoint_url,
+            username=username,
+            password=password,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+        return _cache_cid_from_login_response(
+            api_endpoint_url=api_endpoint_url,
+            username=username,
+            password=password,
+            response=response,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+    # END with
+# END def _login_and_cache_cid()
+
+
+def _cache_cid_from_login_response(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    username="admin",
+    password="**********",
+    response=None,
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    cache_key = (urlparse(api_endpoint_url).netloc, username)
+
+    verify_aviatrix_api_response_login(response=response, keyword_for_log=keyword_for_log, indent=indent)
+    CID = response.json()["CID"]
+
+    with _cid_cache_lock:
+        expired_CIDs = set()
+        if cache_key in _cid_cache:
+            expired_CIDs = _cid_cache[cache_key]["expired_CIDs"]
+            expired_CIDs.add(_cid_cache[cache_key]["CID"])
+        # END if
+
+        _cid_cache[cache_key] = {
+            "CID": CID,
+            "password": password,  # Required to login again transparently, and only kept in the Lambda memory
+            "login_time": get_clock().time(),
+            "expired_CIDs": expired_CIDs
+        }
+    # END with
+    return CID
+# END def _cache_cid_from_login_response()
+
+
+def _relogin_for_expired_cid(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    expired_CID="ABCD1234",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    Returns a new CID to replace "expired_CID", OR None IF "expired_CID" did not come from get_cid()
+    """
+    controller_host = urlparse(api_endpoint_url).netloc
+
+    with _cid_cache_lock:
+        for cache_key, cached_session in _cid_cache.items():
+            if cache_key[0] != controller_host:
+                continue
+            if expired_CID in cached_session["expired_CIDs"]:
+                return cached_session["CID"]  # Another API call has already logged in again
+            if expired_CID == cached_session["CID"]:
+                return _login_and_cache_cid(
+                    api_endpoint_url=api_endpoint_url,
+                    username=cache_key[1],
+                    password=cached_session["password"],
+                    keyword_for_log=keyword_for_log,
+                    indent=indent
+                )
+        # END for
+    # END with
+
+    return None
+# END def _relogin_for_expired_cid()
+
+
+def _replace_expired_cid_in_payload(api_endpoint_url="https://123.123.123.123/v1/api", payload=dict()):
+    """
+    The caller may still hold a CID which has already been replaced by _relogin_for_expired_cid(). Swap it for the
+    current CID, so the API call does not hit the controller with a CID which is known to be expired.
+    """
+    if "CID" not in payload:
+        return payload
 
+    controller_host = urlparse(api_endpoint_url).netloc
+    with _cid_cache_lock:
+        for cache_key, cached_session in _cid_cache.items():
+            if cache_key[0] == controller_host and payload["CID"] in cached_session["expired_CIDs"]:
+                payload = dict(payload)
+                payload["CID"] = cached_session["CID"]
+                return payload
+        # END for
+    # END with
 
-def verify_aviatrix_api_response_login(response=None, keyword_for_log="avx-lambda-function---", indent="    "):
-    py_dict = response.json()
-    print(indent + keyword_for_log + "Aviatrix API response --> " + str(py_dict))
+    return payload
+# END def _replace_expired_cid_in_payload()
 
-    ### Verify if HTTP response code is 200
-    response_code = response.status_code  # expect to be 200
-    if response_code is not 200:
-        err_msg = "Fail to login Aviatrix controller. " \
-                  "Expected HTTP response code is 200. However the actual " \
-                  "response code is: " + str(response_code)
-        raise AviatrixException(
-            message=err_msg,
-        )
-    # END if
 
-    ### Verify if API response returns True
-    api_return_boolean = py_dict["return"]
-    if api_return_boolean is not True:
-        err_msg = "Fail to login Aviatrix controller. API response is: " + str(py_dict)
-        raise AviatrixException(
-            message=err_msg,
-        )
-    # END if
+def get_cached_preflight_result(api_endpoint_url="https://123.123.123.123/v1/api", key="is_initialized"):
+    """
+    Returns the cached value of "key" ("is_initialized" || "controller_version") for the controller host, OR None IF
+    there is no cached value younger than PREFLIGHT_CACHE_TTL
+    """
+    controller_host = urlparse(api_endpoint_url).netloc
+    with _preflight_cache_lock:
+        cached_result = _preflight_cache.get(controller_host, dict()).get(key)
+    if cached_result is None:
+        return None
 
-    # At this point, py_dict["return"] is True
+    value, check_time = cached_result
+    if get_clock().time() - check_time >= PREFLIGHT_CACHE_TTL:
+        return None
+    return value
+# END def get_cached_preflight_result()
 
-    ### Verify if able to find expected string from API response
-    api_return_msg = py_dict["results"]
-    expected_string = "authorized successfully"
-    if (expected_string in api_return_msg) is False:
-        err_msg = "Fail to login Aviatrix controller. API actual return message is: " + \
-                  str(py_dict) + \
-                  " The string we expect to find is: " + \
-                  expected_string
 
-        raise AviatrixException(
-            message=err_msg,
-        )
-    # END if
-# END def verify_aviatrix_api_response_login()
+def cache_preflight_result(api_endpoint_url="https://123.123.123.123/v1/api", key="is_initialized", value=True):
+    controller_host = urlparse(api_endpoint_url).netloc
+    with _preflight_cache_lock:
+        _preflight_cache.setdefault(controller_host, dict())[key] = (value, get_clock().time())
+# END def cache_preflight_result()
 
 
-def is_controller_initialized(
+def invalidate_preflight_cache(
     api_endpoint_url="https://123.123.123.123/v1/api",
-    CID="ABCD1234",
     keyword_for_log="avx-lambda-function---",
     indent="    "
         ):
+    controller_host = urlparse(api_endpoint_url).netloc
+    with _preflight_cache_lock:
+        if _preflight_cache.pop(controller_host, None) is not None:
+            print(indent + keyword_for_log + "Invalidated the cached preflight results of " + controller_host)
+# END def invalidate_preflight_cache()
 
-    request_method = "GET"
-    data = {
+
+def _build_payload_for_is_controller_initialized(
+    CID="ABCD1234"
+        ):
+    return {
         "action": "initial_setup",
         "subaction": "check",
         "CID": CID
     }
+# END def _build_payload_for_is_controller_initialized()
+
+
+def is_controller_initialized(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+
+    request_method = "GET"
+    data = _build_payload_for_is_controller_initialized(
+        CID=CID
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=data, indent=4)))
@@ -949,7 +3627,11 @@ def is_controller_initialized(
         keyword_for_log=keyword_for_log,
         indent=indent + "    "
     )
+    return _parse_is_controller_initialized_response(response=response, keyword_for_log=keyword_for_log, indent=indent)
+# END def is_controller_initialized()
+
 
+def _parse_is_controller_initialized_response(response=None, keyword_for_log="avx-lambda-function---", indent="    "):
     py_dict = response.json()
     print(indent + keyword_for_log + "Aviatrix API response --> " + str(py_dict))
     if py_dict["return"] is False and py_dict["reason"] == "not run":
@@ -957,7 +3639,17 @@ def is_controller_initialized(
     # END if
 
     return True  # Controller has ALREADY been initialized
-# END def is_controller_initialized()
+# END def _parse_is_controller_initialized_response()
+
+
+def _build_payload_for_get_controller_version(
+    CID="ABCD1234"
+        ):
+    return {
+        "action": "list_version_info",
+        "CID": CID
+    }
+# END def _build_payload_for_get_controller_version()
 
 
 def get_controller_version(
@@ -968,10 +3660,9 @@ def get_controller_version(
         ):
     """    "list_version_info" API is supported by all controller versions since 2.7  """
     request_method = "GET"
-    params = {
-        "action": "list_version_info",
-        "CID": CID
-    }
+    params = _build_payload_for_get_controller_version(
+        CID=CID
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=params, indent=4)))
@@ -983,7 +3674,11 @@ def get_controller_version(
         keyword_for_log=keyword_for_log,
         indent=indent + "    "
     )
+    return _parse_get_controller_version_response(response=response)
+# END def get_controller_version()
 
+
+def _parse_get_controller_version_response(response=None):
     ##### Get controller info
     py_dict = response.json()
     # Commented out on purpose to avoid confusion since 2.6 doesn't support "list_version_info"
@@ -1009,7 +3704,7 @@ def get_controller_version(
     raise AviatrixException(
         message=avx_err_msg,
     )
-# END def get_controller_version()
+# END def _parse_get_controller_version_response()
 
 
 def _parse_list_version_info_API_to_get_controller_version(
@@ -1049,10 +3744,9 @@ def _parse_list_version_info_API_to_get_controller_version(
 # END _parse_list_version_info_API_to_get_controller_version
 
 
-def create_access_account(
-    api_endpoint_url="https://123.123.123.123/v1/api",
+def _build_payload_for_create_access_account(
     CID="ABCD1234",
-    controller_version="4.0",
+    controller_version=4.0,
     account_name="my-aws-role-based",
     account_password="**********",
     account_email="test@aviatrix.com",
@@ -1060,15 +3754,10 @@ def create_access_account(
     aws_account_number="123456789012",
     is_iam_role_based="true",
     app_role_arn="arn:aws:iam::123456789012:role/aviatrix-role-app",
-    ec2_role_arn="arn:aws:iam::123456789012:role/aviatrix-role-ec2",
-    keyword_for_log="avx-lambda-function---",
-    indent="    "
+    ec2_role_arn="arn:aws:iam::123456789012:role/aviatrix-role-ec2"
         ):
-    controller_version = eval(controller_version)
-    request_method = "POST"
-
     if controller_version <= 2.6:
-        data = {
+        return {
             "action": "xxxxx",
             "CID": CID,
             "account_name": account_name,
@@ -1081,7 +3770,7 @@ def create_access_account(
             "aws_role_ec2": ec2_role_arn
         }
     else:  # The API, "edit_account_user" is supported in 2.7 or later release
-        data = {
+        return {
             "action": "setup_account_profile",
             "CID": CID,
             "account_name": account_name,
@@ -1094,6 +3783,39 @@ def create_access_account(
             "aws_role_ec2": ec2_role_arn
         }
     # END determine API depends on controller version
+# END def _build_payload_for_create_access_account()
+
+
+def create_access_account(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    controller_version="4.0",
+    account_name="my-aws-role-based",
+    account_password="**********",
+    account_email="test@aviatrix.com",
+    cloud_type="1",
+    aws_account_number="123456789012",
+    is_iam_role_based="true",
+    app_role_arn="arn:aws:iam::123456789012:role/aviatrix-role-app",
+    ec2_role_arn="arn:aws:iam::123456789012:role/aviatrix-role-ec2",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    controller_version = float(controller_version)
+    request_method = "POST"
+
+    data = _build_payload_for_create_access_account(
+        CID=CID,
+        controller_version=controller_version,
+        account_name=account_name,
+        account_password=account_password,
+        account_email=account_email,
+        cloud_type=cloud_type,
+        aws_account_number=aws_account_number,
+        is_iam_role_based=is_iam_role_based,
+        app_role_arn=app_role_arn,
+        ec2_role_arn=ec2_role_arn
+    )
 
     payload_with_hidden_password = dict(data)
     payload_with_hidden_password["account_password"] = "************"
@@ -1161,6 +3883,18 @@ def _handle_aviatrix_api_response_from_create_access_account(
 # END def _handle_aviatrix_api_response_from_create_access_account()
 
 
+def _build_payload_for_delete_access_account(
+    CID="ABCD1234",
+    access_account_name="my-aws-role-based"
+        ):
+    return {
+        "action": "delete_account_profile",
+        "CID": CID,
+        "account_name": access_account_name
+    }
+# END def _build_payload_for_delete_access_account()
+
+
 def delete_access_account(
     api_endpoint_url="https://123.123.123.123/v1/api",
     CID="ABCD1234",
@@ -1169,11 +3903,10 @@ def delete_access_account(
     indent="    "
         ):
     request_method = "POST"
-    data = {
-        "action": "delete_account_profile",
-        "CID": CID,
-        "account_name": access_account_name
-    }
+    data = _build_payload_for_delete_access_account(
+        CID=CID,
+        access_account_name=access_account_name
+    )
 
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
@@ -1238,18 +3971,14 @@ def _handle_aviatrix_api_response_from_delete_access_account(
 # END def _handle_aviatrix_api_response_from_delete_access_account()
 
 
-def create_aws_tgw(
-    api_endpoint_url="https://123.123.123.123/v1/api",
+def _build_payload_for_create_aws_tgw(
     CID="ABCD1234",
     access_account_name='my-avx-iam-role-basd-access-account-009',
     region_name='us-east-1',
     aws_tgw_name='my-1st-tgw',
-    aws_side_AS_numeber='64512',
-    keyword_for_log="avx-lambda-function---",
-    indent="    "
+    aws_side_AS_numeber='64512'
         ):
-    request_method = "POST"
-    payload = {
+    return {
         "action": "add_aws_tgw",
         "CID": CID,
         "account_name": access_account_name,
@@ -1257,6 +3986,27 @@ def create_aws_tgw(
         "tgw_name": aws_tgw_name,
         "aws_side_asn": aws_side_AS_numeber
     }
+# END def _build_payload_for_create_aws_tgw()
+
+
+def create_aws_tgw(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    access_account_name='my-avx-iam-role-basd-access-account-009',
+    region_name='us-east-1',
+    aws_tgw_name='my-1st-tgw',
+    aws_side_AS_numeber='64512',
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    request_method = "POST"
+    payload = _build_payload_for_create_aws_tgw(
+        CID=CID,
+        access_account_name=access_account_name,
+        region_name=region_name,
+        aws_tgw_name=aws_tgw_name,
+        aws_side_AS_numeber=aws_side_AS_numeber
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -1318,6 +4068,18 @@ def _handle_aviatrix_api_response_from_create_aws_tgw(
 # END def _handle_aviatrix_api_response_from_create_aws_tgw()
 
 
+def _build_payload_for_delete_aws_tgw(
+    CID="ABCD1234",
+    aws_tgw_name='my-1st-tgw'
+        ):
+    return {
+        "action": "delete_aws_tgw",
+        "CID": CID,
+        "tgw_name": aws_tgw_name
+    }
+# END def _build_payload_for_delete_aws_tgw()
+
+
 def delete_aws_tgw(
     api_endpoint_url="https://123.123.123.123/v1/api",
     CID="ABCD1234",
@@ -1326,11 +4088,10 @@ def delete_aws_tgw(
     indent="    "
         ):
     request_method = "POST"
-    payload = {
-        "action": "delete_aws_tgw",
-        "CID": CID,
-        "tgw_name": aws_tgw_name
-    }
+    payload = _build_payload_for_delete_aws_tgw(
+        CID=CID,
+        aws_tgw_name=aws_tgw_name
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -1422,6 +4183,24 @@ def parse_route_domains_from_1_string_into_list_of_strings(
 # END def parse_route_domains_from_1_string_into_list_of_strings
 
 
+def _build_payload_for_create_route_domain(
+    CID="ABCD1234",
+    tgw_region_name="us-east-1",
+    aws_tgw_name="my-aws-tgw-009",
+    new_route_domain_name="my-new-avx-security-domain",
+    is_firewall_domain="false"
+        ):
+    return {
+        "action": "add_route_domain",
+        "CID": CID,
+        "region": tgw_region_name,
+        "tgw_name": aws_tgw_name,
+        "route_domain_name": new_route_domain_name,
+        "firewall_domain": is_firewall_domain
+    }
+# END def _build_payload_for_create_route_domain()
+
+
 def create_route_domain(
             api_endpoint_url="https://123.123.123.123/v1/api",
             CID="ABCD1234",
@@ -1469,14 +4248,13 @@ def create_route_domain(
             :return: response object from "requests" library/package
     """
     request_method = "POST"
-    payload = {
-        "action": "add_route_domain",
-        "CID": CID,
-        "region": tgw_region_name,
-        "tgw_name": aws_tgw_name,
-        "route_domain_name": new_route_domain_name,
-        "firewall_domain": is_firewall_domain
-    }
+    payload = _build_payload_for_create_route_domain(
+        CID=CID,
+        tgw_region_name=tgw_region_name,
+        aws_tgw_name=aws_tgw_name,
+        new_route_domain_name=new_route_domain_name,
+        is_firewall_domain=is_firewall_domain
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -1538,6 +4316,20 @@ def _handle_aviatrix_api_response_from_create_route_domain(
 # END def _handle_aviatrix_api_response_from_create_route_domain()
 
 
+def _build_payload_for_delete_route_domain(
+    CID="ABCD1234",
+    aws_tgw_name="my-aws-tgw-009",
+    route_domain_name="my-avx-route-domain"
+        ):
+    return {
+        "action": "delete_route_domain",
+        "CID": CID,
+        "tgw_name": aws_tgw_name,
+        "route_domain_name": route_domain_name
+    }
+# END def _build_payload_for_delete_route_domain()
+
+
 def delete_route_domain(
         api_endpoint_url="https://123.123.123.123/v1/api",
         CID="ABCD1234",
@@ -1583,12 +4375,11 @@ def delete_route_domain(
             :return: response object from "requests" library/package
     """
     request_method = "POST"
-    payload = {
-        "action": "delete_route_domain",
-        "CID": CID,
-        "tgw_name": aws_tgw_name,
-        "route_domain_name": route_domain_name
-    }
+    payload = _build_payload_for_delete_route_domain(
+        CID=CID,
+        aws_tgw_name=aws_tgw_name,
+        route_domain_name=route_domain_name
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -1650,23 +4441,38 @@ def _handle_aviatrix_api_response_from_delete_route_domain(
 # END def _handle_aviatrix_api_response_from_delete_route_domain()
 
 
-def connect_route_domain(
-    api_endpoint_url="https://123.123.123.123/v1/api",
+def _build_payload_for_connect_route_domain(
     CID="ABCD1234",
     aws_tgw_name="my-tgw-009",
     source_route_domain_name="My_New_Security_Route_Domain_009",
-    destination_route_domain_name="Default_Domain",
-    keyword_for_log="avx-lambda-function---",
-    indent="    "
+    destination_route_domain_name="Default_Domain"
         ):
-    request_method = "POST"
-    payload = {
+    return {
         "action": "add_connection_between_route_domains",
         "CID": CID,
         "tgw_name": aws_tgw_name,
         "source_route_domain_name": source_route_domain_name,
         "destination_route_domain_name": destination_route_domain_name
     }
+# END def _build_payload_for_connect_route_domain()
+
+
+def connect_route_domain(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    aws_tgw_name="my-tgw-009",
+    source_route_domain_name="My_New_Security_Route_Domain_009",
+    destination_route_domain_name="Default_Domain",
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    request_method = "POST"
+    payload = _build_payload_for_connect_route_domain(
+        CID=CID,
+        aws_tgw_name=aws_tgw_name,
+        source_route_domain_name=source_route_domain_name,
+        destination_route_domain_name=destination_route_domain_name
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -1728,6 +4534,22 @@ def _handle_aviatrix_api_response_from_connect_route_domain(
 # END def _handle_aviatrix_api_response_from_connect_route_domain()
 
 
+def _build_payload_for_disconnect_route_domain(
+    CID="ABCD1234",
+    aws_tgw_name="my-aws-tgw-009",
+    source_route_domain_name="my-avx-route-domain",
+    destination_route_domain_name="Default_Domain"
+        ):
+    return {
+        "action": "delete_connection_between_route_domains",
+        "CID": CID,
+        "tgw_name": aws_tgw_name,
+        "source_route_domain_name": source_route_domain_name,
+        "destination_route_domain_name": destination_route_domain_name
+    }
+# END def _build_payload_for_disconnect_route_domain()
+
+
 def disconnect_route_domain(
             api_endpoint_url="https://123.123.123.123/v1/api",
             CID="ABCD1234",
@@ -1774,13 +4596,12 @@ def disconnect_route_domain(
             :return: response object from "requests" library/package
     """
     request_method = "POST"
-    payload = {
-        "action": "delete_connection_between_route_domains",
-        "CID": CID,
-        "tgw_name": aws_tgw_name,
-        "source_route_domain_name": source_route_domain_name,
-        "destination_route_domain_name": destination_route_domain_name
-    }
+    payload = _build_payload_for_disconnect_route_domain(
+        CID=CID,
+        aws_tgw_name=aws_tgw_name,
+        source_route_domain_name=source_route_domain_name,
+        destination_route_domain_name=destination_route_domain_name
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -1842,6 +4663,43 @@ def _handle_aviatrix_api_response_from_disconnect_route_domain(
 # END def _handle_aviatrix_api_response_from_disconnect_route_domain()
 
 
+def run_concurrently(function=None, list_of_kwargs=list(), max_concurrency=ROUTE_DOMAIN_CONCURRENCY):
+    """
+    Invokes function(**kwargs) for every kwargs of "list_of_kwargs", at most "max_concurrency" at a time, and waits
+    for all of them. A failed call does NOT stop the others.
+    :return: [(return value, None) OR (None, exception)], in the order of "list_of_kwargs"
+    """
+    def run(kwargs):
+        try:
+            return function(**kwargs), None
+        except Exception as e:  # pylint: disable=broad-except
+            return None, e
+    # END def run()
+
+    if max_concurrency <= 1 or len(list_of_kwargs) <= 1:
+        return [run(kwargs) for kwargs in list_of_kwargs]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_concurrency, len(list_of_kwargs))) as executor:
+        return list(executor.map(run, list_of_kwargs))
+# END def run_concurrently()
+
+
+def _raise_for_failed_calls(results=list(), names=list(), what="connect route domain"):
+    """
+    :param results: The return value of run_concurrently()
+    :raise AviatrixException: IF any call has failed, listing every failed call (by "names") together
+    """
+    failures = [(name, e) for name, (_, e) in zip(names, results) if e is not None]
+    if len(failures) == 0:
+        return
+    avx_err_msg = "Failed to " + what + " for " + str(len(failures)) + " out of " + str(len(results)) + ": " + \
+                  "; ".join(str(name) + ": " + str(e) for name, e in failures)
+    raise AviatrixException(
+        message=avx_err_msg,
+    )
+# END def _raise_for_failed_calls()
+
+
 def build_new_route_domain(
         api_endpoint_url="https://123.123.123.123/v1/api",
         CID="ABCD1234",
@@ -1850,6 +4708,7 @@ def build_new_route_domain(
         new_route_domain_name="my-new-avx-security-route-domain",
         is_firewall_domain="false",
         list_of_route_domains_to_connect=["Default_Domain", "Shared_Service_Domain"],
+        max_concurrency=ROUTE_DOMAIN_CONCURRENCY,
         keyword_for_log="avx-lambda-function---",
         indent="    "
             ):
@@ -1857,6 +4716,8 @@ def build_new_route_domain(
             + This function is actually leveraging 2 Aviatrix APIs 1) add_route_domain 2) add_connection_between_route_domains.
             +  Aviatrix API, "add_connection_between_route_domains" actually can only add/connect 1 domain at a time.
                 However, the parameter of this function, "list_of_route_domains_to_connect" is a list of array, which allows this function can add/connect multiple domains
+            +  Once the new domain exists, the connections are independent of each other, so up to "max_concurrency"
+                of them are added at a time. Every connection is tried, and all failed connections are reported together
 
             :param api_endpoint_url:
                 Description: URL of Aviatrix controller API endpoint
@@ -1885,6 +4746,12 @@ def build_new_route_domain(
                 Type: list of Strings
                 Default Value: None
                 Example Value(s): ["Default_Domain", "Shared_Service_Domain"]
+            :param max_concurrency:
+                Description: Max number of connections to add at a time
+                Required: No
+                Type: Integer
+                Default Value: ROUTE_DOMAIN_CONCURRENCY
+                Example Value(s): 1  ||  5
             :param keyword_for_log:
             :param indent:
             :return: response object from "requests" library/package
@@ -1907,7 +4774,7 @@ def build_new_route_domain(
     _handle_aviatrix_api_response_from_create_route_domain(response=response)
 
 
-    for route_domains_to_connect in list_of_route_domains_to_connect:
+    def connect_and_verify(route_domains_to_connect):
         response = connect_route_domain(
             api_endpoint_url=api_endpoint_url,
             CID=CID,
@@ -1917,11 +4784,23 @@ def build_new_route_domain(
             keyword_for_log=keyword_for_log,
             indent=indent + "    "
         )
-        responses.append(response)
         pydict = response.json()
         print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
         _handle_aviatrix_api_response_from_connect_route_domain(response=response)
-    # END for
+        return response
+    # END def connect_and_verify()
+
+    results = run_concurrently(
+        function=connect_and_verify,
+        list_of_kwargs=[{"route_domains_to_connect": name} for name in list_of_route_domains_to_connect],
+        max_concurrency=max_concurrency
+    )
+    _raise_for_failed_calls(
+        results=results,
+        names=list_of_route_domains_to_connect,
+        what="connect route domain " + new_route_domain_name + " to route domain(s)"
+    )
+    responses.extend(response for response, _ in results)
 
     return responses
 # END def build_new_route_domain()
@@ -1935,6 +4814,8 @@ def teardown_route_domain(
         aws_tgw_name="my-aws-tgw-009",
         source_route_domain_name="my-new-avx-security-route-domain",
         list_of_route_domains_to_disconnect=["Default_Domain", "Shared_Service_Domain"],
+        teardown_mode=ROUTE_DOMAIN_TEARDOWN_MODE,
+        max_concurrency=ROUTE_DOMAIN_CONCURRENCY,
         keyword_for_log="avx-lambda-function---",
         indent="    "
             ):
@@ -1970,13 +4851,32 @@ def teardown_route_domain(
                 Type: list of Strings
                 Default Value: None
                 Example Value(s): ["Default_Domain", "Shared_Service_Domain"]
+            :param teardown_mode:
+                Description: See "Route domain teardown modes" at the top of this file
+                Required: No
+                Type: String
+                Default Value: ROUTE_DOMAIN_TEARDOWN_MODE
+                Example Value(s): "fast"  ||  "full"  ||  "disconnect-only"
+            :param max_concurrency:
+                Description: Max number of route domains to disconnect at a time
+                Required: No
+                Type: Integer
+                Default Value: ROUTE_DOMAIN_CONCURRENCY
+                Example Value(s): 1  ||  5
             :param keyword_for_log:
             :param indent:
             :return: response object from "requests" library/package
     """
+    if teardown_mode not in ALL_TEARDOWN_MODES:
+        avx_err_msg = "Invalid teardown mode: " + str(teardown_mode) + ". Valid modes are: " + str(ALL_TEARDOWN_MODES)
+        raise AviatrixException(
+            message=avx_err_msg,
+        )
+    # END if
+
     responses = list()
 
-    for destination_route_domain_name in list_of_route_domains_to_disconnect:
+    def disconnect(destination_route_domain_name):
         response = disconnect_route_domain(
             api_endpoint_url=api_endpoint_url,
             CID=CID,
@@ -1986,11 +4886,30 @@ def teardown_route_domain(
             keyword_for_log=keyword_for_log,
             indent=indent + "    "
         )
-        responses.append(response)
         pydict = response.json()
         print(keyword_for_log + '    Aviatrix API Response: ' + str(pydict))
-        # _handle_aviatrix_api_response_from_disconnect_route_domain(response=response)  # comment this line out on purpose because invoking delete_route_domain() will also disconnect all route-domains
-    # END for
+        if teardown_mode == TEARDOWN_MODE_DISCONNECT_ONLY:
+            _handle_aviatrix_api_response_from_disconnect_route_domain(response=response)
+        # Otherwise, NOT verified on purpose because invoking delete_route_domain() will also disconnect all route-domains
+        return response
+    # END def disconnect()
+
+    if teardown_mode != TEARDOWN_MODE_FAST:
+        results = run_concurrently(
+            function=disconnect,
+            list_of_kwargs=[{"destination_route_domain_name": name} for name in list_of_route_domains_to_disconnect],
+            max_concurrency=max_concurrency
+        )
+        if teardown_mode == TEARDOWN_MODE_DISCONNECT_ONLY:
+            _raise_for_failed_calls(
+                results=results,
+                names=list_of_route_domains_to_disconnect,
+                what="disconnect route domain " + source_route_domain_name + " from route domain(s)"
+            )
+            return [response for response, _ in results]
+        # END if
+        responses.extend(response for response, _ in results if response is not None)
+    # END if
 
     response = delete_route_domain(
         api_endpoint_url=api_endpoint_url,
@@ -2009,20 +4928,16 @@ def teardown_route_domain(
 # END def teardown_route_domain()
 
 
-def attach_vpc_to_aws_tgw(
-    api_endpoint_url="https://123.123.123.123/v1/api",
+def _build_payload_for_attach_vpc_to_aws_tgw(
     CID="ABCD1234",
-    vpc_access_account_name="my-access-account-009",
     vpc_region_name="us-west-1",
+    vpc_access_account_name="my-access-account-009",
     vpc_id="vpc-abc123",
     aws_tgw_name="my-1st-aws-tgw",
     route_domain_name="Default_Domain",
-    subnet_list=["subnet-abc123", "subnet-xyz-789"],
-    keyword_for_log="avx-lambda-function---",
-    indent="    "
+    subnet_list=["subnet-abc123", "subnet-xyz-789"]
         ):
-    request_method = "POST"
-    payload = {
+    return {
         "action": "attach_vpc_to_tgw",
         "CID": CID,
         "region": vpc_region_name,
@@ -2032,6 +4947,31 @@ def attach_vpc_to_aws_tgw(
         "route_domain_name": route_domain_name,
         "subnet_list": subnet_list
     }
+# END def _build_payload_for_attach_vpc_to_aws_tgw()
+
+
+def attach_vpc_to_aws_tgw(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    CID="ABCD1234",
+    vpc_access_account_name="my-access-account-009",
+    vpc_region_name="us-west-1",
+    vpc_id="vpc-abc123",
+    aws_tgw_name="my-1st-aws-tgw",
+    route_domain_name="Default_Domain",
+    subnet_list=["subnet-abc123", "subnet-xyz-789"],
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    request_method = "POST"
+    payload = _build_payload_for_attach_vpc_to_aws_tgw(
+        CID=CID,
+        vpc_region_name=vpc_region_name,
+        vpc_access_account_name=vpc_access_account_name,
+        vpc_id=vpc_id,
+        aws_tgw_name=aws_tgw_name,
+        route_domain_name=route_domain_name,
+        subnet_list=subnet_list
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -2093,6 +5033,20 @@ def _handle_aviatrix_api_response_from_attach_vpc_to_aws_tgw(
 # END def _handle_aviatrix_api_response_from_attach_vpc_to_aws_tgw()
 
 
+def _build_payload_for_detach_vpc_from_aws_tgw(
+    CID="ABCD1234",
+    vpc_id="vpc-abc123",
+    aws_tgw_name="my-1st-aws-tgw"
+        ):
+    return {
+        "action": "detach_vpc_from_tgw",
+        "CID": CID,
+        "vpc_name": vpc_id,
+        "tgw_name": aws_tgw_name
+    }
+# END def _build_payload_for_detach_vpc_from_aws_tgw()
+
+
 def detach_vpc_from_aws_tgw(
     api_endpoint_url="https://123.123.123.123/v1/api",
     CID="ABCD1234",
@@ -2102,12 +5056,11 @@ def detach_vpc_from_aws_tgw(
     indent="    "
         ):
     request_method = "POST"
-    payload = {
-        "action": "detach_vpc_from_tgw",
-        "CID": CID,
-        "vpc_name": vpc_id,
-        "tgw_name": aws_tgw_name
-    }
+    payload = _build_payload_for_detach_vpc_from_aws_tgw(
+        CID=CID,
+        vpc_id=vpc_id,
+        aws_tgw_name=aws_tgw_name
+    )
     print(indent + keyword_for_log + "API End Point URL   : " + str(api_endpoint_url))
     print(indent + keyword_for_log + "Request Method Type : " + str(request_method))
     print(indent + keyword_for_log + "Request payload     : \n" + str(json.dumps(obj=payload, indent=4)))
@@ -2167,3 +5120,648 @@ def _handle_aviatrix_api_response_from_detach_vpc_from_aws_tgw(
         )
     # END if
 # END def _handle_aviatrix_api_response_from_detach_vpc_from_aws_tgw()
+
+
+class AsyncAviatrixClient(object):
+    """
+    Coroutine versions of the Aviatrix API helpers (login(), create_route_domain(), attach_vpc_to_aws_tgw(), ...), for
+    callers which send many API calls at once from one event loop.
+        + The request payloads come from the same "_build_payload_for_*" functions as the blocking helpers, and every
+          coroutine returns a "requests" response object, so the "_handle_aviatrix_api_response_from_*" functions
+          validate the responses the same way.
+        + The retries follow _send_aviatrix_api_with_retry() (failure classification, circuit breaker, retry budget,
+          invocation deadline), but wait with "asyncio.sleep" between attempts.
+        + At most "max_concurrency" API calls are in flight at a time. A call which waits before its retry does NOT
+          hold a slot.
+
+    Usage:
+        async with AsyncAviatrixClient(api_endpoint_url=api_endpoint_url) as client:
+            CID = await client.get_cid(username="admin", password=admin_password)
+            responses = await asyncio.gather(*[
+                client.attach_vpc_to_aws_tgw(CID=CID, vpc_id=vpc_id, ...) for vpc_id in vpc_ids
+            ])
+    """
+    def __init__(
+        self,
+        api_endpoint_url="https://123.123.123.123/v1/api",
+        max_concurrency=None,
+        retry_count=5,
+        keyword_for_log="avx-lambda-function---",
+        indent="    "
+            ):
+        self.api_endpoint_url = api_endpoint_url
+        self.max_concurrency = ASYNC_MAX_CONCURRENCY if max_concurrency is None else max(max_concurrency, 1)
+        self.retry_count = retry_count
+        self.keyword_for_log = keyword_for_log
+        self.indent = indent
+        self._session = None
+        self._executor = None
+        self._semaphore = None
+        self._login_lock = None
+
+    async def __aenter__(self):
+        # Created here, so they are bound to the running event loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._login_lock = asyncio.Lock()
+
+        # Runs the blocking calls (state verification, login again), AND the HTTP requests IF "aiohttp" is missing
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency)
+        if aiohttp is not None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, ssl=False)
+            )
+        else:
+            self._session = _create_http_session(keep_alive=HTTP_KEEP_ALIVE, pool_maxsize=self.max_concurrency)
+        # END if-else
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        if aiohttp is not None:
+            await self._session.close()
+        else:
+            self._session.close()
+        self._executor.shutdown(wait=False)
+        return False
+
+    async def _run_blocking(self, function, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, **kwargs))
+
+    async def _send_http_request(self, request_method="POST", payload=dict()):
+        """
+        :return: response object from "requests" library/package
+        :raise requests.exceptions.RequestException: the same exceptions as _send_http_request(), so the failure
+                                                     is classified the same way by classify_failure()
+        """
+        connect_timeout, read_timeout = get_invocation_deadline().get_http_timeout()
+
+        if aiohttp is None:
+            return await self._run_blocking(
+                self._session.request,
+                method=request_method,
+                url=self.api_endpoint_url,
+                params=payload if request_method == "GET" else None,
+                data=payload if request_method == "POST" else None,
+                verify=False,
+                timeout=(connect_timeout, read_timeout)
+            )
+        # END if
+
+        ### Encode the payload the same way as "requests" does
+        url = self.api_endpoint_url
+        data = None
+        headers = dict()
+        if request_method == "GET":
+            url += "?" + urlencode(payload, doseq=True)
+        else:
+            data = urlencode(payload, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        # END if-else
+
+        try:
+            async with self._session.request(
+                method=request_method,
+                url=url,
+                data=data,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+            ) as aiohttp_response:
+                response = requests.models.Response()
+                response.status_code = aiohttp_response.status
+                response.headers = requests.structures.CaseInsensitiveDict(aiohttp_response.headers)
+                response.url = str(aiohttp_response.url)
+                response._content = await aiohttp_response.read()
+                return response
+            # END with
+        except aiohttp.ClientConnectorError as e:
+            raise requests.exceptions.ConnectTimeout(str(e))  # The request has never reached the controller
+        except asyncio.TimeoutError as e:
+            raise requests.exceptions.ReadTimeout(str(e))
+        except aiohttp.ClientError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        # END try-except
+
+    async def send_aviatrix_api(self, request_method="POST", payload=dict()):
+        """ The coroutine version of _send_aviatrix_api() """
+        payload = _replace_expired_cid_in_payload(api_endpoint_url=self.api_endpoint_url, payload=payload)
+        response = await self._send_aviatrix_api_with_retry(request_method=request_method, payload=payload)
+
+        if _is_version_mismatch_response(response=response):
+            print(self.indent + self.keyword_for_log + "WARNING: API response suggests a controller version mismatch.")
+            invalidate_preflight_cache(
+                api_endpoint_url=self.api_endpoint_url,
+                keyword_for_log=self.keyword_for_log,
+                indent=self.indent
+            )
+        # END if
+
+        if "CID" in payload and _is_invalid_cid_response(response=response):
+            print(self.indent + self.keyword_for_log +
+                  "WARNING: CID is invalid or expired. Login again and replay the API call...")
+            new_CID = await self._run_blocking(
+                _relogin_for_expired_cid,
+                api_endpoint_url=self.api_endpoint_url,
+                expired_CID=payload["CID"],
+                keyword_for_log=self.keyword_for_log,
+                indent=self.indent
+            )
+            if new_CID is not None:
+                payload = dict(payload)
+                payload["CID"] = new_CID
+                response = await self._send_aviatrix_api_with_retry(request_method=request_method, payload=payload)
+            # END if
+        # END if
+
+        return response
+
+    async def _send_aviatrix_api_with_retry(self, request_method="POST", payload=dict()):
+        """ The coroutine version of _send_aviatrix_api_with_retry() """
+        keyword_for_log = self.keyword_for_log
+        indent = self.indent
+        response = None
+        responses = list()
+        request_type = request_method.upper()
+        retry_policy = get_aviatrix_api_retry_policy(action=payload.get("action", ""), request_method=request_type)
+
+        if request_type != "GET" and request_type != "POST":
+            lambda_failure_reason = "ERROR: Bad HTTPS request type: " + request_method
+            print(keyword_for_log + lambda_failure_reason)
+            raise AviatrixException(
+                message=lambda_failure_reason,
+            )
+        # END if
+
+        circuit_breaker = get_circuit_breaker(api_endpoint_url=self.api_endpoint_url)
+        retry_budget = get_retry_budget()
+        for i in range(self.retry_count):
+            response = None
+            exception = None
+            async with self._semaphore:
+                circuit_breaker.before_request()
+                request_start_time = get_clock().time()
+                try:
+                    response = await self._send_http_request(request_method=request_type, payload=payload)
+                    responses.append(response)  # For error message/debugging purposes
+                except AviatrixException:
+                    raise  # The invocation deadline has passed
+                except requests.exceptions.ConnectionError as e:
+                    print(indent + keyword_for_log + "WARNING: Oops, it looks like the server is not responding...")
+                    responses.append(str(e))  # For error message/debugging purposes
+                    exception = e
+                except Exception as e:
+                    traceback_msg = traceback.format_exc()
+                    print(indent + keyword_for_log + "Oops! Aviatrix Lambda caught an exception! "
+                                                     "The traceback message is: ")
+                    print(traceback_msg)
+                    responses.append(str(traceback_msg))  # For error message/debugging purposes
+                    exception = e
+                # END try-except
+            # END with
+
+            if i > 0:
+                retry_budget.add_retry_time(elapsed_time=get_clock().time() - request_start_time)
+
+            if response is not None and 200 == response.status_code:
+                circuit_breaker.record_success()
+                return response
+            elif response is not None and 404 == response.status_code:
+                lambda_failure_reason = "ERROR: Oops, 404 Not Found. Please check your URL or route path..."
+                print(indent + keyword_for_log + lambda_failure_reason)
+            # END IF-ELSE: Checking HTTP response code
+
+            failure_type = classify_failure(
+                response=response,
+                exception=exception,
+                is_idempotent=retry_policy["idempotent"]
+            )
+            print(indent + keyword_for_log + "Failure type: " + failure_type)
+            if FAILURE_PERMANENT != failure_type:
+                circuit_breaker.record_failure()
+            elif response is not None:
+                circuit_breaker.record_success()  # The controller is up, but has rejected the request
+
+            if FAILURE_PERMANENT == failure_type:
+                lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. The failure is permanent, so it is ' + \
+                                        'not retried. The following includes all responses: ' + \
+                                        str(responses)
+                raise AviatrixException(
+                    message=lambda_failure_reason,
+                )
+            elif FAILURE_AMBIGUOUS == failure_type:
+                is_applied = await self._run_blocking(
+                    _verify_aviatrix_api_state,
+                    api_endpoint_url=self.api_endpoint_url,
+                    payload=payload,
+                    retry_policy=retry_policy,
+                    keyword_for_log=keyword_for_log,
+                    indent=indent + "    "
+                )
+                if is_applied is True:
+                    return _build_verified_aviatrix_api_response(payload=payload, retry_policy=retry_policy)
+                elif is_applied is None:
+                    lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API "' + \
+                                            str(payload.get("action")) + \
+                                            '". The request may or may not have been applied by the controller, ' + \
+                                            'and the state can not be verified, so it is not retried to avoid ' + \
+                                            'applying it twice. Please check the controller. ' + \
+                                            'The following includes all responses: ' + str(responses)
+                    raise AviatrixException(
+                        message=lambda_failure_reason,
+                    )
+                # END if-else: At this point, the state shows the request has NOT been applied
+            # END if-else: Checking failure type
+
+            wait_time_before_retry = get_retry_wait_time(i=i)
+            if i+1 < self.retry_count and \
+               not get_invocation_deadline().can_finish_before_deadline(wait_time_before_retry + HTTP_MIN_REQUEST_TIME):
+                lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. Not enough time left before the ' + \
+                                        'invocation deadline to retry. ' + \
+                                        'The following includes all retry responses: ' + \
+                                        str(responses)
+                raise AviatrixException(
+                    message=lambda_failure_reason,
+                )
+            elif i+1 < self.retry_count and not retry_budget.try_spend(wait_time=wait_time_before_retry):
+                lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. The retry budget of the invocation ' + \
+                                        'is spent (' + retry_budget.get_usage_message() + '). ' + \
+                                        'The following includes all retry responses: ' + \
+                                        str(responses)
+                raise AviatrixException(
+                    message=lambda_failure_reason,
+                )
+            elif i+1 < self.retry_count:
+                print(
+                    indent + keyword_for_log + "Wait for: " + "{0:.2f}".format(wait_time_before_retry) +
+                    " second(s) until retry " + str(i+1) + ' of "' + str(payload.get("action")) + '"'
+                )
+                await get_clock().async_sleep(wait_time_before_retry)
+            else:
+                lambda_failure_reason = 'ERROR: Failed to invoke Aviatrix API. Max retry exceeded. ' + \
+                                        'The following includes all retry responses: ' + \
+                                        str(responses)
+                raise AviatrixException(
+                    message=lambda_failure_reason,
+                )
+            # END if-else
+        # END for
+
+        return response  # IF the code flow ends up here, the response might have some issues
+
+    async def get_cid(self, username="admin", password="**********"):
+        """ The coroutine version of get_cid(). Concurrent callers share one login """
+        async with self._login_lock:
+            CID = get_cached_cid(
+                api_endpoint_url=self.api_endpoint_url,
+                username=username,
+                password=password,
+                keyword_for_log=self.keyword_for_log,
+                indent=self.indent
+            )
+            if CID is not None:
+                return CID
+
+            response = await self.login(username=username, password=password)
+            return _cache_cid_from_login_response(
+                api_endpoint_url=self.api_endpoint_url,
+                username=username,
+                password=password,
+                response=response,
+                keyword_for_log=self.keyword_for_log,
+                indent=self.indent
+            )
+        # END with
+
+    ### Every coroutine below takes the keyword parameters of its "_build_payload_for_*" function
+
+    async def login(self, **kwargs):
+        return await self.send_aviatrix_api(request_method="POST", payload=_build_payload_for_login(**kwargs))
+
+    async def is_controller_initialized(self, **kwargs):
+        response = await self.send_aviatrix_api(
+            request_method="GET",
+            payload=_build_payload_for_is_controller_initialized(**kwargs)
+        )
+        return _parse_is_controller_initialized_response(
+            response=response,
+            keyword_for_log=self.keyword_for_log,
+            indent=self.indent
+        )
+
+    async def get_controller_version(self, **kwargs):
+        response = await self.send_aviatrix_api(
+            request_method="GET",
+            payload=_build_payload_for_get_controller_version(**kwargs)
+        )
+        return _parse_get_controller_version_response(response=response)
+
+    async def create_access_account(self, controller_version="4.0", **kwargs):
+        payload = _build_payload_for_create_access_account(controller_version=float(controller_version), **kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def delete_access_account(self, **kwargs):
+        payload = _build_payload_for_delete_access_account(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def create_aws_tgw(self, **kwargs):
+        payload = _build_payload_for_create_aws_tgw(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def delete_aws_tgw(self, **kwargs):
+        payload = _build_payload_for_delete_aws_tgw(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def create_route_domain(self, **kwargs):
+        payload = _build_payload_for_create_route_domain(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def delete_route_domain(self, **kwargs):
+        payload = _build_payload_for_delete_route_domain(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def connect_route_domain(self, **kwargs):
+        payload = _build_payload_for_connect_route_domain(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def disconnect_route_domain(self, **kwargs):
+        payload = _build_payload_for_disconnect_route_domain(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def attach_vpc_to_aws_tgw(self, **kwargs):
+        payload = _build_payload_for_attach_vpc_to_aws_tgw(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+
+    async def detach_vpc_from_aws_tgw(self, **kwargs):
+        payload = _build_payload_for_detach_vpc_from_aws_tgw(**kwargs)
+        return await self.send_aviatrix_api(request_method="POST", payload=payload)
+# END class AsyncAviatrixClient
+
+
+def register_aviatrix_api_retry_policy(
+    action="attach_vpc_to_tgw",
+    idempotent=False,
+    verify_function=None,
+    success_results=""
+        ):
+    """
+    :param action: The value of "action" in the API payload
+    :param idempotent: True IF the API can be sent twice with the same effect as once
+    :param verify_function: For a non-idempotent API, invoked as verify_function(api_endpoint_url, payload,
+                            keyword_for_log, indent) after an ambiguous failure. Returns True IF the controller has
+                            applied the API, False IF it has not, OR None IF the state is unknown
+    :param success_results: The "results" of a successful API response, which the "_handle_aviatrix_api_response_from_*"
+                            function expects to find. Used for the response of an API verified as applied
+    """
+    AVIATRIX_API_RETRY_POLICIES[action] = {
+        "idempotent": idempotent,
+        "verify_function": verify_function,
+        "success_results": success_results
+    }
+# END def register_aviatrix_api_retry_policy()
+
+
+def get_aviatrix_api_retry_policy(action="attach_vpc_to_tgw", request_method="POST"):
+    if action in AVIATRIX_API_RETRY_POLICIES:
+        return AVIATRIX_API_RETRY_POLICIES[action]
+    return {
+        "idempotent": request_method.upper() == "GET",  # An unknown POST is conservatively treated as non-idempotent
+        "verify_function": None,
+        "success_results": ""
+    }
+# END def get_aviatrix_api_retry_policy()
+
+
+def _verify_aviatrix_api_state(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    payload=dict(),
+    retry_policy=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """ Returns True IF the API in "payload" has been applied, False IF it has not, OR None IF unknown """
+    verify_function = retry_policy["verify_function"]
+    if verify_function is None:
+        return None
+
+    print(indent + keyword_for_log + 'START: Verify whether the controller has applied "' + str(payload.get("action")) + '"')
+    try:
+        is_applied = verify_function(
+            api_endpoint_url=api_endpoint_url,
+            payload=payload,
+            keyword_for_log=keyword_for_log,
+            indent=indent + "    "
+        )
+    except Exception as e:  # pylint: disable=broad-except
+        print(indent + keyword_for_log + "    Failed to verify the state: " + str(e))
+        is_applied = None
+    # END try-except
+    print(indent + keyword_for_log + "    Applied: " + str(is_applied))
+    print(indent + keyword_for_log + 'ENDED: Verify whether the controller has applied "' + str(payload.get("action")) + '"\n\n')
+    return is_applied
+# END def _verify_aviatrix_api_state()
+
+
+def _build_verified_aviatrix_api_response(payload=dict(), retry_policy=dict()):
+    """
+    Builds the response of a non-idempotent API whose response has been lost, but which has been verified as applied
+    """
+    response = requests.models.Response()
+    response.status_code = 200
+    response._content = json.dumps({
+        "return": True,
+        "results": retry_policy["success_results"] + " (verified after the response of \"" +
+                   str(payload.get("action")) + "\" was lost)"
+    }).encode("utf-8")
+    return response
+# END def _build_verified_aviatrix_api_response()
+
+
+def _query_aviatrix_api(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    params=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """ Sends a read-only (GET) API for state verification, and returns py_dict["results"] OR None on failure """
+    py_dict = _query_aviatrix_api_response(
+        api_endpoint_url=api_endpoint_url,
+        params=params,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    if py_dict.get("return") is not True:
+        return None
+    return py_dict["results"]
+# END def _query_aviatrix_api()
+
+
+def _query_aviatrix_api_response(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    params=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    """
+    Sends a read-only (GET) API for state verification, and returns the whole py_dict, so the caller can tell a
+    failed query from an explicit answer in py_dict["reason"]
+    """
+    response = _send_aviatrix_api_with_retry(
+        api_endpoint_url=api_endpoint_url,
+        request_method="GET",
+        payload=params,
+        retry_count=2,
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    py_dict = response.json()
+    if py_dict.get("return") is not True:
+        print(indent + keyword_for_log + "Aviatrix API response --> " + str(py_dict))
+    return py_dict
+# END def _query_aviatrix_api_response()
+
+
+def _is_access_account_present(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    payload=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    results = _query_aviatrix_api(
+        api_endpoint_url=api_endpoint_url,
+        params={"action": "list_accounts", "CID": payload["CID"]},
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    if results is None:
+        return None
+    account_names = [account.get("account_name") for account in results.get("account_list", list())]
+    return payload["account_name"] in account_names
+# END def _is_access_account_present()
+
+
+def _is_aws_tgw_present(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    payload=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    py_dict = _query_aviatrix_api_response(
+        api_endpoint_url=api_endpoint_url,
+        params={"action": "list_route_domains", "CID": payload["CID"], "tgw_name": payload["tgw_name"]},
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    if py_dict.get("return") is True:
+        return True  # The controller only lists the route domains of an existing TGW
+
+    # ONLY an explicit "does not exist" means absent. Any other failure (e.g. an expired CID) leaves the state unknown
+    reason = str(py_dict.get("reason", "")).lower()
+    if "does not exist" in reason or "not found" in reason:
+        return False
+    return None
+# END def _is_aws_tgw_present()
+
+
+def _is_route_domain_present(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    payload=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    results = _query_aviatrix_api(
+        api_endpoint_url=api_endpoint_url,
+        params={"action": "list_route_domains", "CID": payload["CID"], "tgw_name": payload["tgw_name"]},
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    if results is None:
+        return None
+    return payload["route_domain_name"] in results
+# END def _is_route_domain_present()
+
+
+def _is_vpc_attached_to_tgw(
+    api_endpoint_url="https://123.123.123.123/v1/api",
+    payload=dict(),
+    keyword_for_log="avx-lambda-function---",
+    indent="    "
+        ):
+    results = _query_aviatrix_api(
+        api_endpoint_url=api_endpoint_url,
+        params={"action": "list_all_tgw_attachments", "CID": payload["CID"], "tgw_name": payload["tgw_name"]},
+        keyword_for_log=keyword_for_log,
+        indent=indent
+    )
+    if results is None:
+        return None
+    attachment_names = [attachment.get("name") for attachment in results]
+    return payload["vpc_name"] in attachment_names
+# END def _is_vpc_attached_to_tgw()
+
+
+def _is_absent(is_present_function):
+    """ Turns an "is present" verify function into the verify function of the matching delete API """
+    def verify_function(api_endpoint_url, payload, keyword_for_log, indent):
+        is_present = is_present_function(
+            api_endpoint_url=api_endpoint_url,
+            payload=payload,
+            keyword_for_log=keyword_for_log,
+            indent=indent
+        )
+        return None if is_present is None else not is_present
+    return verify_function
+# END def _is_absent()
+
+
+''' Aviatrix API Retry Policies
+Description:
+    * Every API which is sent by this file declares whether it is idempotent. A failure which is ambiguous for a
+      non-idempotent API (e.g. a connection reset after the request has been sent, OR a 502) is retried ONLY IF its
+      verify function shows that the controller has NOT applied the API.
+    * The connection APIs between route domains have no verify function, so an ambiguous failure is NOT retried.
+'''
+register_aviatrix_api_retry_policy(action="is_server_ready", idempotent=True)
+register_aviatrix_api_retry_policy(action="login", idempotent=True)
+register_aviatrix_api_retry_policy(action="initial_setup", idempotent=True)
+register_aviatrix_api_retry_policy(action="list_version_info", idempotent=True)
+register_aviatrix_api_retry_policy(
+    action="setup_account_profile",
+    verify_function=_is_access_account_present,
+    success_results="An email confirmation has been sent to"
+)
+register_aviatrix_api_retry_policy(
+    action="delete_account_profile",
+    verify_function=_is_absent(_is_access_account_present),
+    success_results="deleted, and an email notification has been sent to"
+)
+register_aviatrix_api_retry_policy(
+    action="add_aws_tgw",
+    verify_function=_is_aws_tgw_present,
+    success_results="Successfully created TGW"
+)
+register_aviatrix_api_retry_policy(
+    action="delete_aws_tgw",
+    verify_function=_is_absent(_is_aws_tgw_present),
+    success_results="Successfully deleted TGW"
+)
+register_aviatrix_api_retry_policy(
+    action="add_route_domain",
+    verify_function=_is_route_domain_present,
+    success_results="Successfully added Route Domain"
+)
+register_aviatrix_api_retry_policy(
+    action="delete_route_domain",
+    verify_function=_is_absent(_is_route_domain_present),
+    success_results="Successfully deleted Route Domain"
+)
+register_aviatrix_api_retry_policy(action="add_connection_between_route_domains")
+register_aviatrix_api_retry_policy(action="delete_connection_between_route_domains")
+register_aviatrix_api_retry_policy(
+    action="attach_vpc_to_tgw",
+    verify_function=_is_vpc_attached_to_tgw,
+    success_results="Successfully attached"
+)
+register_aviatrix_api_retry_policy(
+    action="detach_vpc_from_tgw",
+    verify_function=_is_absent(_is_vpc_attached_to_tgw),
+    success_results="Successfully deleted"
+)
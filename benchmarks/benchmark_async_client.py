@@ -0,0 +1,130 @@
+"""
+Description:
+=============
+    Compares the wall time of "--calls" concurrent "attach_vpc_to_tgw" API calls sent by:
+        + "threads" : the blocking attach_vpc_to_aws_tgw() helper on a thread pool of "--concurrency" threads (the
+                      way "BULK_ATTACH" runs them)
+        + "asyncio" : AsyncAviatrixClient, with at most "--concurrency" API calls in flight
+
+    Both send the same payloads to the local mock controller, with "--api-latency" second(s) per API call, over
+    connections which have been opened by a warm-up round of "--concurrency" API calls. The asyncio client uses
+    "aiohttp" when it is installed, and falls back to a pooled "requests.Session" on a thread pool otherwise (shown in
+    the "Transport" column).
+
+
+Usage:
+=======
+    python3 benchmarks/benchmark_async_client.py --calls 100 --api-latency 0.1 --concurrency 5 10 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from mock_aviatrix_controller import MockAviatrixController
+from sample_events import import_lambda_module
+
+
+def build_attach_kwargs(CID, i):
+    return {
+        "CID": CID,
+        "vpc_region_name": "us-west-1",
+        "vpc_access_account_name": "my-access-account",
+        "vpc_id": "vpc-" + str(i),
+        "aws_tgw_name": "my-aws-tgw-00" + str(i % 4),
+        "route_domain_name": "Default_Domain",
+        "subnet_list": ["subnet-abc123", "subnet-xyz789"],
+    }
+# END def build_attach_kwargs()
+
+
+def run_threads(lambda_module, api_endpoint_url, CID, calls, concurrency):
+    list_of_kwargs = [
+        dict(build_attach_kwargs(CID, i), api_endpoint_url=api_endpoint_url) for i in range(calls)
+    ]
+    lambda_module.run_concurrently(  # Warm up: open the connections
+        function=lambda_module.attach_vpc_to_aws_tgw,
+        list_of_kwargs=list_of_kwargs[:concurrency],
+        max_concurrency=concurrency
+    )
+    start_time = time.time()
+    results = lambda_module.run_concurrently(
+        function=lambda_module.attach_vpc_to_aws_tgw,
+        list_of_kwargs=list_of_kwargs,
+        max_concurrency=concurrency
+    )
+    elapsed_time = time.time() - start_time
+    for response, exception in results:
+        if exception is not None:
+            raise exception
+        lambda_module._handle_aviatrix_api_response_from_attach_vpc_to_aws_tgw(response=response)
+    return elapsed_time
+# END def run_threads()
+
+
+async def _run_asyncio(lambda_module, api_endpoint_url, CID, calls, concurrency):
+    async with lambda_module.AsyncAviatrixClient(
+        api_endpoint_url=api_endpoint_url,
+        max_concurrency=concurrency
+    ) as client:
+        await asyncio.gather(*[  # Warm up: open the connections
+            client.attach_vpc_to_aws_tgw(**build_attach_kwargs(CID, i)) for i in range(concurrency)
+        ])
+        start_time = time.time()
+        responses = await asyncio.gather(*[
+            client.attach_vpc_to_aws_tgw(**build_attach_kwargs(CID, i)) for i in range(calls)
+        ])
+        elapsed_time = time.time() - start_time
+    # END with
+    for response in responses:
+        lambda_module._handle_aviatrix_api_response_from_attach_vpc_to_aws_tgw(response=response)
+    return elapsed_time
+# END def _run_asyncio()
+
+
+def run_asyncio(lambda_module, api_endpoint_url, CID, calls, concurrency):
+    return asyncio.run(_run_asyncio(lambda_module, api_endpoint_url, CID, calls, concurrency))
+# END def run_asyncio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100, help="Concurrent attach API calls per run")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="Second(s) added per API call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[5, 10, 20], help="Max API calls in flight")
+    args = parser.parse_args()
+
+    lambda_module = import_lambda_module()
+    lambda_module.HTTP_POOL_MAXSIZE = max(args.concurrency)  # Keep a connection alive for every worker thread
+    lambda_module._http_sessions.clear()
+    transport = "aiohttp" if lambda_module.aiohttp is not None else "requests on threads"
+
+    controller = MockAviatrixController(api_latency=args.api_latency).start()
+    try:
+        api_endpoint_url = "https://" + controller.hostname + "/v1/api/"
+        with contextlib.redirect_stdout(io.StringIO()):
+            CID = lambda_module.get_cid(api_endpoint_url=api_endpoint_url, username="admin", password="Aviatrix123!")
+
+        print("| Concurrency | Calls | Wall time s (threads) | Wall time s (asyncio) | Transport |")
+        print("|---|---|---|---|---|")
+        for concurrency in args.concurrency:
+            with contextlib.redirect_stdout(io.StringIO()):
+                threads_elapsed_time = run_threads(lambda_module, api_endpoint_url, CID, args.calls, concurrency)
+                asyncio_elapsed_time = run_asyncio(lambda_module, api_endpoint_url, CID, args.calls, concurrency)
+            print("| {0} | {1} | {2:.2f} | {3:.2f} | {4} |".format(
+                concurrency,
+                args.calls,
+                threads_elapsed_time,
+                asyncio_elapsed_time,
+                transport
+            ))
+        # END for
+    finally:
+        controller.stop()
+# END def main()
+
+
+if __name__ == "__main__":
+    main()
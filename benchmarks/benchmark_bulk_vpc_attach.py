@@ -0,0 +1,90 @@
+"""
+Description:
+=============
+    Measures the throughput (VPC attachments per second) of the "BULK_ATTACH" action versus its concurrency cap.
+
+    Every run attaches "--vpcs" VPCs, spread round-robin over "--tgws" TGWs, against the local mock controller, with
+    "--api-latency" second(s) per API call. At most "--concurrency-per-tgw" VPCs of the same TGW are attached at a time,
+    so the throughput stops growing once the concurrency cap reaches tgws * concurrency-per-tgw.
+
+
+Usage:
+=======
+    python3 benchmarks/benchmark_bulk_vpc_attach.py --vpcs 40 --tgws 4 --api-latency 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from mock_aviatrix_controller import MockAviatrixController
+from sample_events import ACTION_PROPERTIES, build_event, import_lambda_module
+
+
+def build_bulk_attach_event(controller_hostname, vpcs, tgws, concurrency):
+    event = build_event(action="BULK_ATTACH", controller_hostname=controller_hostname)
+    event["ResourceProperties"]["VpcListParam"] = [
+        dict(ACTION_PROPERTIES["ATTACH"], VpcIdParam="vpc-" + str(i), TgwNameParam="my-aws-tgw-" + str(i % tgws))
+        for i in range(vpcs)
+    ]
+    event["ResourceProperties"]["BulkConcurrencyParam"] = str(concurrency)
+    return event
+# END def build_bulk_attach_event()
+
+
+def run_bulk_attach(lambda_module, controller, event):
+    controller.reset_counters()
+    start_time = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = lambda_module.lambda_handler(event, None)
+    elapsed_time = time.time() - start_time
+    if not response["status"]:
+        raise RuntimeError(response["message"])
+    return elapsed_time
+# END def run_bulk_attach()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vpcs", type=int, default=40, help="VPCs per BULK_ATTACH event")
+    parser.add_argument("--tgws", type=int, default=4, help="TGWs the VPCs are spread over")
+    parser.add_argument("--concurrency-per-tgw", type=int, default=1, help="Max VPCs of one TGW at a time")
+    parser.add_argument("--api-latency", type=float, default=0.1, help="Second(s) added per API call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrency caps")
+    args = parser.parse_args()
+
+    lambda_module = import_lambda_module()
+    lambda_module.BULK_VPC_CONCURRENCY_PER_TGW = args.concurrency_per_tgw
+    lambda_module.HTTP_POOL_MAXSIZE = max(args.concurrency)  # Keep a connection alive for every worker
+    lambda_module._http_sessions.clear()
+
+    controller = MockAviatrixController(api_latency=args.api_latency).start()
+    try:
+        # Warm up: login and connections, so every run measures the attachments only
+        run_bulk_attach(lambda_module, controller, build_bulk_attach_event(controller.hostname, 1, 1, 1))
+
+        print("| Concurrency | VPCs | TGWs | Wall time s | VPCs/s | Speedup |")
+        print("|---|---|---|---|---|---|")
+        baseline_elapsed_time = None
+        for concurrency in args.concurrency:
+            event = build_bulk_attach_event(controller.hostname, args.vpcs, args.tgws, concurrency)
+            elapsed_time = run_bulk_attach(lambda_module, controller, event)
+            if baseline_elapsed_time is None:
+                baseline_elapsed_time = elapsed_time
+            print("| {0} | {1} | {2} | {3:.2f} | {4:.1f} | {5:.1f}x |".format(
+                concurrency,
+                args.vpcs,
+                args.tgws,
+                elapsed_time,
+                args.vpcs / elapsed_time,
+                baseline_elapsed_time / elapsed_time
+            ))
+        # END for
+    finally:
+        controller.stop()
+# END def main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Description:
+=============
+    Replays every fault profile of fault_profiles.py against every Aviatrix action, and records the time to success
+    (OR the time to failure) of one cold invocation of lambda_handler().
+
+    For every profile and action, the benchmark reports:
+        + Result         : "SUCCESS" || "FAILURE"
+        + Time to result : the latency of lambda_handler()
+        + Added          : the latency added by the faults, compared with the "healthy" profile
+        + API calls      : the API calls served by the mock controller (including the retries and the polls)
+        + Faults         : the faults injected by the mock controller (HTTP errors, connection resets, CID expiries)
+        + Sleep time     : the time spent waiting (before the retries, between readiness polls)
+
+    Every invocation starts from a cold execution environment (no pooled connection, no cached CID) and a rebooted
+    mock controller, so a "slow-boot" invocation waits for the whole boot.
+
+    With "--virtual-time", the Lambda function and the mock controller share a VirtualClock: the waits return at once,
+    and the times above are the simulated ones. The whole replay then takes seconds instead of minutes.
+
+
+Usage:
+=======
+    python3 benchmarks/benchmark_fault_profiles.py --profiles flapping-502 reset-mid-post --actions ATTACH BATCH
+    python3 benchmarks/benchmark_fault_profiles.py --virtual-time
+"""
+
+import argparse
+import contextlib
+import io
+
+from benchmark_lambda_handler import clear_module_caches
+from fault_profiles import FAULT_PROFILES
+from mock_aviatrix_controller import MockAviatrixController
+from sample_events import ACTION_PROPERTIES, FakeLambdaContext, build_event, import_lambda_module
+
+
+def run_profile_action(lambda_module, controller, clock, profile, action, timeout):
+    event = build_event(action=action, controller_hostname=controller.hostname)
+    event["ResourceProperties"].update(profile["event"])
+
+    clear_module_caches(lambda_module)
+    lambda_module._circuit_breakers.clear()
+    controller.reboot()
+    controller.reset_counters()
+    controller.reset_state()
+    clock.reset_sleep_time()
+
+    start_time = clock.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = lambda_module.lambda_handler(event, FakeLambdaContext(timeout=timeout, clock=clock))
+    elapsed_time = clock.time() - start_time
+
+    return {
+        "status": response["status"],
+        "message": response["message"],
+        "time_to_result": elapsed_time,
+        "api_calls": controller.api_call_count,
+        "faults": controller.fault_count,
+        "sleep_time": clock.sleep_time,
+    }
+# END def run_profile_action()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(FAULT_PROFILES), help="Fault profiles to replay")
+    parser.add_argument("--actions", nargs="+", default=list(ACTION_PROPERTIES), help="Actions to replay")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="Second(s) added per API call")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Lambda timeout (second(s)) per invocation")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the retry jitter")
+    parser.add_argument("--verbose", action="store_true", help="Print the response message of every failure")
+    parser.add_argument("--virtual-time", action="store_true", help="Simulate the waits instead of waiting")
+    args = parser.parse_args()
+
+    lambda_module = import_lambda_module()
+    clock = lambda_module.VirtualClock() if args.virtual_time else lambda_module.SystemClock()
+    lambda_module.set_clock(clock)
+    if args.seed is not None:
+        lambda_module.random.seed(args.seed)
+
+    profile_names = ["healthy"] + [name for name in args.profiles if name != "healthy"]
+    baseline_times = dict()
+    failure_messages = list()
+    print("| Profile | Action | Result | Time to result s | Added s | API calls | Faults | Sleep time s |")
+    print("|---|---|---|---|---|---|---|---|")
+    try:
+        for profile_name in profile_names:
+            profile = FAULT_PROFILES[profile_name]
+            controller = MockAviatrixController(api_latency=args.api_latency, clock=clock, **profile["controller"])
+            controller.start()
+            try:
+                for action in args.actions:
+                    result = run_profile_action(
+                        lambda_module=lambda_module,
+                        controller=controller,
+                        clock=clock,
+                        profile=profile,
+                        action=action,
+                        timeout=args.timeout
+                    )
+                    if profile_name == "healthy":
+                        baseline_times[action] = result["time_to_result"]
+                    if not result["status"]:
+                        failure_messages.append((profile_name, action, result["message"]))
+                    if profile_name == "healthy" and "healthy" not in args.profiles:
+                        continue  # Only measured as the baseline
+                    print("| {0} | {1} | {2} | {3:.2f} | {4:+.2f} | {5} | {6} | {7:.2f} |".format(
+                        profile_name,
+                        action,
+                        "SUCCESS" if result["status"] else "FAILURE",
+                        result["time_to_result"],
+                        result["time_to_result"] - baseline_times[action],
+                        result["api_calls"],
+                        result["faults"],
+                        result["sleep_time"]
+                    ))
+                # END for
+            finally:
+                controller.stop()
+        # END for
+    finally:
+        lambda_module.set_clock(None)
+    # END try-finally
+
+    if args.verbose:
+        for profile_name, action, message in failure_messages:
+            print("\n" + profile_name + " / " + action + ": " + message)
+# END def main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Description:
+=============
+    Measures the TLS handshakes and the latency saved by the pooled keep-alive HTTP session, for every Aviatrix action.
+
+    Every action is invoked against the local mock controller:
+        + "legacy" : HTTP_KEEP_ALIVE is False, so every API call opens a new TCP+TLS connection (the behavior of the
+                     module-level "requests.get/post/put" calls)
+        + "pooled" : HTTP_KEEP_ALIVE is True, the pooled session is kept across the warm invocations
+
+    The "--handshake-latency" option emulates the extra network round trips of a TCP+TLS handshake between a Lambda
+    function and a remote controller (the local handshake alone costs only a few milliseconds).
+
+
+Usage:
+=======
+    python3 benchmarks/benchmark_http_connection_pool.py --invocations 5 --handshake-latency 0.03
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from mock_aviatrix_controller import MockAviatrixController
+from sample_events import ACTION_PROPERTIES, build_event, import_lambda_module
+
+
+def run_action(lambda_module, controller, action, keep_alive, invocations):
+    lambda_module.HTTP_KEEP_ALIVE = keep_alive
+    lambda_module._http_sessions.clear()  # Every run starts from a cold execution environment
+    controller.reset_counters()
+
+    event = build_event(action=action, controller_hostname=controller.hostname)
+    start_time = time.time()
+    for i in range(invocations):
+        with contextlib.redirect_stdout(io.StringIO()):
+            lambda_module._lambda_handler(event, None)
+    elapsed_time = time.time() - start_time
+
+    return {
+        "handshakes": float(controller.handshake_count) / invocations,
+        "api_calls": float(controller.api_call_count) / invocations,
+        "latency_ms": elapsed_time * 1000 / invocations,
+    }
+# END def run_action()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, default=5, help="Warm invocations per action")
+    parser.add_argument("--handshake-latency", type=float, default=0.03, help="Second(s) added per new connection")
+    args = parser.parse_args()
+
+    lambda_module = import_lambda_module()
+    controller = MockAviatrixController(handshake_latency=args.handshake_latency).start()
+    try:
+        print("| Action | API calls | Handshakes (legacy) | Handshakes (pooled) | "
+              "Latency ms (legacy) | Latency ms (pooled) | Saved ms |")
+        print("|---|---|---|---|---|---|---|")
+        for action in ACTION_PROPERTIES:
+            legacy = run_action(lambda_module, controller, action, keep_alive=False, invocations=args.invocations)
+            pooled = run_action(lambda_module, controller, action, keep_alive=True, invocations=args.invocations)
+            print("| {0} | {1:.0f} | {2:.1f} | {3:.1f} | {4:.0f} | {5:.0f} | {6:.0f} |".format(
+                action,
+                legacy["api_calls"],
+                legacy["handshakes"],
+                pooled["handshakes"],
+                legacy["latency_ms"],
+                pooled["latency_ms"],
+                legacy["latency_ms"] - pooled["latency_ms"]
+            ))
+        # END for
+    finally:
+        controller.stop()
+# END def main()
+
+
+if __name__ == "__main__":
+    main()
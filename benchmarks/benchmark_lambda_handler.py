@@ -0,0 +1,125 @@
+"""
+Description:
+=============
+    End-to-end benchmark of "lambda_handler" for every Aviatrix action of sample_events.ACTION_PROPERTIES, against the
+    local mock controller.
+
+    For every action, the benchmark reports per invocation (averaged over "--invocations" warm invocations, OR cold
+    invocations with "--cold"):
+        + Wall time  : the latency of lambda_handler()
+        + API calls  : the API calls served by the mock controller (including the retries)
+        + HTTP errors: the API calls failed on purpose by the mock controller ("--error-rate")
+        + Sleep time : the time lambda_handler() has spent waiting (before the retries, between readiness polls)
+        + Failures   : the invocations which have returned a failure
+
+    The "--error-rate" option makes the mock controller fail that fraction of the API calls with HTTP 503, which the
+    Lambda function retries after a backoff.
+
+
+Usage:
+=======
+    python3 benchmarks/benchmark_lambda_handler.py --invocations 5 --api-latency 0.05 --error-rate 0.1 --seed 1
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from mock_aviatrix_controller import MockAviatrixController
+from sample_events import ACTION_PROPERTIES, FakeLambdaContext, build_event, import_lambda_module
+
+
+def clear_module_caches(lambda_module):
+    """ Makes the next invocation run as in a new (cold) Lambda execution environment """
+    lambda_module._http_sessions.clear()
+    lambda_module._cid_cache.clear()
+    lambda_module._preflight_cache.clear()
+# END def clear_module_caches()
+
+
+def run_action(lambda_module, controller, clock, action, invocations, timeout, cold=False):
+    lambda_module._circuit_breakers.clear()  # Every action starts with a closed circuit breaker
+    event = build_event(action=action, controller_hostname=controller.hostname)
+
+    # Warm up: login and connections, so every action starts from a warm execution environment
+    with contextlib.redirect_stdout(io.StringIO()):
+        lambda_module.lambda_handler(event, FakeLambdaContext(timeout=timeout))
+    controller.reset_counters()
+    clock.reset_sleep_time()
+
+    failure_count = 0
+    start_time = time.time()
+    for i in range(invocations):
+        if cold:
+            clear_module_caches(lambda_module)
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = lambda_module.lambda_handler(event, FakeLambdaContext(timeout=timeout))
+        if not response["status"]:
+            failure_count += 1
+    # END for
+    elapsed_time = time.time() - start_time
+
+    return {
+        "wall_time_ms": elapsed_time * 1000 / invocations,
+        "api_calls": float(controller.api_call_count) / invocations,
+        "http_errors": float(controller.error_count) / invocations,
+        "sleep_time_ms": clock.sleep_time * 1000 / invocations,
+        "failures": failure_count,
+    }
+# END def run_action()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, default=5, help="Invocations per action")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Second(s) added per API call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API calls failed with HTTP 503")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the mock errors and the retry jitter")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Lambda timeout (second(s)) per invocation")
+    parser.add_argument("--cold", action="store_true", help="Clear the module caches before every invocation")
+    parser.add_argument("--actions", nargs="+", default=list(ACTION_PROPERTIES), help="Actions to benchmark")
+    args = parser.parse_args()
+
+    lambda_module = import_lambda_module()
+    clock = lambda_module.SystemClock()
+    lambda_module.set_clock(clock)
+    if args.seed is not None:
+        lambda_module.random.seed(args.seed)
+
+    controller = MockAviatrixController(
+        api_latency=args.api_latency,
+        error_rate=args.error_rate,
+        seed=args.seed
+    ).start()
+    try:
+        print("| Action | Wall time ms | API calls | HTTP errors | Sleep time ms | Failures |")
+        print("|---|---|---|---|---|---|")
+        for action in args.actions:
+            result = run_action(
+                lambda_module=lambda_module,
+                controller=controller,
+                clock=clock,
+                action=action,
+                invocations=args.invocations,
+                timeout=args.timeout,
+                cold=args.cold
+            )
+            print("| {0} | {1:.0f} | {2:.1f} | {3:.1f} | {4:.0f} | {5}/{6} |".format(
+                action,
+                result["wall_time_ms"],
+                result["api_calls"],
+                result["http_errors"],
+                result["sleep_time_ms"],
+                result["failures"],
+                args.invocations
+            ))
+        # END for
+    finally:
+        lambda_module.set_clock(None)
+        controller.stop()
+# END def main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Description:
+=============
+    Simulates an account-vending storm, e.g. a Landing Zone bulk enrollment: "--invocations" lambda_handler()
+    invocations start at the same moment, every one in its own process (a cold Lambda execution environment), against
+    one mock controller. The mock controller serves at most "--controller-concurrency" API calls at a time and queues
+    the others. Once "--controller-queue" API calls are waiting, it answers the next ones with 503, which the Lambda
+    function retries after a backoff.
+
+    The invocations alternate over "--actions" ("CreateAccessAccount" and "ATTACH" by default), every one with its own
+    access account OR VPC. "--lambda-concurrency" caps the invocations running at a time, like the reserved concurrency
+    of the Lambda function: the other invocations wait for a free slot, and their latency includes that wait.
+
+    For every storm size ("--invocations") and every Lambda concurrency cap ("--lambda-concurrency"), the benchmark
+    reports:
+        + p50/p95/p99 s : the end-to-end latency of the invocations, from the start of the storm
+        + Failures      : the invocations which have returned a failure
+        + Logins        : the "login" API calls served by the controller
+        + Retries       : the retries spent by all invocations (see RetryBudget of the Lambda function)
+        + Rejected      : the API calls answered with 503 because the controller queue was full
+        + Queue depth   : the mean and the max number of API calls waiting for the controller, as seen by every
+                          arriving API call
+
+
+Usage:
+=======
+    python3 benchmarks/benchmark_load_storm.py --invocations 10 25 50 --controller-concurrency 4 --api-latency 0.2
+    python3 benchmarks/benchmark_load_storm.py --invocations 50 --lambda-concurrency 0 10 20 --controller-queue 20
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import multiprocessing
+import time
+
+from mock_aviatrix_controller import MockAviatrixController
+from sample_events import ACTION_PROPERTIES, FakeLambdaContext, build_event, import_lambda_module
+
+
+def build_storm_event(action="ATTACH", i=0, controller_hostname="127.0.0.1:443"):
+    """ The event of the i-th invocation of the storm, with its own access account OR VPC """
+    event = build_event(action=action, controller_hostname=controller_hostname)
+    resource_properties = event["ResourceProperties"]
+    if "AccessAccountNameParam" in ACTION_PROPERTIES[action]:
+        resource_properties["AccessAccountNameParam"] = "storm-account-" + str(i)
+    if "VpcIdParam" in ACTION_PROPERTIES[action]:
+        resource_properties["VpcIdParam"] = "vpc-storm-" + str(i)
+    return event
+# END def build_storm_event()
+
+
+def run_invocation(
+    action,
+    i,
+    controller_hostname,
+    timeout,
+    seed,
+    start_barrier,
+    lambda_slots,
+    result_queue
+        ):
+    """ Runs in its own process: one cold invocation of lambda_handler(), started together with the whole storm """
+    lambda_module = import_lambda_module()
+    if seed is not None:
+        lambda_module.random.seed(seed + i)
+    start_barrier.wait()  # Every process has imported the Lambda function, and the controller is up
+
+    start_time = time.time()
+    event = build_storm_event(action=action, i=i, controller_hostname=controller_hostname.value.decode("utf-8"))
+    with lambda_slots:
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = lambda_module.lambda_handler(event, FakeLambdaContext(timeout=timeout))
+    result_queue.put({
+        "latency": time.time() - start_time,
+        "status": response["status"],
+        "retry_count": lambda_module.get_retry_budget().retry_count,
+    })
+# END def run_invocation()
+
+
+def get_percentile(values, percent):
+    """ Nearest-rank percentile of "values" """
+    sorted_values = sorted(values)
+    rank = max(int(math.ceil(len(sorted_values) * percent / 100.0)), 1)
+    return sorted_values[rank - 1]
+# END def get_percentile()
+
+
+def run_storm(
+    mp_context,
+    invocations,
+    lambda_concurrency,
+    actions,
+    controller_kwargs,
+    timeout,
+    seed
+        ):
+    start_barrier = mp_context.Barrier(invocations + 1)
+    lambda_slots = mp_context.BoundedSemaphore(lambda_concurrency if lambda_concurrency > 0 else invocations)
+    result_queue = mp_context.Queue()
+    controller_hostname = mp_context.Array("c", 64)
+
+    # Fork the invocations BEFORE the mock controller starts its server threads
+    processes = [
+        mp_context.Process(
+            target=run_invocation,
+            args=(actions[i % len(actions)], i, controller_hostname, timeout, seed, start_barrier, lambda_slots,
+                  result_queue),
+            daemon=True
+        )
+        for i in range(invocations)
+    ]
+    for process in processes:
+        process.start()
+
+    controller = MockAviatrixController(**controller_kwargs).start()
+    try:
+        controller_hostname.value = controller.hostname.encode("utf-8")
+        start_barrier.wait()
+        results = [result_queue.get() for _ in range(invocations)]
+        for process in processes:
+            process.join()
+    finally:
+        controller.stop()
+    # END try-finally
+
+    latencies = [result["latency"] for result in results]
+    queue_depth_samples = controller.queue_depth_samples or [0]
+    return {
+        "p50": get_percentile(latencies, 50),
+        "p95": get_percentile(latencies, 95),
+        "p99": get_percentile(latencies, 99),
+        "failures": len([result for result in results if not result["status"]]),
+        "logins": controller.api_call_count_by_action.get("login", 0),
+        "retries": sum(result["retry_count"] for result in results),
+        "rejected": controller.rejected_count,
+        "mean_queue_depth": float(sum(queue_depth_samples)) / len(queue_depth_samples),
+        "max_queue_depth": max(queue_depth_samples),
+    }
+# END def run_storm()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, nargs="+", default=[10, 25, 50], help="Invocations per storm")
+    parser.add_argument("--lambda-concurrency", type=int, nargs="+", default=[0],
+                        help="Max invocations running at a time (0: every invocation at once)")
+    parser.add_argument("--actions", nargs="+", default=["CreateAccessAccount", "ATTACH"],
+                        help="Actions the invocations alternate over")
+    parser.add_argument("--controller-concurrency", type=int, default=4, help="Max API calls served at a time")
+    parser.add_argument("--controller-queue", type=int, default=None,
+                        help="Max API calls waiting for the controller, beyond which it answers 503 (default: no max)")
+    parser.add_argument("--api-latency", type=float, default=0.2, help="Second(s) added per API call")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Lambda timeout (second(s)) per invocation")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the retry jitter")
+    args = parser.parse_args()
+
+    import_lambda_module()  # Imported once, then shared by every forked invocation
+    start_methods = multiprocessing.get_all_start_methods()
+    mp_context = multiprocessing.get_context("fork" if "fork" in start_methods else "spawn")
+    controller_kwargs = {
+        "api_latency": args.api_latency,
+        "max_concurrency": args.controller_concurrency,
+        "max_queue_depth": args.controller_queue,
+    }
+
+    row_format = "| {0} | {1} | {2} | {3:.2f} | {4:.2f} | {5:.2f} | {6}/{0} | {7} | {8} | {9} | {10:.1f}/{11} |"
+    print("| Invocations | Lambda concurrency | Controller concurrency | p50 s | p95 s | p99 s | Failures | Logins | "
+          "Retries | Rejected | Queue depth (mean/max) |")
+    print("|---|---|---|---|---|---|---|---|---|---|---|")
+    for invocations in args.invocations:
+        for lambda_concurrency in args.lambda_concurrency:
+            result = run_storm(
+                mp_context=mp_context,
+                invocations=invocations,
+                lambda_concurrency=lambda_concurrency,
+                actions=args.actions,
+                controller_kwargs=controller_kwargs,
+                timeout=args.timeout,
+                seed=args.seed
+            )
+            print(row_format.format(
+                invocations,
+                lambda_concurrency if lambda_concurrency > 0 else "unlimited",
+                args.controller_concurrency,
+                result["p50"],
+                result["p95"],
+                result["p99"],
+                result["failures"],
+                result["logins"],
+                result["retries"],
+                result["rejected"],
+                result["mean_queue_depth"],
+                result["max_queue_depth"]
+            ))
+        # END for
+    # END for
+# END def main()
+
+
+if __name__ == "__main__":
+    main()
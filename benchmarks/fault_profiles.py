@@ -0,0 +1,57 @@
+"""
+Description:
+=============
+    Named fault profiles of the mock controller, which replay the failures of a real controller. Every profile is:
+        + "description" : What the profile emulates
+        + "controller"  : The keyword arguments of MockAviatrixController for the faults
+        + "event"       : The "ResourceProperties" of the event which the profile overrides
+
+
+Usage:
+=======
+    profile = FAULT_PROFILES["flapping-502"]
+    controller = MockAviatrixController(api_latency=0.02, **profile["controller"]).start()
+    event["ResourceProperties"].update(profile["event"])
+"""
+
+
+''' Variable Description: (FAULT_PROFILES)
+Description:
+    * key  : The name of the profile
+    * value: {"description", "controller", "event"}
+'''
+FAULT_PROFILES = {
+    "healthy": {
+        "description": "No fault, the baseline of the other profiles",
+        "controller": {},
+        "event": {},
+    },
+    "slow-boot": {
+        "description": "The API server of a freshly launched controller is ready 25 seconds after the boot, and "
+                       "answers 502 until then",
+        "controller": {"boot_time": 25.0},
+        "event": {},
+    },
+    "flapping-502": {
+        "description": "The API calls fail with 502 twice in a row, then succeed 3 times in a row, and so on",
+        "controller": {"flap_pattern": (2, 3), "flap_status_code": 502},
+        "event": {},
+    },
+    "reset-mid-post": {
+        "description": "Every third POST API call is applied by the controller, but the connection is reset before "
+                       "the response",
+        "controller": {"reset_pattern": (1, 2)},
+        "event": {},
+    },
+    "wrong-route": {
+        "description": 'The event has a wrong "AviatrixApiRouteParam", so every API call is answered with 404',
+        "controller": {},
+        "event": {"AviatrixApiRouteParam": "wrong-route/"},
+    },
+    "cid-expiry": {
+        "description": "Every CID expires on the twelfth API call (and every twelfth API call after), e.g. in the "
+                       "middle of a batch of API calls",
+        "controller": {"expire_cids_every": 12},
+        "event": {},
+    },
+}
@@ -0,0 +1,839 @@
+"""
+Description:
+=============
+    A discrete-event simulator of the Lambda function, to answer capacity questions such as "how many accounts per
+    hour can one controller onboard with our retry settings", in simulated time.
+
+    + record   : runs lambda_handler() for "--actions" against the mock controller (OR a real controller with
+                 "--controller-hostname"), and records the latency and the outcome of every API call (JSON lines)
+    + simulate : fits a log-normal latency distribution and a failure rate per API from "--recordings", then simulates
+                 one onboarding wave for every combination of the swept settings
+
+    A simulated invocation goes through the phases of _lambda_handler(), with the settings of the Lambda function:
+        + readiness : the optimistic login, then (IF it has failed) the readiness polls, every 10 seconds for up to
+                      120 seconds
+        + login     : the login, skipped while the execution environment has a cached CID (CID_CACHE_TTL)
+        + preflight : the post-login preflight steps of the action (at the same time with CONCURRENT_PREFLIGHT),
+                      skipped while the execution environment has cached their results (PREFLIGHT_CACHE_TTL)
+        + action    : the API calls of the action, see ACTION_API_CALLS
+    Every API call waits for one of the "--controller-concurrency" controller workers, takes a latency drawn from the
+    distribution of its API, and fails with the failure rate of its API. A failed API call is retried the way
+    _send_aviatrix_api_with_retry() does: a full-jitter backoff, the retry budget of the invocation, and no retry
+    which can not finish before the invocation deadline. Every failure is treated as transient: the verification of
+    ambiguous failures and the circuit breaker are not simulated.
+
+    One account is onboarded by one "CreateAccessAccount" invocation, followed by "--vpcs-per-account" "ATTACH"
+    invocations at the same time. At most "--lambda-concurrency" invocations run at a time (first come, first
+    served), in execution environments which keep their cached CID and preflight results for the next invocations,
+    like warm Lambda execution environments.
+
+    For every combination of "--lambda-concurrency", "--controller-concurrency", "--retry-count",
+    "--retry-backoff-base" and "--timeout", the simulator reports the accounts onboarded per hour, the failed accounts,
+    the p50/p95/p99 latency of the invocations (from the arrival of their account), the login API calls, the retries,
+    the controller queue length (time-weighted mean and max) and the controller utilization. "--phases" adds the
+    mean time per invocation spent in every phase.
+
+
+Usage:
+=======
+    python3 benchmarks/landing_zone_simulator.py record --output /tmp/recording.jsonl --runs 20 --api-latency 0.3 \\
+        --api-latency-by-action setup_account_profile=3 attach_vpc_to_tgw=6 --api-latency-sigma 0.3 --error-rate 0.02
+    python3 benchmarks/landing_zone_simulator.py simulate --recordings /tmp/recording.jsonl --accounts 500 \\
+        --lambda-concurrency 5 10 20 --controller-concurrency 4 --retry-count 3 5 --timeout 300 900
+"""
+
+import argparse
+import collections
+import contextlib
+import heapq
+import io
+import itertools
+import json
+import math
+import random
+import threading
+import time
+
+from benchmark_lambda_handler import clear_module_caches
+from mock_aviatrix_controller import MockAviatrixController
+from sample_events import ACTION_PROPERTIES, FakeLambdaContext, build_event, import_lambda_module
+
+
+''' Variable Description: (ACTION_API_CALLS)
+Description:
+    * key  : The value of "AviatrixActionParam"
+    * value: The stages of API calls of the action, run one after the other. The API calls of one stage run at the
+             same time, at most ROUTE_DOMAIN_CONCURRENCY at a time (the route domain connections of
+             "BuildNewRouteDomain", and the disconnections of "TeardownRouteDomain" in its default "full" mode)
+'''
+ACTION_API_CALLS = {
+    "CREATE": [["add_aws_tgw"]],
+    "DELETE": [["delete_aws_tgw"]],
+    "ATTACH": [["attach_vpc_to_tgw"]],
+    "DETACH": [["detach_vpc_from_tgw"]],
+    "CreateAccessAccount": [["setup_account_profile"]],
+    "DeleteAviatrixAccessAccount": [["delete_account_profile"]],
+    "BuildNewRouteDomain": [["add_route_domain"], ["add_connection_between_route_domains"] * 10],
+    "TeardownRouteDomain": [["delete_connection_between_route_domains"] * 10, ["delete_route_domain"]],
+}
+
+PREFLIGHT_STEP_APIS = {
+    "check_initialized": "initial_setup",
+    "get_controller_version": "list_version_info",
+}
+
+READINESS_TOTAL_WAIT_TIME = 120  # second(s), as in _run_preflight()
+READINESS_INTERVAL_WAIT_TIME = 10  # second(s), as in _run_preflight()
+DEFAULT_API = "*"  # The distribution of every recorded API call, for an API without a recording
+
+
+class LatencyRecorder(object):
+    """
+    Records the latency and the outcome ("ok" for HTTP 200, "error" otherwise) of every API call sent by the Lambda
+    function, by wrapping its _send_http_request(). Use it as a context manager around the lambda_handler() calls.
+    """
+    def __init__(self, lambda_module):
+        self.lambda_module = lambda_module
+        self.records = list()
+        self._lock = threading.Lock()
+        self._send_http_request = None
+
+    def __enter__(self):
+        self._send_http_request = self.lambda_module._send_http_request
+        self.lambda_module._send_http_request = self._send_and_record
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.lambda_module._send_http_request = self._send_http_request
+
+    def _send_and_record(self, *args, **kwargs):
+        payload = kwargs.get("params") or kwargs.get("data") or dict()
+        start_time = time.time()
+        outcome = "error"
+        try:
+            response = self._send_http_request(*args, **kwargs)
+            if response is not None and response.status_code == 200:
+                outcome = "ok"
+            return response
+        finally:
+            with self._lock:
+                self.records.append({
+                    "api": payload.get("action", ""),
+                    "latency": time.time() - start_time,
+                    "outcome": outcome,
+                })
+            # END with
+        # END try-finally
+
+    def save(self, path):
+        with open(path, "w") as recording_file:
+            for record in self.records:
+                recording_file.write(json.dumps(record) + "\n")
+# END class LatencyRecorder
+
+
+def load_recordings(paths=list()):
+    records = list()
+    for path in paths:
+        with open(path) as recording_file:
+            records.extend(json.loads(line) for line in recording_file if line.strip())
+    return records
+# END def load_recordings()
+
+
+class LatencyDistribution(object):
+    """ The log-normal latency of one API, fitted from its recorded latencies, and the rate of its failed calls """
+    def __init__(self, mu=0.0, sigma=0.0, failure_rate=0.0, sample_count=0):
+        self.mu = mu
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.sample_count = sample_count
+
+    @classmethod
+    def fit(cls, records=list()):
+        """ Maximum likelihood fit: mu and sigma are the mean and the standard deviation of the log latencies """
+        log_latencies = [math.log(max(record["latency"], 1e-6)) for record in records]
+        mu = sum(log_latencies) / len(log_latencies)
+        sigma = math.sqrt(sum((log_latency - mu) ** 2 for log_latency in log_latencies) / len(log_latencies))
+        failure_count = len([record for record in records if record["outcome"] != "ok"])
+        return cls(mu=mu, sigma=sigma, failure_rate=float(failure_count) / len(records), sample_count=len(records))
+
+    def get_median(self):
+        return math.exp(self.mu)
+
+    def get_percentile(self, percent=95):
+        return math.exp(self.mu + self.sigma * _get_standard_normal_quantile(percent / 100.0))
+
+    def sample_latency(self, rng):
+        return rng.lognormvariate(self.mu, self.sigma)
+# END class LatencyDistribution
+
+
+def _get_standard_normal_quantile(p=0.5):
+    """ The inverse of the standard normal CDF, by bisection on math.erf() """
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if 0.5 * (1 + math.erf(middle / math.sqrt(2))) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+# END def _get_standard_normal_quantile()
+
+
+def fit_latency_distributions(records=list()):
+    """ :return: {"api": LatencyDistribution}, plus DEFAULT_API fitted from every record """
+    records_by_api = collections.defaultdict(list)
+    for record in records:
+        records_by_api[record["api"]].append(record)
+    distributions = {api: LatencyDistribution.fit(api_records) for api, api_records in records_by_api.items()}
+    distributions[DEFAULT_API] = LatencyDistribution.fit(records)
+    return distributions
+# END def fit_latency_distributions()
+
+
+class Timeout(object):
+    """ Yielded by a process to resume "delay" second(s) later """
+    def __init__(self, delay=0.0):
+        self.delay = delay
+# END class Timeout
+
+
+class Acquire(object):
+    """ Yielded by a process to resume once it holds one slot of "resource" """
+    def __init__(self, resource):
+        self.resource = resource
+# END class Acquire
+
+
+class AllOf(object):
+    """ Yielded by a process to run "generators" as concurrent processes, and resume with the list of their results """
+    def __init__(self, generators=list()):
+        self.generators = list(generators)
+# END class AllOf
+
+
+class Simulation(object):
+    """
+    The event loop of the simulated time. A process is a generator which yields Timeout, Acquire OR AllOf, and is
+    resumed when the event happens. Events of the same time run in the order they have been scheduled.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self._events = list()  # heap of (time, sequence number, callback)
+        self._sequence_numbers = itertools.count()
+
+    def schedule(self, delay, callback):
+        heapq.heappush(self._events, (self.now + max(delay, 0.0), next(self._sequence_numbers), callback))
+
+    def start(self, generator, on_done=None):
+        """ Starts "generator" as a process. on_done(its return value) is called when it returns """
+        self.schedule(0.0, _Process(simulation=self, generator=generator, on_done=on_done).resume)
+
+    def run(self):
+        while self._events:
+            self.now, _, callback = heapq.heappop(self._events)
+            callback()
+# END class Simulation
+
+
+class _Process(object):
+    def __init__(self, simulation, generator, on_done=None):
+        self.simulation = simulation
+        self.generator = generator
+        self.on_done = on_done
+
+    def resume(self, value=None):
+        try:
+            command = self.generator.send(value)
+        except StopIteration as e:
+            if self.on_done is not None:
+                self.on_done(e.value)
+            return
+        # END try-except
+
+        if isinstance(command, Timeout):
+            self.simulation.schedule(command.delay, self.resume)
+        elif isinstance(command, Acquire):
+            command.resource.acquire(callback=self.resume)
+        elif isinstance(command, AllOf):
+            self._wait_for_all(generators=command.generators)
+        else:
+            raise TypeError("A process can only yield Timeout, Acquire OR AllOf, not " + repr(command))
+        # END if-else
+
+    def _wait_for_all(self, generators=list()):
+        results = [None] * len(generators)
+        remaining_count = [len(generators)]
+        if len(generators) == 0:
+            self.simulation.schedule(0.0, lambda: self.resume(results))
+            return
+
+        def on_done(result, i):
+            results[i] = result
+            remaining_count[0] -= 1
+            if remaining_count[0] == 0:
+                self.resume(results)
+        # END def on_done()
+
+        for i, generator in enumerate(generators):
+            self.simulation.start(generator, on_done=lambda result, i=i: on_done(result, i))
+    # END def _wait_for_all()
+# END class _Process
+
+
+class Resource(object):
+    """
+    "capacity" slots, handed out first come, first served. "max_queue_length" (None for no max) rejects the
+    acquire() calls once that many are already waiting. Tracks the time-weighted queue length and busy slots.
+    """
+    def __init__(self, simulation, capacity=1, max_queue_length=None):
+        self.simulation = simulation
+        self.capacity = capacity
+        self.max_queue_length = max_queue_length
+        self.in_use = 0
+        self.longest_queue_length = 0
+        self._waiters = collections.deque()
+        self._queue_length_time = 0.0
+        self._busy_time = 0.0
+        self._last_change_time = 0.0
+
+    def is_full(self):
+        return self.max_queue_length is not None and self.in_use >= self.capacity and \
+            len(self._waiters) >= self.max_queue_length
+
+    def acquire(self, callback):
+        self._accumulate()
+        if self.in_use < self.capacity:
+            self.in_use += 1
+            callback()
+            return
+        self._waiters.append(callback)
+        self.longest_queue_length = max(self.longest_queue_length, len(self._waiters))
+
+    def release(self):
+        self._accumulate()
+        if self._waiters:
+            self.simulation.schedule(0.0, self._waiters.popleft())  # The slot goes to the first waiter
+        else:
+            self.in_use -= 1
+
+    def get_mean_queue_length(self):
+        self._accumulate()
+        return self._queue_length_time / self.simulation.now if self.simulation.now > 0 else 0.0
+
+    def get_utilization(self):
+        self._accumulate()
+        return self._busy_time / (self.capacity * self.simulation.now) if self.simulation.now > 0 else 0.0
+
+    def _accumulate(self):
+        elapsed_time = self.simulation.now - self._last_change_time
+        self._queue_length_time += len(self._waiters) * elapsed_time
+        self._busy_time += self.in_use * elapsed_time
+        self._last_change_time = self.simulation.now
+# END class Resource
+
+
+class _InvocationFailure(Exception):
+    pass
+# END class _InvocationFailure
+
+
+class LandingZoneModel(object):
+    """ One onboarding wave of "accounts" accounts, simulated with one combination of settings """
+    def __init__(
+        self,
+        lambda_module,
+        distributions,
+        accounts=100,
+        vpcs_per_account=1,
+        arrival_interval=0.0,
+        lambda_concurrency=10,
+        controller_concurrency=4,
+        controller_queue=None,
+        retry_count=5,
+        retry_backoff_base=None,
+        retry_backoff_max=None,
+        retry_budget_count=None,
+        retry_budget_time=None,
+        timeout=900.0,
+        error_rate=None,
+        boot_time=0.0,
+        seed=None
+    ):
+        """
+        :param distributions:     {"api": LatencyDistribution}, see fit_latency_distributions()
+        :param arrival_interval:  second(s) between the arrivals of two accounts (0: every account at once)
+        :param controller_queue:  max API calls waiting for the controller, beyond which they fail (None: no max)
+        :param retry_*:           None keeps the setting of the Lambda function
+        :param timeout:           the Lambda timeout (second(s))
+        :param error_rate:        overrides the fitted failure rate of every API (None keeps them)
+        :param boot_time:         every API call fails for the first "boot_time" second(s), like a booting controller
+        """
+        self.lambda_module = lambda_module
+        self.distributions = distributions
+        self.accounts = accounts
+        self.vpcs_per_account = vpcs_per_account
+        self.arrival_interval = arrival_interval
+        self.retry_count = retry_count
+        self.retry_backoff_base = lambda_module.RETRY_BACKOFF_BASE if retry_backoff_base is None else retry_backoff_base
+        self.retry_backoff_max = lambda_module.RETRY_BACKOFF_MAX if retry_backoff_max is None else retry_backoff_max
+        self.retry_budget_count = lambda_module.RETRY_BUDGET_COUNT if retry_budget_count is None else retry_budget_count
+        self.retry_budget_time = lambda_module.RETRY_BUDGET_TIME if retry_budget_time is None else retry_budget_time
+        self.timeout = timeout
+        self.error_rate = error_rate
+        self.boot_time = boot_time
+        self.random = random.Random(seed)
+
+        self.simulation = Simulation()
+        self.lambda_slots = Resource(simulation=self.simulation, capacity=lambda_concurrency)
+        self.controller = Resource(
+            simulation=self.simulation,
+            capacity=controller_concurrency,
+            max_queue_length=controller_queue
+        )
+        self.idle_environments = list()  # The warm execution environments
+        self.cold_start_count = 0
+        self.api_call_counts = collections.Counter()
+        self.rejected_count = 0
+        self.invocations = list()
+        self.account_results = list()
+
+    def run(self):
+        for i in range(self.accounts):
+            self.simulation.start(self._onboard_account(arrival_time=i * self.arrival_interval))
+        self.simulation.run()
+        return self.get_results()
+
+    def get_results(self):
+        latencies = [invocation["end_time"] - invocation["arrival_time"] for invocation in self.invocations]
+        onboarded_accounts = [account for account in self.account_results if account["status"]]
+        makespan = max(account["end_time"] for account in self.account_results)
+        return {
+            "accounts_per_hour": len(onboarded_accounts) * 3600.0 / makespan if makespan > 0 else 0.0,
+            "failed_accounts": len(self.account_results) - len(onboarded_accounts),
+            "makespan": makespan,
+            "p50": _get_percentile(latencies, 50),
+            "p95": _get_percentile(latencies, 95),
+            "p99": _get_percentile(latencies, 99),
+            "logins": self.api_call_counts["login"],
+            "retries": sum(invocation["retry_count"] for invocation in self.invocations),
+            "rejected": self.rejected_count,
+            "cold_starts": self.cold_start_count,
+            "mean_queue_length": self.controller.get_mean_queue_length(),
+            "max_queue_length": self.controller.longest_queue_length,
+            "utilization": self.controller.get_utilization(),
+            "phase_times": {
+                phase: sum(invocation["phase_times"][phase] for invocation in self.invocations) / len(self.invocations)
+                for phase in ("lambda_queue", "readiness", "login", "preflight", "action", "sleep")
+            },
+            "failure_reasons": collections.Counter(
+                invocation["reason"] for invocation in self.invocations if not invocation["status"]
+            ),
+        }
+
+    def _onboard_account(self, arrival_time=0.0):
+        yield Timeout(arrival_time)
+        invocations = [self._run_invocation(action="CreateAccessAccount", arrival_time=arrival_time)]
+        for action_count in [1, self.vpcs_per_account]:
+            results = yield AllOf(invocations[:action_count])
+            if not all(invocation["status"] for invocation in results):
+                break
+            invocations = [
+                self._run_invocation(action="ATTACH", arrival_time=arrival_time)
+                for _ in range(self.vpcs_per_account)
+            ]
+        # END for
+        self.account_results.append({
+            "status": all(invocation["status"] for invocation in results),
+            "end_time": self.simulation.now
+        })
+
+    def _run_invocation(self, action="ATTACH", arrival_time=0.0):
+        yield Acquire(self.lambda_slots)
+        if self.idle_environments:
+            environment = self.idle_environments.pop()
+        else:
+            environment = {"login_time": None, "preflight_time": None}
+            self.cold_start_count += 1
+        # END if-else
+
+        invocation = {
+            "action": action,
+            "arrival_time": arrival_time,
+            "deadline": self.simulation.now + self.timeout - self.lambda_module.DEADLINE_RESERVED_TIME,
+            "status": True,
+            "reason": "",
+            "retry_count": 0,
+            "retry_time": 0.0,
+            "phase_times": collections.Counter({"lambda_queue": self.simulation.now - arrival_time}),
+        }
+        try:
+            yield from self._run_phases(invocation=invocation, environment=environment)
+        except _InvocationFailure as e:
+            invocation["status"] = False
+            invocation["reason"] = str(e)
+        # END try-except
+
+        invocation["end_time"] = self.simulation.now
+        self.invocations.append(invocation)
+        self.idle_environments.append(environment)
+        self.lambda_slots.release()
+        return invocation
+
+    def _run_phases(self, invocation, environment):
+        lambda_module = self.lambda_module
+        preflight_steps = list(lambda_module.AVIATRIX_ACTIONS[invocation["action"].upper()]["preflight_steps"])
+        if environment["login_time"] is not None and \
+           self.simulation.now - environment["login_time"] < lambda_module.CID_CACHE_TTL:
+            preflight_steps = [step for step in preflight_steps
+                               if step not in (lambda_module.PREFLIGHT_WAIT_FOR_API_SERVER,
+                                               lambda_module.PREFLIGHT_LOGIN)]
+        # END if
+        if environment["preflight_time"] is not None and \
+           self.simulation.now - environment["preflight_time"] < lambda_module.PREFLIGHT_CACHE_TTL:
+            preflight_steps = [step for step in preflight_steps if step not in PREFLIGHT_STEP_APIS]
+
+        ### readiness
+        phase_start_time = self.simulation.now
+        if lambda_module.OPTIMISTIC_LOGIN and lambda_module.PREFLIGHT_WAIT_FOR_API_SERVER in preflight_steps and \
+           lambda_module.PREFLIGHT_LOGIN in preflight_steps:
+            is_succeeded = yield from self._call_api(invocation=invocation, api="login")
+            if is_succeeded:
+                environment["login_time"] = self.simulation.now
+                preflight_steps = [step for step in preflight_steps
+                                   if step not in (lambda_module.PREFLIGHT_WAIT_FOR_API_SERVER,
+                                                   lambda_module.PREFLIGHT_LOGIN)]
+            # END if
+        # END if
+        if lambda_module.PREFLIGHT_WAIT_FOR_API_SERVER in preflight_steps:
+            yield from self._wait_for_api_server(invocation=invocation)
+        invocation["phase_times"]["readiness"] += self.simulation.now - phase_start_time
+
+        ### login
+        phase_start_time = self.simulation.now
+        if lambda_module.PREFLIGHT_LOGIN in preflight_steps:
+            yield from self._send_api_with_retry(invocation=invocation, api="login")
+            environment["login_time"] = self.simulation.now
+        invocation["phase_times"]["login"] += self.simulation.now - phase_start_time
+
+        ### preflight
+        phase_start_time = self.simulation.now
+        apis = [PREFLIGHT_STEP_APIS[step] for step in preflight_steps if step in PREFLIGHT_STEP_APIS]
+        if lambda_module.CONCURRENT_PREFLIGHT:
+            yield from self._send_apis_concurrently(invocation=invocation, apis=apis, max_concurrency=len(apis))
+        else:
+            yield from self._send_apis_concurrently(invocation=invocation, apis=apis, max_concurrency=1)
+        if len(apis) > 0:
+            environment["preflight_time"] = self.simulation.now
+        invocation["phase_times"]["preflight"] += self.simulation.now - phase_start_time
+
+        ### action
+        phase_start_time = self.simulation.now
+        for apis in ACTION_API_CALLS[invocation["action"]]:
+            yield from self._send_apis_concurrently(
+                invocation=invocation,
+                apis=apis,
+                max_concurrency=lambda_module.ROUTE_DOMAIN_CONCURRENCY
+            )
+        # END for
+        invocation["phase_times"]["action"] += self.simulation.now - phase_start_time
+
+    def _send_apis_concurrently(self, invocation, apis=list(), max_concurrency=1):
+        """ :raise _InvocationFailure: IF one of the API calls has failed, once all of them have finished """
+        if len(apis) == 0:
+            return
+        slots = Resource(simulation=self.simulation, capacity=max(max_concurrency, 1))
+        failures = yield AllOf(
+            self._catch_failure(invocation=invocation, api=api, slots=slots) for api in apis
+        )
+        for failure in failures:
+            if failure is not None:
+                raise failure
+        # END for
+
+    def _catch_failure(self, invocation, api, slots):
+        yield Acquire(slots)
+        try:
+            yield from self._send_api_with_retry(invocation=invocation, api=api)
+        except _InvocationFailure as e:
+            return e
+        finally:
+            slots.release()
+        return None
+
+    def _wait_for_api_server(self, invocation):
+        """ Polls like wait_until_controller_api_server_is_ready() """
+        wait_deadline = self.simulation.now + READINESS_TOTAL_WAIT_TIME
+        min_request_time = self.lambda_module.HTTP_MIN_REQUEST_TIME
+        while True:
+            is_ready = yield from self._call_api(invocation=invocation, api="is_server_ready")
+            if is_ready:
+                return
+            if wait_deadline - self.simulation.now < READINESS_INTERVAL_WAIT_TIME + min_request_time or \
+               invocation["deadline"] - self.simulation.now <= READINESS_INTERVAL_WAIT_TIME + min_request_time:
+                raise _InvocationFailure("API server not available")
+            invocation["phase_times"]["sleep"] += READINESS_INTERVAL_WAIT_TIME
+            yield Timeout(READINESS_INTERVAL_WAIT_TIME)
+        # END while
+
+    def _send_api_with_retry(self, invocation, api):
+        """ Retries like _send_aviatrix_api_with_retry(). :raise _InvocationFailure: IF every retry has failed """
+        for i in range(self.retry_count):
+            request_start_time = self.simulation.now
+            is_succeeded = yield from self._call_api(invocation=invocation, api=api)
+            if i > 0:
+                invocation["retry_time"] += self.simulation.now - request_start_time
+            if is_succeeded:
+                return
+
+            wait_time_before_retry = self.random.uniform(
+                0, min(self.retry_backoff_max, self.retry_backoff_base * pow(2, i))
+            )
+            if i + 1 >= self.retry_count:
+                raise _InvocationFailure("max retry exceeded")
+            if invocation["deadline"] - self.simulation.now <= \
+               wait_time_before_retry + self.lambda_module.HTTP_MIN_REQUEST_TIME:
+                raise _InvocationFailure("no time left to retry before the deadline")
+            if invocation["retry_count"] >= self.retry_budget_count or \
+               invocation["retry_time"] + wait_time_before_retry > self.retry_budget_time:
+                raise _InvocationFailure("retry budget spent")
+            invocation["retry_count"] += 1
+            invocation["retry_time"] += wait_time_before_retry
+            invocation["phase_times"]["sleep"] += wait_time_before_retry
+            yield Timeout(wait_time_before_retry)
+        # END for
+
+    def _call_api(self, invocation, api):
+        """
+        One API call, which holds a controller worker for the whole latency of the API, even IF the invocation has
+        given up on it at its deadline.
+        :return: True IF the API call has succeeded
+        :raise _InvocationFailure: IF the invocation deadline passes first
+        """
+        if self.controller.is_full():
+            self.rejected_count += 1
+            return False
+        yield Acquire(self.controller)
+        if self.simulation.now >= invocation["deadline"]:
+            self.controller.release()
+            raise _InvocationFailure("invocation deadline reached")
+
+        distribution = self.distributions.get(api, self.distributions[DEFAULT_API])
+        latency = distribution.sample_latency(self.random)
+        self.api_call_counts[api] += 1
+        self.simulation.schedule(latency, self.controller.release)
+        if self.simulation.now + latency > invocation["deadline"]:
+            yield Timeout(invocation["deadline"] - self.simulation.now)
+            raise _InvocationFailure("invocation deadline reached")
+        yield Timeout(latency)
+
+        if self.simulation.now < self.boot_time:
+            return False
+        failure_rate = distribution.failure_rate if self.error_rate is None else self.error_rate
+        return self.random.random() >= failure_rate
+# END class LandingZoneModel
+
+
+def _get_percentile(values, percent):
+    """ Nearest-rank percentile of "values" """
+    sorted_values = sorted(values)
+    rank = max(int(math.ceil(len(sorted_values) * percent / 100.0)), 1)
+    return sorted_values[rank - 1]
+# END def _get_percentile()
+
+
+def _parse_api_latencies(values=list()):
+    """ ["setup_account_profile=3", ...] --> {"setup_account_profile": 3.0, ...} """
+    return {value.split("=")[0]: float(value.split("=")[1]) for value in values}
+# END def _parse_api_latencies()
+
+
+def record(args):
+    lambda_module = import_lambda_module()
+    controller = None
+    controller_hostname = args.controller_hostname
+    if controller_hostname is None:
+        controller = MockAviatrixController(
+            api_latency=args.api_latency,
+            api_latency_by_action=_parse_api_latencies(args.api_latency_by_action),
+            api_latency_sigma=args.api_latency_sigma,
+            error_rate=args.error_rate,
+            seed=args.seed
+        ).start()
+        controller_hostname = controller.hostname
+    # END if
+
+    try:
+        with LatencyRecorder(lambda_module=lambda_module) as recorder:
+            for _ in range(args.runs):
+                for action in args.actions:
+                    clear_module_caches(lambda_module)  # Every run records the login and the preflight too
+                    event = build_event(action=action, controller_hostname=controller_hostname)
+                    if args.admin_password is not None:
+                        event["ResourceProperties"]["AviatrixControllerAdminPasswordParam"] = args.admin_password
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        lambda_module.lambda_handler(event, FakeLambdaContext(timeout=args.timeout))
+                # END for
+            # END for
+        # END with
+    finally:
+        if controller is not None:
+            controller.stop()
+    # END try-finally
+
+    recorder.save(path=args.output)
+    print("| API | Calls | Median s | p95 s | Failure rate |")
+    print("|---|---|---|---|---|")
+    for api, distribution in sorted(fit_latency_distributions(recorder.records).items()):
+        print("| {0} | {1} | {2:.2f} | {3:.2f} | {4:.1%} |".format(
+            api,
+            distribution.sample_count,
+            distribution.get_median(),
+            distribution.get_percentile(95),
+            distribution.failure_rate
+        ))
+    # END for
+# END def record()
+
+
+def simulate(args):
+    lambda_module = import_lambda_module()
+    distributions = fit_latency_distributions(load_recordings(args.recordings))
+    retry_backoff_bases = args.retry_backoff_base or [lambda_module.RETRY_BACKOFF_BASE]
+
+    row_format = "| {0} | {1} | {2} | {3:g} | {4:g} | {5:.0f} | {6}/{7} | {8:.1f} | {9:.1f} | {10:.1f} | {11} | " \
+                 "{12} | {13:.1f}/{14} | {15:.0%} |"
+    print("| Lambda concurrency | Controller concurrency | Retry count | Backoff base s | Timeout s | Accounts/hour | "
+          "Failed accounts | p50 s | p95 s | p99 s | Logins | Retries | Controller queue (mean/max) | "
+          "Controller utilization |")
+    print("|---|---|---|---|---|---|---|---|---|---|---|---|---|---|")
+    phase_rows = list()
+    for lambda_concurrency, controller_concurrency, retry_count, retry_backoff_base, timeout in itertools.product(
+        args.lambda_concurrency,
+        args.controller_concurrency,
+        args.retry_count,
+        retry_backoff_bases,
+        args.timeout
+    ):
+        result = LandingZoneModel(
+            lambda_module=lambda_module,
+            distributions=distributions,
+            accounts=args.accounts,
+            vpcs_per_account=args.vpcs_per_account,
+            arrival_interval=args.arrival_interval,
+            lambda_concurrency=lambda_concurrency,
+            controller_concurrency=controller_concurrency,
+            controller_queue=args.controller_queue,
+            retry_count=retry_count,
+            retry_backoff_base=retry_backoff_base,
+            timeout=timeout,
+            error_rate=args.error_rate,
+            boot_time=args.boot_time,
+            seed=args.seed
+        ).run()
+        print(row_format.format(
+            lambda_concurrency,
+            controller_concurrency,
+            retry_count,
+            retry_backoff_base,
+            timeout,
+            result["accounts_per_hour"],
+            result["failed_accounts"],
+            args.accounts,
+            result["p50"],
+            result["p95"],
+            result["p99"],
+            result["logins"],
+            result["retries"],
+            result["mean_queue_length"],
+            result["max_queue_length"],
+            result["utilization"]
+        ))
+        phase_rows.append(
+            (lambda_concurrency, controller_concurrency, retry_count, retry_backoff_base, timeout, result)
+        )
+    # END for
+
+    if args.phases:
+        print("\n| Lambda concurrency | Controller concurrency | Retry count | Backoff base s | Timeout s | "
+              "Lambda queue s | Readiness s | Login s | Preflight s | Action s | Sleep s | Failure reasons |")
+        print("|---|---|---|---|---|---|---|---|---|---|---|---|")
+        for lambda_concurrency, controller_concurrency, retry_count, retry_backoff_base, timeout, result in phase_rows:
+            phase_times = result["phase_times"]
+            print("| {0} | {1} | {2} | {3:g} | {4:g} | {5:.1f} | {6:.2f} | {7:.2f} | {8:.2f} | {9:.1f} | {10:.2f} | "
+                  "{11} |".format(
+                      lambda_concurrency,
+                      controller_concurrency,
+                      retry_count,
+                      retry_backoff_base,
+                      timeout,
+                      phase_times["lambda_queue"],
+                      phase_times["readiness"],
+                      phase_times["login"],
+                      phase_times["preflight"],
+                      phase_times["action"],
+                      phase_times["sleep"],
+                      ", ".join(reason + ": " + str(count)
+                                for reason, count in result["failure_reasons"].most_common()) or "-"
+                  ))
+        # END for
+    # END if
+# END def simulate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    record_parser = subparsers.add_parser("record", help="Record the API latencies of lambda_handler()")
+    record_parser.add_argument("--output", required=True, help="JSON lines file of the recorded API calls")
+    record_parser.add_argument("--runs", type=int, default=20, help="Cold invocations per action")
+    record_parser.add_argument("--actions", nargs="+", default=["CreateAccessAccount", "ATTACH"],
+                               choices=sorted(ACTION_PROPERTIES), help="Actions to record")
+    record_parser.add_argument("--api-latency", type=float, default=0.3, help="Second(s) per API call of the mock")
+    record_parser.add_argument("--api-latency-by-action", nargs="*", default=list(),
+                               help='Per API latency of the mock, e.g. "setup_account_profile=3"')
+    record_parser.add_argument("--api-latency-sigma", type=float, default=0.3,
+                               help="Sigma of the log-normal API latency of the mock")
+    record_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of failed API calls of the mock")
+    record_parser.add_argument("--controller-hostname", default=None,
+                               help="Record against this controller instead of the mock controller")
+    record_parser.add_argument("--admin-password", default=None, help="Admin password of --controller-hostname")
+    record_parser.add_argument("--timeout", type=float, default=300.0, help="Lambda timeout (second(s))")
+    record_parser.add_argument("--seed", type=int, default=None, help="Seed of the mock controller")
+    record_parser.set_defaults(function=record)
+
+    simulate_parser = subparsers.add_parser("simulate", help="Simulate onboarding waves from recorded API latencies")
+    simulate_parser.add_argument("--recordings", nargs="+", required=True, help="Files written by \"record\"")
+    simulate_parser.add_argument("--accounts", type=int, default=500, help="Accounts of the onboarding wave")
+    simulate_parser.add_argument("--vpcs-per-account", type=int, default=1, help="ATTACH invocations per account")
+    simulate_parser.add_argument("--arrival-interval", type=float, default=0.0,
+                                 help="Second(s) between two account arrivals (0: every account at once)")
+    simulate_parser.add_argument("--lambda-concurrency", type=int, nargs="+", default=[10],
+                                 help="Max invocations running at a time")
+    simulate_parser.add_argument("--controller-concurrency", type=int, nargs="+", default=[4],
+                                 help="Max API calls served by the controller at a time")
+    simulate_parser.add_argument("--controller-queue", type=int, default=None,
+                                 help="Max API calls waiting for the controller, beyond which they fail")
+    simulate_parser.add_argument("--retry-count", type=int, nargs="+", default=[5], help="Attempts per API call")
+    simulate_parser.add_argument("--retry-backoff-base", type=float, nargs="+", default=None,
+                                 help="Second(s), see AVIATRIX_RETRY_BACKOFF_BASE (default: the Lambda setting)")
+    simulate_parser.add_argument("--timeout", type=float, nargs="+", default=[900.0], help="Lambda timeout (second(s))")
+    simulate_parser.add_argument("--error-rate", type=float, default=None,
+                                 help="Overrides the recorded failure rate of every API")
+    simulate_parser.add_argument("--boot-time", type=float, default=0.0,
+                                 help="Second(s) the controller fails every API call at the start of the wave")
+    simulate_parser.add_argument("--phases", action="store_true", help="Also print the mean time per phase")
+    simulate_parser.add_argument("--seed", type=int, default=None, help="Seed of the simulation")
+    simulate_parser.set_defaults(function=simulate)
+
+    args = parser.parse_args()
+    args.function(args)
+# END def main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,537 @@
+"""
+Description:
+=============
+    A local HTTPS stand-in for the Aviatrix controller "/v1/api" endpoint, used by the benchmark scripts in this
+    directory. The mock controller answers every API with the same success message that the
+    "_handle_aviatrix_api_response_from_*" functions of the Lambda source files expect, and counts the TLS handshakes
+    (accepted connections) and the API calls it has served.
+
+    The mock controller keeps the access accounts, TGWs, route domains, route domain connections and VPC attachments
+    created by the APIs, and answers the "list_*" APIs (used to verify the state after an ambiguous failure) from
+    them. The create/delete APIs always succeed, even for a duplicated/unknown resource, so a benchmark can repeat
+    the same action. An API on an unknown TGW creates the TGW.
+
+    Every API call can be slowed down ("api_latency", "api_latency_by_action", "api_latency_sigma") and can fail at
+    random with an HTTP error ("error_rate", "error_rate_by_action", "error_status_code"), before the controller
+    applies the API. A path other than "api_path" is answered with 404, like a wrong API version or route.
+
+    The following faults replay the failures of a real controller (see fault_profiles.py):
+        + "boot_time"         : Every API call fails with 502 until "boot_time" second(s) after start()/reboot()
+        + "flap_pattern"      : (F, S) the API calls fail with "flap_status_code" F times in a row, then succeed S
+                                times in a row, and so on
+        + "reset_pattern"     : (R, S) the controller applies R POST API calls in a row, but resets the connection
+                                instead of responding, then responds to S POST API calls, and so on
+        + "expire_cids_every" : Every CID expires on every N-th API call, as if the controller session has timed out
+
+    Like the web server in front of a real controller, the mock can serve at most "max_concurrency" API calls at a
+    time. The other API calls wait in a queue, and are answered with "queue_status_code" once "max_queue_depth" API
+    calls are already waiting. "queue_depth_samples" records the queue depth seen by every arriving API call.
+
+    "boot_time" is measured with "clock" (the "time" module by default). Pass the VirtualClock of the Lambda module
+    to boot in the same virtual time as the Lambda function, i.e. as fast as the Lambda function polls.
+
+
+Usage:
+=======
+    controller = MockAviatrixController(handshake_latency=0.02, api_latency=0.1, error_rate=0.05)
+    controller.start()
+    ...  # Point "AviatrixControllerHostnameParam" to controller.hostname
+    controller.stop()
+
+
+Prerequisites:
+==============
+    + The "openssl" command line tool (used to generate a self-signed certificate for the HTTPS listener)
+"""
+
+import json
+import os
+import random
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+''' Variable Description: (MOCK_API_RESULTS)
+Description:
+    * key  : The value of the "action" parameter of the Aviatrix API
+    * value: The "results" the mock controller returns for a successful call of that action
+'''
+MOCK_API_RESULTS = {
+    "is_server_ready": "API server is ready",
+    "login": "User admin authorized successfully",
+    "initial_setup": "initial setup has been done",
+    "list_version_info": {"current_version": "UserConnect-5.3.1516", "previous_version": "UserConnect-5.2.2122"},
+    "setup_account_profile": "An email confirmation has been sent to admin@example.com",
+    "delete_account_profile": "Account has been deleted, and an email notification has been sent to admin@example.com",
+    "add_aws_tgw": "Successfully created TGW",
+    "delete_aws_tgw": "Successfully deleted TGW",
+    "add_route_domain": "Successfully added Route Domain",
+    "delete_route_domain": "Successfully deleted Route Domain",
+    "add_connection_between_route_domains": "Successfully connected Route Domain",
+    "delete_connection_between_route_domains": "Successfully disconnected Route Domain",
+    "attach_vpc_to_tgw": "Successfully attached VPC to TGW",
+    "detach_vpc_from_tgw": "Successfully deleted the attachment",
+    "list_accounts": None,  # The "list_*" results are built from the state of the mock controller
+    "list_route_domains": None,
+    "list_all_tgw_attachments": None,
+}
+
+DEFAULT_ROUTE_DOMAINS = ["Aviatrix_Edge_Domain", "Default_Domain", "Shared_Service_Domain"]
+
+
+class MockAviatrixController(object):
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        handshake_latency=0.0,
+        api_latency=0.0,
+        api_latency_by_action=None,
+        api_latency_sigma=0.0,
+        error_rate=0.0,
+        error_rate_by_action=None,
+        error_status_code=503,
+        api_path="/v1/api",
+        seed=None,
+        boot_time=0.0,
+        flap_pattern=None,
+        flap_status_code=502,
+        reset_pattern=None,
+        expire_cids_every=0,
+        clock=None,
+        max_concurrency=0,
+        max_queue_depth=None,
+        queue_status_code=503
+    ):
+        """
+        :param handshake_latency:     second(s) added to every new connection, to emulate the network round trips of
+                                      the TCP+TLS handshake between a Lambda function and a remote controller
+        :param api_latency:           second(s) added to every API call
+        :param api_latency_by_action: {"action": second(s)}, overrides "api_latency" for the listed actions
+        :param api_latency_sigma:     the latency of every API call is drawn from a log-normal distribution whose
+                                      median is the API latency, with this sigma (0 keeps the latency constant)
+        :param error_rate:            probability (0 to 1) of an API call to fail with "error_status_code"
+        :param error_rate_by_action:  {"action": probability}, overrides "error_rate" for the listed actions
+        :param seed:                  seed of the random errors, for repeatable runs
+        :param boot_time:             second(s) after start()/reboot() until the API server is ready
+        :param flap_pattern:          (number of failed API calls, number of successful API calls), repeated
+        :param reset_pattern:         (number of reset POST API calls, number of answered POST API calls), repeated
+        :param expire_cids_every:     expire every CID on every N-th API call (0 never expires them)
+        :param clock:                 any object with a time() method, for "boot_time" (default: the "time" module)
+        :param max_concurrency:       max API calls served at a time (0 serves every API call at once)
+        :param max_queue_depth:       max API calls waiting for "max_concurrency" (None never rejects an API call)
+        """
+        self.host = host
+        self.port = port
+        self.handshake_latency = handshake_latency
+        self.api_latency = api_latency
+        self.api_latency_by_action = dict(api_latency_by_action or dict())
+        self.api_latency_sigma = api_latency_sigma
+        self.error_rate = error_rate
+        self.error_rate_by_action = dict(error_rate_by_action or dict())
+        self.error_status_code = error_status_code
+        self.api_path = api_path
+        self.clock = clock if clock is not None else time
+        self.boot_time = boot_time
+        self.boot_start_time = self.clock.time()
+        self.flap_pattern = flap_pattern
+        self.flap_status_code = flap_status_code
+        self.reset_pattern = reset_pattern
+        self.expire_cids_every = expire_cids_every
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.queue_status_code = queue_status_code
+        self._worker_slots = threading.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.queue_depth = 0
+        self.queue_depth_samples = list()
+        self.rejected_count = 0  # API calls answered with "queue_status_code", NOT counted in "api_call_count"
+        self.handshake_count = 0
+        self.api_call_count = 0
+        self.api_call_count_by_action = dict()
+        self.error_count = 0  # HTTP errors: random, flapping, and while booting
+        self.reset_count = 0
+        self.cid_expiry_count = 0
+        self._flap_call_count = 0
+        self._reset_post_count = 0
+        self.valid_cids = set()
+        self.access_accounts = set()
+        self.tgws = dict()  # key: TGW name  value: {"route_domains": set, "connections": set, "attachments": set}
+        self._random = random.Random(seed)
+        self.cloudformation_responses = list()  # The bodies of the PUT requests to "ResponseURL"
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._cert_dir = None
+        self.cert_file = None  # Set "REQUESTS_CA_BUNDLE" to this file, to verify the certificate of "response_url"
+
+    @property
+    def hostname(self):
+        return self.host + ":" + str(self.port)
+
+    @property
+    def response_url(self):
+        """ Use as the "ResponseURL" of a CloudFormation event """
+        return "https://" + self.hostname + "/cloudformation-response"
+
+    def reset_counters(self):
+        with self._lock:
+            self.handshake_count = 0
+            self.api_call_count = 0
+            self.api_call_count_by_action = dict()
+            self.error_count = 0
+            self.reset_count = 0
+            self.cid_expiry_count = 0
+            self._flap_call_count = 0
+            self._reset_post_count = 0
+            self.queue_depth_samples = list()
+            self.rejected_count = 0
+            self.cloudformation_responses = list()
+
+    @property
+    def fault_count(self):
+        """ Every fault injected since reset_counters(): HTTP errors, connection resets, CID expiries """
+        return self.error_count + self.reset_count + self.cid_expiry_count
+
+    def reboot(self):
+        """ The API server is NOT ready for the next "boot_time" second(s), and every CID issued so far is invalid """
+        with self._lock:
+            self.boot_start_time = self.clock.time()
+            self.valid_cids = set()
+
+    def reset_state(self):
+        """ Forgets the access accounts, TGWs, route domains and VPC attachments created so far """
+        with self._lock:
+            self.access_accounts = set()
+            self.tgws = dict()
+
+    def expire_cids(self):
+        """ Every CID issued so far becomes invalid, as if the controller session has timed out """
+        with self._lock:
+            self.valid_cids = set()
+
+    def start(self):
+        self._cert_dir = tempfile.mkdtemp(prefix="mock-aviatrix-controller-")
+        self.cert_file, key_file = _generate_self_signed_certificate(cert_dir=self._cert_dir)
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(certfile=self.cert_file, keyfile=key_file)
+
+        self._server = _MockHTTPServer((self.host, self.port), _MockAviatrixApiHandler)
+        self._server.socket = ssl_context.wrap_socket(
+            self._server.socket,
+            server_side=True,
+            do_handshake_on_connect=False  # Handshake in the worker thread, so concurrent clients are not serialized
+        )
+        self._server.controller = self
+        self.port = self._server.server_address[1]
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.boot_start_time = self.clock.time()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._cert_dir is not None:
+            shutil.rmtree(self._cert_dir, ignore_errors=True)
+            self._cert_dir = None
+
+    def _issue_cid(self):
+        with self._lock:
+            CID = "MockCID" + str(self.api_call_count)
+            self.valid_cids.add(CID)
+            return CID
+
+    def _count_handshake(self):
+        with self._lock:
+            self.handshake_count += 1
+
+    def _count_api_call(self, action):
+        with self._lock:
+            self.api_call_count += 1
+            self.api_call_count_by_action[action] = self.api_call_count_by_action.get(action, 0) + 1
+            return self.api_call_count
+
+    def _enter_worker_slot(self):
+        """ Waits for a free worker slot. :return: False IF the queue is full, so the API call is rejected """
+        if self._worker_slots is None:
+            return True
+        if self._worker_slots.acquire(blocking=False):
+            with self._lock:
+                self.queue_depth_samples.append(0)
+            return True
+        with self._lock:
+            self.queue_depth_samples.append(self.queue_depth)
+            if self.max_queue_depth is not None and self.queue_depth >= self.max_queue_depth:
+                self.rejected_count += 1
+                return False
+            self.queue_depth += 1
+        # END with
+        self._worker_slots.acquire()
+        with self._lock:
+            self.queue_depth -= 1
+        return True
+
+    def _leave_worker_slot(self):
+        if self._worker_slots is not None:
+            self._worker_slots.release()
+
+    def _is_booting(self):
+        with self._lock:
+            if self.clock.time() - self.boot_start_time >= self.boot_time:
+                return False
+            self.error_count += 1
+            return True
+
+    def _should_flap(self):
+        if self.flap_pattern is None:
+            return False
+        with self._lock:
+            is_failed = self._flap_call_count % sum(self.flap_pattern) < self.flap_pattern[0]
+            self._flap_call_count += 1
+            if is_failed:
+                self.error_count += 1
+            return is_failed
+
+    def _should_reset_post(self):
+        if self.reset_pattern is None:
+            return False
+        with self._lock:
+            is_reset = self._reset_post_count % sum(self.reset_pattern) < self.reset_pattern[0]
+            self._reset_post_count += 1
+            if is_reset:
+                self.reset_count += 1
+            return is_reset
+
+    def _expire_cids_on_schedule(self, call_number):
+        if self.expire_cids_every <= 0:
+            return
+        with self._lock:
+            if call_number % self.expire_cids_every == 0 and len(self.valid_cids) > 0:
+                self.valid_cids = set()
+                self.cid_expiry_count += 1
+
+    def _get_api_latency(self, action):
+        api_latency = self.api_latency_by_action.get(action, self.api_latency)
+        if api_latency <= 0 or self.api_latency_sigma <= 0:
+            return api_latency
+        with self._lock:
+            return api_latency * self._random.lognormvariate(0.0, self.api_latency_sigma)
+
+    def _should_fail(self, action):
+        error_rate = self.error_rate_by_action.get(action, self.error_rate)
+        with self._lock:
+            if error_rate <= 0 or self._random.random() >= error_rate:
+                return False
+            self.error_count += 1
+            return True
+
+    def _get_tgw(self, tgw_name):
+        """ Must be called with "_lock" held. An unknown TGW is created """
+        if tgw_name not in self.tgws:
+            self.tgws[tgw_name] = {
+                "route_domains": set(DEFAULT_ROUTE_DOMAINS),
+                "connections": set(),
+                "attachments": set()
+            }
+        return self.tgws[tgw_name]
+
+    def _apply_api(self, action, params):
+        """
+        Applies a create/delete API to the state, OR builds the results of a "list_*" API from the state.
+        :return: (True, results) || (False, reason)
+        """
+        def param(name):
+            return params.get(name, [""])[0]
+
+        with self._lock:
+            if action == "setup_account_profile":
+                self.access_accounts.add(param("account_name"))
+            elif action == "delete_account_profile":
+                self.access_accounts.discard(param("account_name"))
+            elif action == "add_aws_tgw":
+                self._get_tgw(param("tgw_name"))
+            elif action == "delete_aws_tgw":
+                self.tgws.pop(param("tgw_name"), None)
+            elif action == "add_route_domain":
+                self._get_tgw(param("tgw_name"))["route_domains"].add(param("route_domain_name"))
+            elif action == "delete_route_domain":
+                tgw = self._get_tgw(param("tgw_name"))
+                tgw["route_domains"].discard(param("route_domain_name"))
+                tgw["connections"] = set(
+                    connection for connection in tgw["connections"] if param("route_domain_name") not in connection
+                )
+            elif action == "add_connection_between_route_domains":
+                self._get_tgw(param("tgw_name"))["connections"].add(
+                    frozenset([param("source_route_domain_name"), param("destination_route_domain_name")])
+                )
+            elif action == "delete_connection_between_route_domains":
+                self._get_tgw(param("tgw_name"))["connections"].discard(
+                    frozenset([param("source_route_domain_name"), param("destination_route_domain_name")])
+                )
+            elif action == "attach_vpc_to_tgw":
+                self._get_tgw(param("tgw_name"))["attachments"].add(param("vpc_name"))
+            elif action == "detach_vpc_from_tgw":
+                self._get_tgw(param("tgw_name"))["attachments"].discard(param("vpc_name"))
+            elif action == "list_accounts":
+                return True, {"account_list": [{"account_name": name} for name in sorted(self.access_accounts)]}
+            elif action == "list_route_domains":
+                if param("tgw_name") not in self.tgws:
+                    return False, "TGW " + param("tgw_name") + " does not exist."
+                return True, sorted(self.tgws[param("tgw_name")]["route_domains"])
+            elif action == "list_all_tgw_attachments":
+                tgw = self.tgws.get(param("tgw_name"), {"attachments": set()})
+                return True, [{"name": vpc_name} for vpc_name in sorted(tgw["attachments"])]
+            # END if-else
+        # END with
+        return True, MOCK_API_RESULTS[action]
+# END class MockAviatrixController
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Many concurrent clients connect at once (the default backlog is 5)
+    controller = None
+
+    def finish_request(self, request, client_address):
+        # Runs once per accepted connection, in the worker thread of that connection
+        try:
+            request.do_handshake()
+        except (ConnectionError, ssl.SSLError, OSError):
+            return
+        self.controller._count_handshake()
+        if self.controller.handshake_latency > 0:
+            time.sleep(self.controller.handshake_latency)
+        super(_MockHTTPServer, self).finish_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # A client which gives up on a request (e.g. timeout) closes the connection, which is expected here
+        if isinstance(sys.exc_info()[1], (ConnectionError, ssl.SSLError)):
+            return
+        super(_MockHTTPServer, self).handle_error(request, client_address)
+# END class _MockHTTPServer
+
+
+class _MockAviatrixApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Required for keep-alive connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        self._reply(params=params)
+
+    def do_POST(self):
+        content_length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(content_length).decode("utf-8")
+        params = parse_qs(body)
+        self._reply(params=params, is_post=True)
+
+    def _is_api_path(self):
+        return urlparse(self.path).path.rstrip("/") == self.server.controller.api_path.rstrip("/")
+
+    def do_PUT(self):
+        # Emulates the pre-signed S3 URL of "ResponseURL" for CloudFormation custom resources
+        content_length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(content_length).decode("utf-8")
+        with self.server.controller._lock:
+            self.server.controller.cloudformation_responses.append(json.loads(body))
+        self._send_json(status_code=200, pydict={})
+
+    def _reply(self, params, is_post=False):
+        controller = self.server.controller
+        if not controller._enter_worker_slot():
+            self._send_error(status_code=controller.queue_status_code)
+            return
+        try:
+            self._reply_in_worker_slot(params=params, is_post=is_post)
+        finally:
+            controller._leave_worker_slot()
+
+    def _reply_in_worker_slot(self, params, is_post=False):
+        controller = self.server.controller
+        action = params.get("action", [""])[0]
+        call_number = controller._count_api_call(action=action)
+        api_latency = controller._get_api_latency(action=action)
+        if api_latency > 0:
+            time.sleep(api_latency)
+
+        if not self._is_api_path():
+            self._send_error(status_code=404)
+            return
+        if controller._is_booting():
+            self._send_error(status_code=502)
+            return
+        if controller._should_flap():
+            self._send_error(status_code=controller.flap_status_code)
+            return
+        if controller._should_fail(action=action):
+            self._send_error(status_code=controller.error_status_code)
+            return
+        controller._expire_cids_on_schedule(call_number=call_number)
+        if action not in MOCK_API_RESULTS:
+            self._send_json(status_code=200, pydict={"return": False, "reason": "valid action required"})
+            return
+        if action not in ("is_server_ready", "login") and params.get("CID", [""])[0] not in controller.valid_cids:
+            self._send_json(status_code=200, pydict={"return": False, "reason": "CID is invalid or expired."})
+            return
+
+        is_applied, results = controller._apply_api(action=action, params=params)
+        if is_post and controller._should_reset_post():
+            # The API has been applied, but the client never gets the response
+            self.close_connection = True
+            return
+        if not is_applied:
+            self._send_json(status_code=200, pydict={"return": False, "reason": results})
+            return
+
+        pydict = {"return": True, "results": results}
+        if action == "login":
+            pydict["CID"] = controller._issue_cid()
+        self._send_json(status_code=200, pydict=pydict)
+
+    def _send_error(self, status_code):
+        # Like the web server in front of the controller API, the body is NOT JSON
+        body = ("<html><body><h1>" + str(status_code) + " " + self.responses.get(status_code, ("Error",))[0] +
+                "</h1></body></html>").encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status_code, pydict):
+        body = json.dumps(pydict).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the benchmark output clean
+# END class _MockAviatrixApiHandler
+
+
+def _generate_self_signed_certificate(cert_dir):
+    cert_file = os.path.join(cert_dir, "cert.pem")
+    key_file = os.path.join(cert_dir, "key.pem")
+    subprocess.check_call(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", key_file, "-out", cert_file,
+            "-days", "1", "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    return cert_file, key_file
+# END def _generate_self_signed_certificate()
@@ -0,0 +1,168 @@
+"""
+Description:
+=============
+    Sample Lambda "event" objects for every Aviatrix action, shared by the benchmark scripts in this directory.
+"""
+
+import json
+import os
+import sys
+import time
+
+
+LAMBDA_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aviatrix_lambda_functions")
+
+
+''' Variable Description: (ACTION_PROPERTIES)
+Description:
+    * key  : The value of "AviatrixActionParam"
+    * value: The action specific "ResourceProperties" (the common ones are filled by build_event())
+'''
+ACTION_PROPERTIES = {
+    "CREATE": {
+        "AccessAccountNameParam": "my-access-account",
+        "TgwRegionNameParam": "us-west-1",
+        "TgwNameParam": "my-aws-tgw-009",
+        "AwsSideASNumberParam": "65003",
+    },
+    "DELETE": {
+        "TgwNameParam": "my-aws-tgw-009",
+    },
+    "ATTACH": {
+        "VpcAccessAccountNameParam": "my-access-account",
+        "VpcRegionNameParam": "us-west-1",
+        "VpcIdParam": "vpc-abc123",
+        "TgwNameParam": "my-aws-tgw-009",
+        "RouteDomainNameParam": "Default_Domain",
+        "SubnetListParam": ["subnet-abc123", "subnet-xyz789"],
+    },
+    "DETACH": {
+        "VpcIdParam": "vpc-abc123",
+        "TgwNameParam": "my-aws-tgw-009",
+    },
+    "CreateAccessAccount": {
+        "AccessAccountNameParam": "my-access-account",
+        "AWS_Account_ID": "123456789012",
+        "AviatrixAppRoleArnParam": "arn:aws:iam::123456789012:role/aviatrix-role-app",
+        "AviatrixEc2RoleArnParam": "arn:aws:iam::123456789012:role/aviatrix-role-ec2",
+    },
+    "DeleteAviatrixAccessAccount": {
+        "AccessAccountNameParam": "my-access-account",
+    },
+    "BuildNewRouteDomain": {
+        "TgwRegionNameParam": "us-west-1",
+        "TgwNameParam": "my-aws-tgw-009",
+        "NewRouteDomainNameParam": "My_New_Domain",
+        "IsFirewallDomainParam": "false",
+        "ListOfRouteDomainsToConnectParam": ", ".join("Domain_" + str(i) for i in range(10)),
+    },
+    "TeardownRouteDomain": {
+        "TgwNameParam": "my-aws-tgw-009",
+        "SourceRouteDomainNameParam": "My_New_Domain",
+        "ListOfRouteDomainsToDisconnect": ", ".join("Domain_" + str(i) for i in range(10)),
+    },
+}
+ACTION_PROPERTIES["BULK_ATTACH"] = {
+    "VpcListParam": [
+        dict(ACTION_PROPERTIES["ATTACH"], VpcIdParam="vpc-" + str(i), TgwNameParam="my-aws-tgw-00" + str(i % 2))
+        for i in range(6)
+    ],
+}
+ACTION_PROPERTIES["BULK_DETACH"] = {
+    "VpcListParam": [
+        dict(VpcIdParam="vpc-" + str(i), TgwNameParam="my-aws-tgw-00" + str(i % 2))
+        for i in range(6)
+    ],
+}
+ACTION_PROPERTIES["BATCH"] = {
+    # Onboards an account: the access account, a route domain, and the attachments of 2 VPCs
+    "AviatrixActionListParam": [
+        dict(ACTION_PROPERTIES["CreateAccessAccount"], AviatrixActionParam="CreateAccessAccount"),
+        dict(ACTION_PROPERTIES["BuildNewRouteDomain"], AviatrixActionParam="BuildNewRouteDomain"),
+        dict(ACTION_PROPERTIES["ATTACH"], AviatrixActionParam="ATTACH", RouteDomainNameParam="My_New_Domain"),
+        dict(ACTION_PROPERTIES["ATTACH"], AviatrixActionParam="ATTACH", RouteDomainNameParam="My_New_Domain",
+             VpcIdParam="vpc-def456"),
+    ],
+}
+ACTION_PROPERTIES["DAG"] = {
+    # Onboards an account: the access account and the route domain in parallel, then the attachments of 2 VPCs
+    "AviatrixActionGraphParam": [
+        dict(ACTION_PROPERTIES["CreateAccessAccount"], AviatrixActionParam="CreateAccessAccount",
+             NodeIdParam="account"),
+        dict(ACTION_PROPERTIES["BuildNewRouteDomain"], AviatrixActionParam="BuildNewRouteDomain",
+             NodeIdParam="domain"),
+        dict(ACTION_PROPERTIES["ATTACH"], AviatrixActionParam="ATTACH", RouteDomainNameParam="My_New_Domain",
+             NodeIdParam="attach-1", DependsOnParam=["account", "domain"]),
+        dict(ACTION_PROPERTIES["ATTACH"], AviatrixActionParam="ATTACH", RouteDomainNameParam="My_New_Domain",
+             VpcIdParam="vpc-def456", NodeIdParam="attach-2", DependsOnParam=["account", "domain"]),
+    ],
+}
+
+
+def import_lambda_module():
+    if LAMBDA_SOURCE_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_SOURCE_DIR)
+    import aviatrix_lambda_for_tgw_actions
+    return aviatrix_lambda_for_tgw_actions
+# END def import_lambda_module()
+
+
+def build_event(action="ATTACH", controller_hostname="127.0.0.1:443"):
+    resource_properties = {
+        "LambdaInvokerTypeParam": "terraform",
+        "PrefixStringParam": "avx",
+        "AviatrixControllerHostnameParam": controller_hostname,
+        "AviatrixApiVersionParam": "v1",
+        "AviatrixApiRouteParam": "api/",
+        "AviatrixControllerAdminPasswordParam": "Aviatrix123!",
+        "AviatrixActionParam": action,
+    }
+    resource_properties.update(ACTION_PROPERTIES[action])
+    return {"ResourceProperties": resource_properties}
+# END def build_event()
+
+
+def build_cloudformation_event(action="ATTACH", controller_hostname="127.0.0.1:443", response_url=""):
+    event = build_event(action=action, controller_hostname=controller_hostname)
+    event["ResourceProperties"]["LambdaInvokerTypeParam"] = "cloudformation"
+    event.update({
+        "RequestType": "Create",
+        "ResponseURL": response_url,
+        "StackId": "arn:aws:cloudformation:us-west-1:123456789012:stack/avx-benchmark/00000000",
+        "RequestId": "00000000-0000-0000-0000-000000000000",
+        "LogicalResourceId": "AviatrixLambdaAction",
+    })
+    return event
+# END def build_cloudformation_event()
+
+
+def build_sqs_event(actions=["ATTACH"], controller_hostname="127.0.0.1:443"):
+    """ An SQS batch event for sqs_lambda_handler(), with one message per action of "actions" """
+    records = list()
+    for i, action in enumerate(actions):
+        resource_properties = build_event(action=action, controller_hostname=controller_hostname)["ResourceProperties"]
+        del resource_properties["LambdaInvokerTypeParam"]
+        records.append({
+            "messageId": "00000000-0000-0000-0000-" + str(i).zfill(12),
+            "body": json.dumps(resource_properties),
+            "eventSource": "aws:sqs",
+        })
+    # END for
+    return {"Records": records}
+# END def build_sqs_event()
+
+
+class FakeLambdaContext(object):
+    """
+    Stands in for the Lambda "context" object, with a fixed timeout from the moment it is created, measured with
+    "clock" (any object with a time() method, e.g. the VirtualClock of the Lambda module)
+    """
+    log_stream_name = "2026/01/01/[$LATEST]00000000000000000000000000000000"
+
+    def __init__(self, timeout=500.0, clock=time):
+        self._clock = clock
+        self._end_time = clock.time() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return int(max(self._end_time - self._clock.time(), 0) * 1000)
+# END class FakeLambdaContext
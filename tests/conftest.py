@@ -0,0 +1,34 @@
+"""
+Shared fixtures of the tests: the Lambda function module, and a VirtualClock for every wait and clock reading of it,
+so the state machines which depend on time (circuit breaker, coalescing window, DAG timings) are driven in
+virtual time.
+"""
+
+import os
+import sys
+
+import pytest
+
+
+LAMBDA_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "aviatrix_lambda_functions")
+
+
+@pytest.fixture
+def lambda_module():
+    if LAMBDA_SOURCE_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_SOURCE_DIR)
+    import aviatrix_lambda_for_tgw_actions
+    aviatrix_lambda_for_tgw_actions._circuit_breakers.clear()
+    aviatrix_lambda_for_tgw_actions.start_invocation_deadline(context=None)
+    aviatrix_lambda_for_tgw_actions.start_retry_budget()
+    return aviatrix_lambda_for_tgw_actions
+# END def lambda_module()
+
+
+@pytest.fixture
+def virtual_clock(lambda_module):
+    clock = lambda_module.VirtualClock(start_time=1000000.0)
+    previous_clock = lambda_module.set_clock(clock)
+    yield clock
+    lambda_module.set_clock(previous_clock)
+# END def virtual_clock()
@@ -0,0 +1,278 @@
+"""
+Tests of the ATTACH coalescing: the AttachCoalescingStore state machine (PENDING -> CLAIMED -> SUCCESS || FAILED,
+PENDING -> CANCELLED, window expiry and leader takeover), and run_coalesced_attach() on top of it, in virtual time.
+"""
+
+import pytest
+
+
+COALESCING_WINDOW = 2.0  # second(s)
+
+
+class FakeLambdaContext(object):
+    def __init__(self, clock, timeout=60.0):
+        self._clock = clock
+        self._end_time = clock.time() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return int(max(self._end_time - self._clock.time(), 0) * 1000)
+# END class FakeLambdaContext
+
+
+@pytest.fixture
+def store(lambda_module, virtual_clock, tmp_path):
+    return lambda_module.AttachCoalescingStore(
+        path=str(tmp_path / "coalescing.sqlite3"),
+        window_expiry=COALESCING_WINDOW + lambda_module.AttachCoalescingStore.WINDOW_GRACE_TIME
+    )
+# END def store()
+
+
+@pytest.fixture
+def attached_vpcs(lambda_module, monkeypatch):
+    """ Replaces the login and the bulk attachment, and records the VPCs of every bulk attachment """
+    attached_vpcs = list()
+
+    def run_bulk_vpc_action(vpc_records=list(), **kwargs):
+        attached_vpcs.append([vpc_record["VpcIdParam"] for vpc_record in vpc_records])
+        return [{"status": "SUCCESS", "reason": ""} for _ in vpc_records]
+    def run_preflight_steps(**kwargs):
+        return {"CID": "ABCD1234", "controller_version": None}
+    monkeypatch.setattr(lambda_module, "run_preflight_steps", run_preflight_steps)
+    monkeypatch.setattr(lambda_module, "run_bulk_vpc_action", run_bulk_vpc_action)
+    return attached_vpcs
+# END def attached_vpcs()
+
+
+def build_resource_properties(vpc_id="vpc-1"):
+    return {
+        "AviatrixControllerAdminPasswordParam": "Aviatrix123!",
+        "VpcAccessAccountNameParam": "my-access-account",
+        "VpcRegionNameParam": "us-west-1",
+        "VpcIdParam": vpc_id,
+        "TgwNameParam": "my-aws-tgw-009",
+        "RouteDomainNameParam": "Default_Domain",
+        "SubnetListParam": ["subnet-abc123"],
+    }
+# END def build_resource_properties()
+
+
+def get_coalescing_key(lambda_module, admin_password="Aviatrix123!"):
+    return lambda_module.get_attach_coalescing_key(
+        ucc_hostname="10.0.0.1",
+        api_version="v1",
+        api_route="api/",
+        admin_password=admin_password,
+        tgw_name="my-aws-tgw-009"
+    )
+# END def get_coalescing_key()
+
+
+def test_first_request_leads_and_claims_the_window_in_arrival_order(lambda_module, store):
+    coalescing_key = get_coalescing_key(lambda_module)
+    assert store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties={"VpcIdParam": "vpc-a"})
+    assert not store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties={"VpcIdParam": "vpc-b"})
+    assert store.get_result(request_id="b") == ("PENDING", "", True)
+
+    claimed_requests = store.claim(leader_id="a", coalescing_key=coalescing_key)
+    assert claimed_requests == [("a", {"VpcIdParam": "vpc-a"}), ("b", {"VpcIdParam": "vpc-b"})]
+    assert store.get_result(request_id="b") == ("CLAIMED", "", False)
+
+    store.complete(request_id="b", status="FAILED", reason="VPC not found")
+    assert store.get_result(request_id="b") == ("FAILED", "VPC not found", False)
+
+    ### The claim has closed the window, so the next request leads a new one
+    assert store.enqueue(request_id="c", coalescing_key=coalescing_key, resource_properties=dict())
+# END def test_first_request_leads_and_claims_the_window_in_arrival_order()
+
+
+def test_cancelled_request_is_not_claimed(lambda_module, store):
+    coalescing_key = get_coalescing_key(lambda_module)
+    store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties=dict())
+    store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties=dict())
+
+    assert store.cancel(request_id="b")
+    assert [request_id for request_id, _ in store.claim(leader_id="a", coalescing_key=coalescing_key)] == ["a"]
+    assert store.get_result(request_id="b")[0] == "CANCELLED"
+    assert not store.cancel(request_id="a")  # Already claimed, so it can NOT be cancelled any more
+# END def test_cancelled_request_is_not_claimed()
+
+
+def test_removed_request_fails(lambda_module, store):
+    store.enqueue(request_id="a", coalescing_key=get_coalescing_key(lambda_module), resource_properties=dict())
+    store.remove(request_id="a")
+    assert store.get_result(request_id="a")[0] == "FAILED"
+# END def test_removed_request_fails()
+
+
+def test_requests_with_different_passwords_are_not_coalesced(lambda_module, store):
+    assert get_coalescing_key(lambda_module, "password-1") == get_coalescing_key(lambda_module, "password-1")
+    assert get_coalescing_key(lambda_module, "password-1") != get_coalescing_key(lambda_module, "password-2")
+    assert "password-1" not in get_coalescing_key(lambda_module, "password-1")
+
+    assert store.enqueue(request_id="a", coalescing_key=get_coalescing_key(lambda_module, "password-1"),
+                         resource_properties=dict())
+    assert store.enqueue(request_id="b", coalescing_key=get_coalescing_key(lambda_module, "password-2"),
+                         resource_properties=dict())
+# END def test_requests_with_different_passwords_are_not_coalesced()
+
+
+def test_credentials_hash_is_computed_once(lambda_module, monkeypatch):
+    monkeypatch.setattr(lambda_module, "_attach_credentials_hashes", dict())
+    coalescing_key = get_coalescing_key(lambda_module, "password-1")
+    assert list(lambda_module._attach_credentials_hashes) == [("10.0.0.1", "password-1")]
+
+    monkeypatch.setattr(lambda_module.hashlib, "pbkdf2_hmac", None)  # A warm invocation does NOT hash again
+    assert get_coalescing_key(lambda_module, "password-1") == coalescing_key
+# END def test_credentials_hash_is_computed_once()
+
+
+def test_window_of_a_silent_leader_expires_and_a_follower_takes_over(lambda_module, virtual_clock, store):
+    coalescing_key = get_coalescing_key(lambda_module)
+    store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties=dict())
+    store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties=dict())
+
+    virtual_clock.advance(store.window_expiry - 1)
+    assert store.get_result(request_id="b") == ("PENDING", "", True)
+    assert not store.take_over_window(request_id="b", coalescing_key=coalescing_key)
+
+    virtual_clock.advance(1)
+    assert store.get_result(request_id="b") == ("PENDING", "", False)
+    assert store.take_over_window(request_id="b", coalescing_key=coalescing_key)
+    assert [request_id for request_id, _ in store.claim(leader_id="b", coalescing_key=coalescing_key)] == ["a", "b"]
+
+    ### The late leader finds nothing left to claim, and its claim does NOT close the window of another leader
+    store.enqueue(request_id="c", coalescing_key=coalescing_key, resource_properties=dict())
+    assert store.claim(leader_id="a", coalescing_key=coalescing_key) == [("c", dict())]
+    assert not store.take_over_window(request_id="c", coalescing_key=coalescing_key)
+# END def test_window_of_a_silent_leader_expires_and_a_follower_takes_over()
+
+
+def test_leader_attaches_every_request_of_its_window(lambda_module, store, attached_vpcs):
+    coalescing_key = get_coalescing_key(lambda_module)
+    store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties=build_resource_properties("vpc-a"))
+    store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties=build_resource_properties("vpc-b"))
+
+    lambda_module._lead_coalesced_attach(
+        ucc_hostname="10.0.0.1",
+        request_id="a",
+        coalescing_key=coalescing_key,
+        coalescing_window=COALESCING_WINDOW,
+        store=store
+    )
+    assert attached_vpcs == [["vpc-a", "vpc-b"]]
+    assert store.get_result(request_id="a")[0] == "SUCCESS"
+    assert store.get_result(request_id="b")[0] == "SUCCESS"
+# END def test_leader_attaches_every_request_of_its_window()
+
+
+def test_failed_leader_fails_every_claimed_request(lambda_module, store, monkeypatch):
+    def run_preflight_steps(**kwargs):
+        raise lambda_module.AviatrixException(message="Login failed")
+    monkeypatch.setattr(lambda_module, "run_preflight_steps", run_preflight_steps)
+
+    coalescing_key = get_coalescing_key(lambda_module)
+    store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties=build_resource_properties("vpc-a"))
+    store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties=build_resource_properties("vpc-b"))
+    lambda_module._lead_coalesced_attach(
+        ucc_hostname="10.0.0.1",
+        request_id="a",
+        coalescing_key=coalescing_key,
+        coalescing_window=COALESCING_WINDOW,
+        store=store
+    )
+    assert store.get_result(request_id="a")[:2] == ("FAILED", "Login failed")
+    assert store.get_result(request_id="b")[:2] == ("FAILED", "Login failed")
+# END def test_failed_leader_fails_every_claimed_request()
+
+
+def test_follower_takes_over_the_window_of_a_crashed_leader(lambda_module, store, attached_vpcs):
+    coalescing_key = get_coalescing_key(lambda_module)
+    store.enqueue(request_id="crashed", coalescing_key=coalescing_key,
+                  resource_properties=build_resource_properties("vpc-crashed"))
+
+    lambda_module.run_coalesced_attach(
+        ucc_hostname="10.0.0.1",
+        admin_password="Aviatrix123!",
+        resource_properties=build_resource_properties("vpc-b"),
+        request_id="b",
+        coalescing_window=COALESCING_WINDOW,
+        store=store
+    )
+    assert attached_vpcs == [["vpc-crashed", "vpc-b"]]
+    assert store.get_result(request_id="crashed")[0] == "SUCCESS"
+    assert store.get_result(request_id="b")[0] == "FAILED"  # Removed from the store once its result is read
+# END def test_follower_takes_over_the_window_of_a_crashed_leader()
+
+
+def test_follower_cancels_its_request_before_its_deadline(lambda_module, virtual_clock, store, attached_vpcs):
+    coalescing_key = get_coalescing_key(lambda_module)
+    store.enqueue(request_id="slow-leader", coalescing_key=coalescing_key,
+                  resource_properties=build_resource_properties("vpc-a"))
+    lambda_module.start_invocation_deadline(
+        context=FakeLambdaContext(clock=virtual_clock, timeout=lambda_module.DEADLINE_RESERVED_TIME + 3)
+    )
+
+    with pytest.raises(lambda_module.AviatrixException, match="has NOT been attached"):
+        lambda_module.run_coalesced_attach(
+            ucc_hostname="10.0.0.1",
+            admin_password="Aviatrix123!",
+            resource_properties=build_resource_properties("vpc-b"),
+            request_id="b",
+            coalescing_window=COALESCING_WINDOW,
+            store=store
+        )
+    assert store.get_result(request_id="b")[0] == "CANCELLED"
+    assert [request_id for request_id, _ in store.claim(leader_id="slow-leader", coalescing_key=coalescing_key)] == \
+        ["slow-leader"]
+    assert attached_vpcs == list()
+# END def test_follower_cancels_its_request_before_its_deadline()
+
+
+def test_retried_request_rejoins_its_window(lambda_module, store):
+    coalescing_key = get_coalescing_key(lambda_module)
+    assert store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties={"VpcIdParam": "vpc-a"})
+    store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties={"VpcIdParam": "vpc-b"})
+
+    ### Lambda retries the crashed invocations with the same request IDs: the leader leads its window again
+    assert store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties={"VpcIdParam": "vpc-a"})
+    assert not store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties={"VpcIdParam": "vpc-b"})
+    assert [request_id for request_id, _ in store.claim(leader_id="a", coalescing_key=coalescing_key)] == ["a", "b"]
+
+    ### A claimed request waits for its leader, unless the request itself was the leader whose attachment was cut short
+    assert not store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties=dict())
+    assert store.get_result(request_id="b")[0] == "CLAIMED"
+    assert store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties={"VpcIdParam": "vpc-a"})
+    assert store.claim(leader_id="a", coalescing_key=coalescing_key) == [("a", {"VpcIdParam": "vpc-a"})]
+# END def test_retried_request_rejoins_its_window()
+
+
+def test_retried_request_reuses_a_success_and_retries_a_failure(lambda_module, store):
+    coalescing_key = get_coalescing_key(lambda_module)
+    store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties=dict())
+    store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties=dict())
+    store.claim(leader_id="a", coalescing_key=coalescing_key)
+    store.complete(request_id="a", status="SUCCESS")
+    store.complete(request_id="b", status="FAILED", reason="Login failed")
+
+    assert not store.enqueue(request_id="a", coalescing_key=coalescing_key, resource_properties=dict())
+    assert store.get_result(request_id="a")[0] == "SUCCESS"
+    assert store.enqueue(request_id="b", coalescing_key=coalescing_key, resource_properties=dict())
+    assert store.get_result(request_id="b") == ("PENDING", "", True)
+# END def test_retried_request_reuses_a_success_and_retries_a_failure()
+
+
+def test_retried_leader_attaches_its_vpc(lambda_module, store, attached_vpcs):
+    store.enqueue(request_id="a", coalescing_key=get_coalescing_key(lambda_module),
+                  resource_properties=build_resource_properties("vpc-a"))
+
+    lambda_module.run_coalesced_attach(
+        ucc_hostname="10.0.0.1",
+        admin_password="Aviatrix123!",
+        resource_properties=build_resource_properties("vpc-a"),
+        request_id="a",
+        coalescing_window=COALESCING_WINDOW,
+        store=store
+    )
+    assert attached_vpcs == [["vpc-a"]]
+# END def test_retried_leader_attaches_its_vpc()
@@ -0,0 +1,161 @@
+"""
+Tests of the CircuitBreaker state machine (CLOSED -> OPEN -> HALF_OPEN -> CLOSED || OPEN), in virtual time, and of
+how _send_aviatrix_api_with_retry() feeds it.
+"""
+
+import pytest
+import requests
+
+
+def build_response(status_code=200, content=b'{"return": true, "results": "ok"}'):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response._content = content
+    return response
+# END def build_response()
+
+
+def open_circuit_breaker(circuit_breaker):
+    for _ in range(circuit_breaker.failure_threshold):
+        circuit_breaker.before_request()
+        circuit_breaker.record_failure()
+# END def open_circuit_breaker()
+
+
+def test_opens_after_consecutive_failures(lambda_module, virtual_clock):
+    circuit_breaker = lambda_module.CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        circuit_breaker.before_request()
+        circuit_breaker.record_failure()
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.CLOSED
+
+    circuit_breaker.before_request()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.OPEN
+    with pytest.raises(lambda_module.AviatrixException, match="fails fast"):
+        circuit_breaker.before_request()
+# END def test_opens_after_consecutive_failures()
+
+
+def test_success_resets_the_consecutive_failures(lambda_module, virtual_clock):
+    circuit_breaker = lambda_module.CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        circuit_breaker.record_failure()
+    circuit_breaker.record_success()
+    for _ in range(2):
+        circuit_breaker.record_failure()
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.CLOSED
+    assert circuit_breaker.consecutive_failures == 2
+# END def test_success_resets_the_consecutive_failures()
+
+
+def test_half_open_lets_one_probe_through(lambda_module, virtual_clock):
+    circuit_breaker = lambda_module.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_circuit_breaker(circuit_breaker)
+
+    virtual_clock.advance(29)
+    with pytest.raises(lambda_module.AviatrixException):
+        circuit_breaker.before_request()
+
+    virtual_clock.advance(1)
+    circuit_breaker.before_request()  # The probe
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.HALF_OPEN
+    with pytest.raises(lambda_module.AviatrixException):
+        circuit_breaker.before_request()  # Any other call while the probe is in flight
+# END def test_half_open_lets_one_probe_through()
+
+
+def test_successful_probe_closes(lambda_module, virtual_clock):
+    circuit_breaker = lambda_module.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_circuit_breaker(circuit_breaker)
+    virtual_clock.advance(30)
+
+    circuit_breaker.before_request()
+    circuit_breaker.record_success()
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.CLOSED
+    assert circuit_breaker.consecutive_failures == 0
+    circuit_breaker.before_request()
+# END def test_successful_probe_closes()
+
+
+def test_failed_probe_opens_again_for_a_full_reset_timeout(lambda_module, virtual_clock):
+    circuit_breaker = lambda_module.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_circuit_breaker(circuit_breaker)
+    virtual_clock.advance(30)
+
+    circuit_breaker.before_request()
+    circuit_breaker.record_failure()  # ONE failed probe is enough to open again, below the threshold
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.OPEN
+
+    virtual_clock.advance(29)
+    with pytest.raises(lambda_module.AviatrixException):
+        circuit_breaker.before_request()
+    virtual_clock.advance(1)
+    circuit_breaker.before_request()
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.HALF_OPEN
+# END def test_failed_probe_opens_again_for_a_full_reset_timeout()
+
+
+def test_lost_probe_is_replaced_after_the_reset_timeout(lambda_module, virtual_clock):
+    circuit_breaker = lambda_module.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    open_circuit_breaker(circuit_breaker)
+    virtual_clock.advance(30)
+    circuit_breaker.before_request()  # This probe never reports back (e.g. its invocation has timed out)
+
+    virtual_clock.advance(29)
+    with pytest.raises(lambda_module.AviatrixException):
+        circuit_breaker.before_request()
+    virtual_clock.advance(1)
+    circuit_breaker.before_request()  # The new probe
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.HALF_OPEN
+# END def test_lost_probe_is_replaced_after_the_reset_timeout()
+
+
+def test_zero_threshold_disables_the_circuit_breaker(lambda_module, virtual_clock):
+    circuit_breaker = lambda_module.CircuitBreaker(failure_threshold=0, reset_timeout=30)
+    for _ in range(100):
+        circuit_breaker.before_request()
+        circuit_breaker.record_failure()
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.CLOSED
+# END def test_zero_threshold_disables_the_circuit_breaker()
+
+
+def test_api_calls_fail_fast_once_the_controller_has_failed(lambda_module, virtual_clock, monkeypatch):
+    sent_requests = list()
+
+    def send_http_request(**kwargs):
+        sent_requests.append(kwargs)
+        raise requests.exceptions.ConnectionError("NewConnectionError: Connection refused")
+    monkeypatch.setattr(lambda_module, "_send_http_request", send_http_request)
+    retry_budget = lambda_module.RetryBudget(max_retry_count=100, max_retry_time=1000)
+    monkeypatch.setattr(lambda_module, "_retry_budget", retry_budget)
+
+    api_endpoint_url = "https://10.0.0.1/v1/api"
+    circuit_breaker = lambda_module.get_circuit_breaker(api_endpoint_url=api_endpoint_url)
+    with pytest.raises(lambda_module.AviatrixException, match="fails fast"):
+        lambda_module._send_aviatrix_api_with_retry(
+            api_endpoint_url=api_endpoint_url,
+            request_method="GET",
+            payload={"action": "list_accounts"},
+            retry_count=circuit_breaker.failure_threshold + 2
+        )
+    assert len(sent_requests) == circuit_breaker.failure_threshold
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.OPEN
+# END def test_api_calls_fail_fast_once_the_controller_has_failed()
+
+
+def test_permanent_failures_do_not_open_the_circuit_breaker(lambda_module, virtual_clock, monkeypatch):
+    monkeypatch.setattr(lambda_module, "_send_http_request", lambda **kwargs: build_response(status_code=404))
+
+    api_endpoint_url = "https://10.0.0.2/v1/api"
+    circuit_breaker = lambda_module.get_circuit_breaker(api_endpoint_url=api_endpoint_url)
+    for _ in range(circuit_breaker.failure_threshold + 1):
+        with pytest.raises(lambda_module.AviatrixException, match="permanent"):
+            lambda_module._send_aviatrix_api_with_retry(
+                api_endpoint_url=api_endpoint_url,
+                request_method="GET",
+                payload={"action": "list_accounts"}
+            )
+    # END for
+    assert circuit_breaker.state == lambda_module.CircuitBreaker.CLOSED
+# END def test_permanent_failures_do_not_open_the_circuit_breaker()
@@ -0,0 +1,48 @@
+"""
+Tests of send_response_to_cloudformation(): the bounded retries, with backoff, of the response to the pre-signed URL.
+"""
+
+import pytest
+import requests
+
+
+@pytest.fixture
+def sent_times(lambda_module, virtual_clock, monkeypatch):
+    """ Answers every PUT with "503 Slow Down", and records the (virtual) time of every PUT """
+    sent_times = list()
+
+    def send_http_request(**kwargs):
+        sent_times.append(virtual_clock.time())
+        response = requests.models.Response()
+        response.status_code = 503
+        response._content = b"Slow Down"
+        return response
+    monkeypatch.setattr(lambda_module, "_send_http_request", send_http_request)
+    return sent_times
+# END def sent_times()
+
+
+def send_response(lambda_module):
+    return lambda_module.send_response_to_cloudformation(
+        event={"ResponseURL": "https://cloudformation-custom-resource-response.s3.amazonaws.com/response"},
+        response_for_cloudformation={"Status": "SUCCESS"},
+        retry_count=3
+    )
+# END def send_response()
+
+
+def test_retries_with_backoff(lambda_module, sent_times):
+    assert not send_response(lambda_module)
+    assert [sent_time - sent_times[0] for sent_time in sent_times] == \
+        [0, pytest.approx(0.5, abs=0.1), pytest.approx(1.5, abs=0.1)]
+# END def test_retries_with_backoff()
+
+
+def test_does_not_retry_without_the_backoff(lambda_module, virtual_clock, sent_times):
+    invocation_deadline = lambda_module.get_invocation_deadline()
+    invocation_deadline.deadline = \
+        virtual_clock.time() + lambda_module.HTTP_MIN_REQUEST_TIME + 1 - invocation_deadline.reserved_time
+
+    assert not send_response(lambda_module)
+    assert len(sent_times) == 2  # The second backoff (1 second) does NOT fit, so there is no third, immediate PUT
+# END def test_does_not_retry_without_the_backoff()
@@ -0,0 +1,134 @@
+"""
+Tests of the DAG action: the validation of the graph by parse_dag_nodes(), and the scheduling, the failure
+propagation and the timings of run_dag_nodes(), with test actions which wait in virtual time.
+"""
+
+import threading
+
+import pytest
+
+
+TOLERANCE_MS = 500  # The real time which passes between the virtual waits
+
+
+@pytest.fixture
+def test_action(lambda_module, virtual_clock, monkeypatch):
+    """
+    Registers "TEST_STEP": waits "DurationParam" second(s) of virtual time (after every node of "BarrierParam" has
+    started, IF any), then fails IF "FailParam" is set. Returns the node IDs in the order they have run.
+    """
+    run_node_ids = list()
+    barriers = dict()
+    lock = threading.Lock()
+
+    def run_test_step(resource_properties=dict(), **kwargs):
+        with lock:
+            run_node_ids.append(resource_properties["NodeIdParam"])
+        if "BarrierParam" in resource_properties:
+            barriers.setdefault(resource_properties["BarrierParam"], threading.Barrier(2)).wait(timeout=10)
+        virtual_clock.sleep(resource_properties.get("DurationParam", 0))
+        if resource_properties.get("FailParam"):
+            raise lambda_module.AviatrixException(message="Node " + resource_properties["NodeIdParam"] + " broke")
+        return dict()
+    # END def run_test_step()
+
+    monkeypatch.setitem(lambda_module.AVIATRIX_ACTIONS, "TEST_STEP", {
+        "name": "TEST_STEP",
+        "function": run_test_step,
+        "preflight_steps": list(),
+        "required_params": ["NodeIdParam"]
+    })
+    return run_node_ids
+# END def test_action()
+
+
+def build_node(node_id="a", depends_on=list(), **properties):
+    return dict(properties, AviatrixActionParam="TEST_STEP", NodeIdParam=node_id, DependsOnParam=depends_on)
+# END def build_node()
+
+
+def run_dag(lambda_module, nodes=list(), max_concurrency=5):
+    dag_nodes = lambda_module.parse_dag_nodes(resource_properties={"AviatrixActionGraphParam": nodes})
+    node_results = lambda_module.run_dag_nodes(dag_nodes=dag_nodes, max_concurrency=max_concurrency)
+    return {node_result["node_id"]: node_result for node_result in node_results}
+# END def run_dag()
+
+
+def test_dependency_cycle_is_rejected(lambda_module, test_action):
+    nodes = [build_node("a", ["c"]), build_node("b", ["a"]), build_node("c", ["b"]), build_node("d")]
+    with pytest.raises(lambda_module.AviatrixException, match=r"cycle.*\['a', 'b', 'c'\]"):
+        lambda_module.parse_dag_nodes(resource_properties={"AviatrixActionGraphParam": nodes})
+# END def test_dependency_cycle_is_rejected()
+
+
+def test_unknown_and_duplicated_nodes_are_rejected(lambda_module, test_action):
+    with pytest.raises(lambda_module.AviatrixException, match="unknown node"):
+        lambda_module.parse_dag_nodes(resource_properties={"AviatrixActionGraphParam": [build_node("a", ["x"])]})
+    with pytest.raises(lambda_module.AviatrixException, match="Duplicated"):
+        lambda_module.parse_dag_nodes(
+            resource_properties={"AviatrixActionGraphParam": [build_node("a"), build_node("a")]}
+        )
+# END def test_unknown_and_duplicated_nodes_are_rejected()
+
+
+def test_comma_separated_dependencies(lambda_module, test_action):
+    nodes = [build_node("a"), build_node("b"), build_node("c", "a, b")]
+    dag_nodes = lambda_module.parse_dag_nodes(resource_properties={"AviatrixActionGraphParam": nodes})
+    assert dag_nodes[2]["depends_on"] == ["a", "b"]
+# END def test_comma_separated_dependencies()
+
+
+def test_independent_nodes_run_in_parallel_and_the_critical_path_is_the_longest_chain(lambda_module, test_action):
+    node_results = run_dag(lambda_module, nodes=[
+        build_node("a", DurationParam=1, BarrierParam="start"),
+        build_node("b", DurationParam=3, BarrierParam="start"),
+        build_node("c", ["b", "a"], DurationParam=2),  # "b" first, so a tie of "a" with "b" resolves to "b"
+    ])
+    assert all(node_result["status"] == "SUCCESS" for node_result in node_results.values())
+    assert node_results["c"]["start_ms"] == pytest.approx(3000, abs=TOLERANCE_MS)  # NOT 4000, as in series
+    assert node_results["c"]["critical_path_ms"] == pytest.approx(5000, abs=TOLERANCE_MS)
+    assert lambda_module.get_dag_critical_path(node_results=list(node_results.values())) == ["b", "c"]
+# END def test_independent_nodes_run_in_parallel_and_the_critical_path_is_the_longest_chain()
+
+
+def test_max_concurrency_runs_the_nodes_one_after_the_other(lambda_module, test_action):
+    node_results = run_dag(lambda_module, nodes=[
+        build_node("a", DurationParam=1),
+        build_node("b", DurationParam=1),
+    ], max_concurrency=1)
+    assert sorted(node_result["start_ms"] for node_result in node_results.values()) == \
+        [pytest.approx(0, abs=TOLERANCE_MS), pytest.approx(1000, abs=TOLERANCE_MS)]
+# END def test_max_concurrency_runs_the_nodes_one_after_the_other()
+
+
+def test_failure_cancels_the_dependent_nodes_only(lambda_module, test_action):
+    node_results = run_dag(lambda_module, nodes=[
+        build_node("a", FailParam=True),
+        build_node("b"),
+        build_node("c", ["a", "b"]),
+        build_node("d", ["c"]),
+        build_node("e", ["b"]),
+    ])
+    assert {node_id: node_result["status"] for node_id, node_result in node_results.items()} == {
+        "a": "FAILED", "b": "SUCCESS", "c": "CANCELLED", "d": "CANCELLED", "e": "SUCCESS"
+    }
+    assert node_results["a"]["reason"] == "Node a broke"
+    assert node_results["c"]["reason"] == 'Node "a" has failed'
+    assert node_results["d"]["reason"] == 'Node "a" has failed'
+    assert node_results["c"]["latency_ms"] is None
+    assert sorted(test_action) == ["a", "b", "e"]  # The cancelled nodes have never run
+# END def test_failure_cancels_the_dependent_nodes_only()
+
+
+def test_dag_action_fails_with_the_summary_of_every_node(lambda_module, test_action):
+    resource_properties = {"AviatrixActionGraphParam": [build_node("a", FailParam=True), build_node("b", ["a"])]}
+    with pytest.raises(lambda_module.AviatrixException) as exception_info:
+        lambda_module._run_action_dag(resource_properties=resource_properties)
+    assert str(exception_info.value).startswith("DAG failed.")
+    assert 'Node "a" TEST_STEP: FAILED' in str(exception_info.value)
+    assert 'Node "b" TEST_STEP: CANCELLED' in str(exception_info.value)
+
+    data = lambda_module._run_action_dag(resource_properties={"AviatrixActionGraphParam": [build_node("a")]})
+    assert [node_result["status"] for node_result in data["dag_nodes"]] == ["SUCCESS"]
+    assert data["critical_path"] == ["a"]
+# END def test_dag_action_fails_with_the_summary_of_every_node()
@@ -0,0 +1,71 @@
+"""
+Tests of sqs_lambda_handler(): ONLY the failed messages are reported in "batchItemFailures".
+"""
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def deleted_tgws(lambda_module, monkeypatch):
+    """ Replaces the login and the "DELETE" action, and records the TGW of every deletion """
+    deleted_tgws = list()
+
+    def run_action_delete_aws_tgw(resource_properties=dict(), **kwargs):
+        deleted_tgws.append(resource_properties["TgwNameParam"])
+    def run_preflight_steps(**kwargs):
+        return {"CID": "ABCD1234", "controller_version": None}
+    monkeypatch.setattr(lambda_module, "run_preflight_steps", run_preflight_steps)
+    monkeypatch.setitem(
+        lambda_module.AVIATRIX_ACTIONS, "DELETE",
+        dict(lambda_module.AVIATRIX_ACTIONS["DELETE"], function=run_action_delete_aws_tgw)
+    )
+    return deleted_tgws
+# END def deleted_tgws()
+
+
+def build_record(message_id="m1", **resource_properties):
+    resource_properties = dict({
+        "AviatrixControllerHostnameParam": "10.0.0.1",
+        "AviatrixApiVersionParam": "v1",
+        "AviatrixApiRouteParam": "api/",
+        "AviatrixControllerAdminPasswordParam": "Aviatrix123!",
+    }, **resource_properties)
+    return {"messageId": message_id, "body": json.dumps(resource_properties)}
+# END def build_record()
+
+
+def get_failed_message_ids(response):
+    return [batch_item_failure["itemIdentifier"] for batch_item_failure in response["batchItemFailures"]]
+# END def get_failed_message_ids()
+
+
+def test_malformed_message_fails_on_its_own(lambda_module, deleted_tgws):
+    response = lambda_module.sqs_lambda_handler(event={"Records": [
+        build_record("m1", AviatrixActionParam="DELETE", TgwNameParam="my-aws-tgw-009"),
+        build_record("m2", AviatrixActionParam="BATCH", AviatrixActionListParam="not json"),
+        {"messageId": "m3", "body": "not json"},
+    ]}, context=None)
+    assert get_failed_message_ids(response) == ["m2", "m3"]
+    assert deleted_tgws == ["my-aws-tgw-009"]
+# END def test_malformed_message_fails_on_its_own()
+
+
+def test_failed_login_fails_every_message_of_the_controller_only(lambda_module, deleted_tgws, monkeypatch):
+    def run_preflight_steps(ucc_hostname="", **kwargs):
+        if ucc_hostname == "10.0.0.2":
+            raise lambda_module.AviatrixException(message="Login failed")
+        return {"CID": "ABCD1234", "controller_version": None}
+    monkeypatch.setattr(lambda_module, "run_preflight_steps", run_preflight_steps)
+
+    response = lambda_module.sqs_lambda_handler(event={"Records": [
+        build_record("m1", AviatrixActionParam="DELETE", TgwNameParam="tgw-1"),
+        build_record("m2", AviatrixActionParam="DELETE", TgwNameParam="tgw-2",
+                     AviatrixControllerHostnameParam="10.0.0.2"),
+        build_record("m3", AviatrixActionParam="DELETE", TgwNameParam="tgw-3",
+                     AviatrixControllerHostnameParam="10.0.0.2"),
+    ]}, context=None)
+    assert get_failed_message_ids(response) == ["m2", "m3"]
+    assert deleted_tgws == ["tgw-1"]
+# END def test_failed_login_fails_every_message_of_the_controller_only()